@@ -2,53 +2,75 @@ from analysis_parity import ParityStaticAnalyzer
 from equations import solve_linear_equations
 from lattice_creation import create_cartesian_product_two_lattices
 from analysis_summation import SummationStaticAnalyzer
-from typing import Tuple, List
-from saav_parser import BOOLCondition, BoolConditionType, ORCondition, ANDCondition, Command, CommandType
+from typing import Tuple, List, Union
+from saav_parser import BoolConditionType, ORCondition, Command, CommandType
 
 class ParitySummationCartesianProduct:
-    def __init__(self, variables, coefficiets_range: Tuple[int, int], integer_range: Tuple[int, int]):
+    def __init__(self, variables, coefficiets_range: Tuple[int, int], integer_range: Tuple[int, int],
+                 max_support: Union[int, None] = None, use_equations_cache: bool = False,
+                 explication_workers: int = 0, use_bdd_parity: bool = False, use_reduction: bool = False):
+        """
+        If use_bdd_parity is True, the parity element is a BDD (see ParityStaticAnalyzer).
+        If use_reduction is True, every state is reduced after each command (see reduce()).
+        """
         self.variables: List[str] =  variables
-        self.parity_analyzer = ParityStaticAnalyzer(variables)
+        self.use_reduction: bool = use_reduction
+        self.parity_analyzer = ParityStaticAnalyzer(variables, use_bdd=use_bdd_parity)
         self.parity_lattice = self.parity_analyzer.lattice_class
-        self.summation_analyzer = SummationStaticAnalyzer(variables, coefficiets_range, integer_range)
+        self.summation_analyzer = SummationStaticAnalyzer(variables, coefficiets_range, integer_range, max_support,
+                                                          use_equations_cache, explication_workers)
         self.summation_lattice = self.summation_analyzer.lattice_class
         self.lattice_class = create_cartesian_product_two_lattices(self.parity_lattice, self.summation_lattice) 
+        self.bottom_state = None  # Computed on first use, since the bottom holds all the equations.
 
-    def _evaluate_boolcondition_on_set(self, bool_condition: BOOLCondition, cartesian, set_of_equations) -> bool:
-        assert isinstance(cartesian, self.parity_analyzer.tuple_class)
-        boolcondition_type: BoolConditionType = bool_condition.boolcondition_type
+    def compile_cfg(self, cfg) -> None:
+        self.parity_analyzer.compile_cfg(cfg)
+        self.summation_analyzer.compile_cfg(cfg)
 
-        if boolcondition_type in {BoolConditionType.B_Even, BoolConditionType.B_Odd}:
-            print(f"Checking {bool_condition} on cartesian {cartesian}!")
-            if not self.parity_analyzer._evaluate_boolcondition_on_cartesian(bool_condition, cartesian):
-                return False
-            return True
-
-        elif boolcondition_type == BoolConditionType.B_Sum:
-            print(f"Cheking {bool_condition} on Equations!")
-            return self.summation_analyzer._evaluate_boolcondition_on_set(bool_condition, set_of_equations)
-        
-        raise ValueError(f"Ilegal boolcondition: {bool_condition}.")
-    
-    def _evaluate_andcondition_on_set(self, and_condition: ANDCondition, cartesian, set_of_equations) -> bool:
-        assert isinstance(cartesian, self.parity_analyzer.tuple_class)
-        for bool_condition in and_condition.conjunction_list:
-            if not self._evaluate_boolcondition_on_set(bool_condition, cartesian, set_of_equations):
-                return False
-        return True
+    def reduce(self, state):
+        """
+        The reduction of the product: every equation holds modulo 2, so the parity vectors that contradict
+        one of the equations (for instance x EVEN, y EVEN and x - y = 1) are removed from the parity element.
+        If no parity vector is left, there is no legal concrete assignment, and the result is the bottom element.
+        """
+        assert isinstance(state, self.lattice_class)
+        parity_state = self.parity_analyzer.condition_state(state.first_element) # type: ignore
+        feasible = parity_state
+        for odd_variables, odd_sum in self.summation_analyzer.get_parity_constraints(state.second_element): # type: ignore
+            feasible = feasible.meet(self.parity_analyzer.get_parity_constraint_element(odd_variables, odd_sum))
+        if feasible == parity_state:
+            return state
+        if feasible == feasible.bottom():
+            if self.bottom_state is None:
+                self.bottom_state = self.lattice_class.bottom()
+            return self.bottom_state
+        return self.lattice_class(first_element=self.parity_analyzer.from_condition_state(feasible),
+                                  second_element=state.second_element) # type: ignore
 
     def _evaluate_orcondition_on_set(self, or_condition: ORCondition, parity_element, set_of_equations: set) -> bool:
+        """
+        The SUM conditions do not depend on the parity vector, so every ANDCondition is reduced to the element of
+        parity vectors it accepts (or to nothing, if its SUM conditions fail on the equations) just once.
+        The failing vectors are then the state minus the join of these elements.
+        """
         assert isinstance(parity_element, self.parity_lattice)
-        for cartesian in parity_element:
-            print(f"Verifying {or_condition} for {cartesian} and equations...")
-            cartesian_approves_orcondition = False
-            for and_condition in or_condition.disjunction_list:
-                if self._evaluate_andcondition_on_set(and_condition, cartesian, set_of_equations):
-                    cartesian_approves_orcondition = True
-                    break
-            if not cartesian_approves_orcondition:
-                print(f"Assertion failed! Due to: {cartesian}.")
-                return False
+        state = self.parity_analyzer.condition_state(parity_element)
+        satisfying = state.bottom()
+        for and_condition in or_condition.disjunction_list:
+            and_element = self.parity_analyzer.get_andcondition_element(and_condition)
+            if state.meet(and_element) <= satisfying:
+                continue  # No vector in the state depends on this ANDCondition.
+            sum_conditions = [bool_condition for bool_condition in and_condition.conjunction_list
+                              if bool_condition.boolcondition_type == BoolConditionType.B_Sum]
+            print(f"Verifying {and_condition} for equations...")
+            if all(self.summation_analyzer._evaluate_boolcondition_on_set(bool_condition, set_of_equations)
+                   for bool_condition in sum_conditions):
+                satisfying = satisfying.join(and_element)
+
+        failing = state.difference(satisfying)
+        if failing != failing.bottom():
+            print(f"Assertion failed! Due to: {failing}.")
+            return False
         return True
 
     def execute_command_from_abstract_state(self, current_state, command: Command):
@@ -93,7 +115,11 @@ class ParitySummationCartesianProduct:
                 print(f"Assretion {or_condition} failed!")
             else:
                 print(f"Assretion {or_condition} suceed!")
+            return current_state
         
-        return self.lattice_class(first_element=first_element, second_element=second_element) # type: ignore
+        new_state = self.lattice_class(first_element=first_element, second_element=second_element)
+        if self.use_reduction:
+            return self.reduce(new_state)
+        return new_state
 
 
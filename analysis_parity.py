@@ -1,8 +1,12 @@
 from __future__ import annotations
-from lattice_creation import Listable, ListableEnum, ListableLattice, create_tuple_class, create_disjunctive_completion_lattice, create_tuple_subsets_lattice, ListableItemable
+from lattice_creation import Listable, ListableEnum, ListableLattice, create_tuple_class, create_disjunctive_completion_lattice, create_tuple_subsets_lattice, ListableItemable, \
+    create_bitset_tuple_subsets_lattice, create_bdd_tuple_subsets_lattice
 from saav_parser import Command, CommandType, ECondition, EConditionType, BOOLCondition, BoolConditionType, ANDCondition, ORCondition
-from typing import Set, List, Type
+from typing import Set, FrozenSet, List, Type, Dict, Tuple, Callable
 from enum import Enum
+from itertools import islice
+
+MAX_PRINTED_FAILURES = 100
 
 class Parity(Listable, Enum, metaclass=ListableEnum):
     EVEN = 0 
@@ -26,14 +30,43 @@ def parity_example():
     TupleSubsetLattice: Type[ListableLattice] = create_tuple_subsets_lattice(variables, Parity)
 
     print(TupleSubsetLattice.top())
-    print(len(TupleSubsetLattice.all_elements()))
+    print(TupleSubsetLattice.number_of_elements())
     
 
+def flip_parity(parity: Parity) -> Parity:
+    return Parity.EVEN if parity == Parity.ODD else Parity.ODD
+
+def parity_of_constant(const: int) -> Parity:
+    return Parity.EVEN if const % 2 == 0 else Parity.ODD
+
+
 class ParityStaticAnalyzer:
-    def __init__(self, variables: List[str]):
+    def __init__(self, variables: List[str], use_bitset: bool = True, use_bdd: bool = False):
+        """
+        If use_bdd is True, an abstract state is a BDD over the parities of the variables
+        (see create_bdd_tuple_subsets_lattice), so programs with many variables stay tractable
+        as long as the relations between their parities are structured.
+        Otherwise, if use_bitset is True, an abstract state is a single bitmask over all parity vectors
+        (see create_bitset_tuple_subsets_lattice), and commands are executed on the whole mask at once.
+        Otherwise, it is a set of tuple_class objects.
+        """
         self.variables: List[str] = variables
+        self.use_bdd: bool = use_bdd
+        self.use_bitset: bool = use_bitset and not use_bdd
         self.tuple_class: Type[ListableItemable] = create_tuple_class(variables, Parity)
-        self.lattice_class: Type[ListableLattice] = create_disjunctive_completion_lattice(self.tuple_class)
+        self.bitset_transitions: Dict[Command, List[Tuple[int, int]]] = {}
+        self.bdd_images: Dict[Command, Callable] = {}
+        self.transition_tables: Dict[Command, Dict] = {}
+        self.compiled_conditions: Dict = {}
+        # Conditions are always compiled into elements of this lattice, even when it is not the analysis lattice.
+        if use_bdd:
+            self.condition_lattice_class = create_bdd_tuple_subsets_lattice(variables, Parity, self.tuple_class)
+        else:
+            self.condition_lattice_class = create_bitset_tuple_subsets_lattice(variables, Parity, self.tuple_class)
+        if self.use_bdd or self.use_bitset:
+            self.lattice_class: Type[ListableLattice] = self.condition_lattice_class
+        else:
+            self.lattice_class: Type[ListableLattice] = create_disjunctive_completion_lattice(self.tuple_class)
 
     def _evaluate_econdition_on_cartesian(self, econdition: ECondition, cartesian) -> bool:
         assert isinstance(cartesian, self.tuple_class)
@@ -105,25 +138,17 @@ class ParityStaticAnalyzer:
             i_variable = command.command_parameters['i']
             j_variable = command.command_parameters['j']
             j_value = cartesian[j_variable]
-            new_cartesian = cartesian.copy()
-            new_cartesian[i_variable] = j_value
-            return {new_cartesian}
+            return {cartesian.updated(i_variable, j_value)}
         
         if command.command_type == CommandType.C_Assign_Const:    # i := K
             i_variable = command.command_parameters['i']
             const = command.command_parameters['K']
             parity = Parity.EVEN if const % 2 == 0 else Parity.ODD
-            new_cartesian = cartesian.copy()
-            new_cartesian[i_variable] = parity
-            return {new_cartesian}
+            return {cartesian.updated(i_variable, parity)}
         
         if command.command_type == CommandType.C_Assign_Unknown:    # i := ?
             i_variable = command.command_parameters['i']
-            new_cartesian_even = cartesian.copy()
-            new_cartesian_even[i_variable] = Parity.EVEN
-            new_cartesian_odd = cartesian.copy()
-            new_cartesian_odd[i_variable] = Parity.ODD
-            return {new_cartesian_even, new_cartesian_odd}
+            return {cartesian.updated(i_variable, Parity.EVEN), cartesian.updated(i_variable, Parity.ODD)}
         
         if command.command_type == CommandType.C_Plus1 or\
             command.command_type == CommandType.C_Minus1:    # i = j +- 1
@@ -131,9 +156,7 @@ class ParityStaticAnalyzer:
             j_variable = command.command_parameters['j']
             j_value = cartesian[j_variable]
             updated_j_value = Parity.EVEN if j_value == Parity.ODD else Parity.ODD
-            new_cartesian = cartesian.copy()
-            new_cartesian[i_variable] = updated_j_value
-            return {new_cartesian}
+            return {cartesian.updated(i_variable, updated_j_value)}
         
         if command.command_type == CommandType.C_Assume:
             e_condition: ECondition = command.command_parameters['E']
@@ -151,11 +174,231 @@ class ParityStaticAnalyzer:
         
         raise ValueError(f"Ilegal command: {command}.")
 
+    def compile_command_on_bitset(self, command: Command) -> List[Tuple[int, int]]:
+        """
+        Compiles a command (other than assert) into a transition of the bitset lattice.
+        """
+        command_type: CommandType = command.command_type
+
+        if command_type == CommandType.C_Skip:
+            return self.lattice_class.identity_transition()
+
+        if command_type == CommandType.C_Assign_Var:    # i := j
+            return self.lattice_class.assign_from_transition(command.command_parameters['i'],
+                                                             command.command_parameters['j'], lambda parity: parity)
+
+        if command_type == CommandType.C_Assign_Const:    # i := K
+            return self.lattice_class.assign_transition(command.command_parameters['i'],
+                                                        parity_of_constant(command.command_parameters['K']))
+
+        if command_type == CommandType.C_Assign_Unknown:    # i := ?
+            return self.lattice_class.forget_transition(command.command_parameters['i'])
+
+        if command_type == CommandType.C_Plus1 or command_type == CommandType.C_Minus1:    # i = j +- 1
+            return self.lattice_class.assign_from_transition(command.command_parameters['i'],
+                                                             command.command_parameters['j'], flip_parity)
+
+        if command_type == CommandType.C_Assume:
+            e_condition: ECondition = command.command_parameters['E']
+            econdition_type: EConditionType = e_condition.econdition_type
+            if econdition_type == EConditionType.E_Equal_Var:  # i = j
+                return self.lattice_class.restrict_equal_transition(e_condition.econdition_parameters['i'],
+                                                                    e_condition.econdition_parameters['j'])
+            if econdition_type == EConditionType.E_Equal_Const:  # i = K
+                return self.lattice_class.restrict_transition(e_condition.econdition_parameters['i'],
+                                                              parity_of_constant(e_condition.econdition_parameters['K']))
+            if econdition_type == EConditionType.E_False:
+                return []
+            return self.lattice_class.identity_transition()  # i != j, i != K and TRUE do not tell anything.
+
+        raise ValueError(f"Ilegal command: {command}.")
+
+    def compile_command_on_bdd(self, command: Command) -> Callable:
+        """
+        Compiles a command (other than assert) into its image function on the BDD lattice.
+        """
+        command_type: CommandType = command.command_type
+
+        if command_type == CommandType.C_Skip:
+            return lambda state: state
+
+        if command_type == CommandType.C_Assign_Var:    # i := j
+            i_variable, j_variable = command.command_parameters['i'], command.command_parameters['j']
+            return lambda state: state.assign_from(i_variable, j_variable, lambda parity: parity)
+
+        if command_type == CommandType.C_Assign_Const:    # i := K
+            i_variable, parity = command.command_parameters['i'], parity_of_constant(command.command_parameters['K'])
+            return lambda state: state.assign(i_variable, parity)
+
+        if command_type == CommandType.C_Assign_Unknown:    # i := ?
+            i_variable = command.command_parameters['i']
+            return lambda state: state.forget(i_variable)
+
+        if command_type == CommandType.C_Plus1 or command_type == CommandType.C_Minus1:    # i = j +- 1
+            i_variable, j_variable = command.command_parameters['i'], command.command_parameters['j']
+            return lambda state: state.assign_from(i_variable, j_variable, flip_parity)
+
+        if command_type == CommandType.C_Assume:
+            e_condition: ECondition = command.command_parameters['E']
+            econdition_type: EConditionType = e_condition.econdition_type
+            if econdition_type == EConditionType.E_Equal_Var:  # i = j
+                i_variable, j_variable = e_condition.econdition_parameters['i'], e_condition.econdition_parameters['j']
+                return lambda state: state.restrict_equal(i_variable, j_variable)
+            if econdition_type == EConditionType.E_Equal_Const:  # i = K
+                i_variable = e_condition.econdition_parameters['i']
+                parity = parity_of_constant(e_condition.econdition_parameters['K'])
+                return lambda state: state.restrict_to(i_variable, parity)
+            if econdition_type == EConditionType.E_False:
+                return lambda state: state.bottom()
+            return lambda state: state  # i != j, i != K and TRUE do not tell anything.
+
+        raise ValueError(f"Ilegal command: {command}.")
+
+    def get_transition_table(self, command: Command) -> Dict:
+        """
+        The transition table of a command (other than assert) for the set-of-tuples lattice:
+        a map from a tuple to the frozenset of tuples it is sent to. It is filled on demand.
+        """
+        if command not in self.transition_tables:
+            self.transition_tables[command] = {}
+        return self.transition_tables[command]
+
+    def compile_cfg(self, cfg) -> None:
+        """
+        Compiles the command of every edge of the CFG once, before the analysis starts.
+        Commands which are not compiled here are compiled on their first execution.
+        """
+        for program_line in cfg.program.program_lines:
+            command: Command = program_line.command
+            if command.command_type == CommandType.C_Assert:
+                continue
+            if self.use_bitset and command not in self.bitset_transitions:
+                self.bitset_transitions[command] = self.compile_command_on_bitset(command)
+            if self.use_bdd and command not in self.bdd_images:
+                self.bdd_images[command] = self.compile_command_on_bdd(command)
+            self.get_transition_table(command)
+
+    def execute_compiled_command_on_carteisan(self, cartesian, command: Command) -> frozenset:
+        """
+        Same as execute_command_on_carteisan, but the result is looked up in the transition table of the command.
+        The returned tuples are shared, and must not be changed.
+        """
+        if command.command_type == CommandType.C_Assert:
+            return frozenset(self.execute_command_on_carteisan(cartesian, command))
+        transition_table = self.get_transition_table(command)
+        if cartesian not in transition_table:
+            transition_table[cartesian] = frozenset(self.execute_command_on_carteisan(cartesian, command))
+        return transition_table[cartesian]
+
+    def get_andcondition_element(self, and_condition: ANDCondition):
+        """
+        Compiles the parity part of an ANDCondition into the element (of condition_lattice_class)
+        of all parity vectors that satisfy it.
+        SUM conditions are not about parities, so they are left for the caller (and ignored here).
+        """
+        if and_condition not in self.compiled_conditions:
+            element = self.condition_lattice_class.top()
+            for bool_condition in and_condition.conjunction_list:
+                boolcondition_type: BoolConditionType = bool_condition.boolcondition_type
+                if boolcondition_type in {BoolConditionType.B_Even, BoolConditionType.B_Odd}:
+                    parity = Parity.EVEN if boolcondition_type == BoolConditionType.B_Even else Parity.ODD
+                    element = element.meet(self.condition_lattice_class.value_set(bool_condition.boolcondition_parameters['i'],
+                                                                                  parity))
+            self.compiled_conditions[and_condition] = element
+        return self.compiled_conditions[and_condition]
+
+    def get_orcondition_element(self, or_condition: ORCondition):
+        """
+        Compiles an ORCondition into the element of all parity vectors that satisfy it.
+        """
+        if or_condition not in self.compiled_conditions:
+            element = self.condition_lattice_class.bottom()
+            for and_condition in or_condition.disjunction_list:
+                for bool_condition in and_condition.conjunction_list:
+                    if bool_condition.boolcondition_type not in {BoolConditionType.B_Even, BoolConditionType.B_Odd}:
+                        raise ValueError(f"Ilegal boolcondition: {bool_condition}.")
+                element = element.join(self.get_andcondition_element(and_condition))
+            self.compiled_conditions[or_condition] = element
+        return self.compiled_conditions[or_condition]
+
+    def get_parity_constraint_element(self, odd_variables: FrozenSet[str], odd_sum: bool):
+        """
+        Returns the element (of condition_lattice_class) of all parity vectors in which
+        an odd number of odd_variables are ODD if odd_sum is True, and an even number otherwise.
+        This is what an equation says about parities (see Equation.parity_constraint).
+        """
+        key = (odd_variables, odd_sum)
+        if key not in self.compiled_conditions:
+            even_element, odd_element = self.condition_lattice_class.top(), self.condition_lattice_class.bottom()
+            for variable in sorted(odd_variables, key=self.variables.index):
+                even_values = self.condition_lattice_class.value_set(variable, Parity.EVEN)
+                odd_values = self.condition_lattice_class.value_set(variable, Parity.ODD)
+                even_element, odd_element = even_element.meet(even_values).join(odd_element.meet(odd_values)), \
+                                            odd_element.meet(even_values).join(even_element.meet(odd_values))
+            self.compiled_conditions[key] = odd_element if odd_sum else even_element
+        return self.compiled_conditions[key]
+
+    def _evaluate_parity_constraint_on_cartesian(self, odd_variables: FrozenSet[str], odd_sum: bool, cartesian) -> bool:
+        assert isinstance(cartesian, self.tuple_class)
+        number_of_odd_values = sum(1 for variable in odd_variables if cartesian[variable] == Parity.ODD)
+        return (number_of_odd_values % 2 == 1) == odd_sum
+
+    def condition_state(self, state):
+        """
+        Returns the state as an element of condition_lattice_class.
+        """
+        assert isinstance(state, self.lattice_class)
+        if self.lattice_class is self.condition_lattice_class:
+            return state
+        return self.condition_lattice_class.from_tuples(state)
+
+    def from_condition_state(self, condition_element):
+        """
+        The inverse of condition_state.
+        """
+        if self.lattice_class is self.condition_lattice_class:
+            return condition_element
+        return self.lattice_class(set=set(condition_element))
+
+    def check_assertion(self, current_state, or_condition: ORCondition) -> bool:
+        """
+        Checks the assertion on the whole state at once: the failing vectors are the state minus the satisfying ones.
+        """
+        state = self.condition_state(current_state)
+        satisfying = state.meet(self.get_orcondition_element(or_condition))
+        failing = state.difference(satisfying)
+        for cartesian in islice(failing, MAX_PRINTED_FAILURES):
+            print(f"Assertaion {or_condition} FAILED due to: {cartesian}.")
+        if failing != failing.bottom() and len(failing) > MAX_PRINTED_FAILURES:
+            print(f"Assertaion {or_condition} FAILED due to {len(failing) - MAX_PRINTED_FAILURES} more vectors.")
+        if satisfying != satisfying.bottom():
+            print(f"Assertion {or_condition} SUCCEED on {satisfying}!")
+        return failing == failing.bottom()
+
+    def execute_command_on_bitset(self, current_state, command: Command):
+        assert isinstance(current_state, self.lattice_class)
+        if command not in self.bitset_transitions:
+            self.bitset_transitions[command] = self.compile_command_on_bitset(command)
+        return current_state.apply_transition(self.bitset_transitions[command])
+
+    def execute_command_on_bdd(self, current_state, command: Command):
+        assert isinstance(current_state, self.lattice_class)
+        if command not in self.bdd_images:
+            self.bdd_images[command] = self.compile_command_on_bdd(command)
+        return self.bdd_images[command](current_state)
+
     def execute_command_from_abstract_state(self, current_state, command: Command):
         assert isinstance(current_state, self.lattice_class)
+        if command.command_type == CommandType.C_Assert:
+            self.check_assertion(current_state, command.command_parameters['ORC'])
+            return current_state.copy()
+        if self.use_bdd:
+            return self.execute_command_on_bdd(current_state, command)
+        if self.use_bitset:
+            return self.execute_command_on_bitset(current_state, command)
         new_set: Set[Listable] = set()
         for cartesian in current_state:
-            new_set.update(self.execute_command_on_carteisan(cartesian, command))
+            new_set.update(self.execute_compiled_command_on_carteisan(cartesian, command))
         return self.lattice_class(set=new_set) # type: ignore
 
 
@@ -176,6 +419,6 @@ def example():
         print("\n===================================================\n")
         print(f"Performing {command_text} on state: \t{current_state}.")
         current_state = parity_analyzer.execute_command_from_abstract_state(current_state, Command(command_text))
-        print(f"\nGot {len(current_state.set)}-long state: \t{current_state}.")
+        print(f"\nGot {len(list(current_state))}-long state: \t{current_state}.")
         
 #example()
\ No newline at end of file
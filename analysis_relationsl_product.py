@@ -1,102 +1,294 @@
 from __future__ import annotations
-from typing import Tuple, List, Type, Set, Iterator
-from lattice_creation import Lattice
+from typing import Tuple, List, Type, Dict, Iterable, Iterator, Union
+from lattice_creation import Lattice, Interned, memoized_factory
 from analysis_parity import ParityStaticAnalyzer
 from analysis_summation import SummationStaticAnalyzer
 from saav_parser import Command, CommandType, ORCondition, BOOLCondition, BoolConditionType, ANDCondition
 from equations import solve_linear_equations
 
 
+@memoized_factory
 def create_relational_combine_product(tuple_class, available_equations_lattice: Type[Lattice]) -> Type[Lattice]:
     """
     The first element is a class representing tuples of the form (p1, ..., pn) where pi is the parity of pn.
     The second element is a class representing a set of linear equations.
-    The created lattice's elements are sets of tuples (pairty_element, equations_element),
-        parity_element is an element of tuple_class,
-        equations_element is an element of available_equations_lattice.
+    The created lattice's elements are maps from parity vectors to equations,
+        the keys are elements of tuple_class,
+        the values are elements of available_equations_lattice.
+    It is built from a set of tuples (pairty_element, equations_element), and tuples with the same parity_element
+    are merged into one, by joining their equations elements (that is, keeping only the common equations).
+    So an element has at most one tuple for every parity vector.
 
-    The top element is a set of 2^n tuples - all possible parity vectors, and paired with no equations.
-    The bottom element is an empty set - representing that there is no legal concrete assignment.
-    The join() function is union of sets, and meet() is intersection.
+    The top element maps all 2^n possible parity vectors to no equations.
+    The bottom element is an empty map - representing that there is no legal concrete assignment.
+    The join() function joins the equations of common parity vectors, and keeps the others as they are.
+    The meet() function meets the equations of common parity vectors, and drops the others.
     """
-    class relational_product(Lattice):
-        def __init__(self, parity_equations_tuples_set: Set[Tuple[tuple_class, available_equations_lattice]]):
-            self.tuples_set: Set[Tuple[tuple_class, available_equations_lattice]] = parity_equations_tuples_set
+    class relational_product(Interned, Lattice):
+        __slots__ = ('mapping', 'tuples_set')
+
+        def __new__(cls, parity_equations_tuples_set: Iterable[Tuple[tuple_class, available_equations_lattice]]):
+            mapping: Dict[tuple_class, available_equations_lattice] = {}
+            for (parity_element, equations_element) in parity_equations_tuples_set:
+                if parity_element in mapping:
+                    equations_element = mapping[parity_element].join(equations_element)
+                mapping[parity_element] = equations_element
+            return relational_product.from_mapping(mapping)
+
+        @staticmethod
+        def from_mapping(mapping: Dict[tuple_class, available_equations_lattice]) -> relational_product:
+            tuples_set = frozenset(mapping.items())
+            return relational_product._intern(tuples_set, mapping=mapping, tuples_set=tuples_set)
 
         @staticmethod
         def top() -> relational_product:
-            all_possible_tuples: List[tuple_class] = tuple_class.all_elements()
             empty_equations_set: available_equations_lattice = available_equations_lattice.top()
-            all_tuples = {(parity_tuple, empty_equations_set) for parity_tuple in all_possible_tuples}
-            return relational_product(parity_equations_tuples_set=all_tuples)
+            return relational_product.from_mapping({parity_tuple: empty_equations_set
+                                                    for parity_tuple in tuple_class.all_elements()})
         
         @staticmethod
         def bottom() -> relational_product:
-            return relational_product(parity_equations_tuples_set=set())
-        
-        def __eq__(self: relational_product, other: relational_product) -> bool:
-            return self.tuples_set == other.tuples_set
+            return relational_product.from_mapping({})
         
         def __le__(self: relational_product, other: relational_product) -> bool:
             """
-            First, we define le((parity_element1, equations_element1), (parity_element2, equations_element2)).
-            This is True iff parity_elemenet1 == parity_element2 and equations_element1 <= equations_element2.
+            self <= other iff every parity vector of self is also in other,
+            and its equations element in self is <= its equations element in other.
             Here "<=" is the le() relations from available_equations_lattice, which translates to issuperset().
-
-            Now we define self <= other iff every tuple t1 in self.tuples_set,
-            has a tuple t2 in other.tuples_set,
-            such that le(t1, t2).
             """
-            for (parity_element1, equations_element1) in self.tuples_set:
-                found_bigger_element = False
-                for (parity_element2, equations_element2) in other.tuples_set:
-                    if parity_element1 == parity_element2 and equations_element1 <= equations_element2:
-                        found_bigger_element = True
-                        break
-                if not found_bigger_element:
+            other_mapping = other.mapping
+            for parity_element, equations_element in self.mapping.items():
+                if parity_element not in other_mapping or not equations_element <= other_mapping[parity_element]:
                     return False
             return True
         
         def meet(self: relational_product, other: relational_product) -> relational_product:
-            if self <= other:
-                return self
-            if other <= self:
-                return other
-            return relational_product(parity_equations_tuples_set=self.tuples_set.intersection(other.tuples_set))
+            other_mapping = other.mapping
+            return relational_product.from_mapping({
+                parity_element: equations_element.meet(other_mapping[parity_element])
+                for parity_element, equations_element in self.mapping.items() if parity_element in other_mapping})
         
         def join(self: relational_product, other: relational_product) -> relational_product:
-            if self <= other:
-                return other
-            if other <= self:
-                return self
-            return relational_product(parity_equations_tuples_set=self.tuples_set.union(other.tuples_set))
+            mapping = dict(self.mapping)
+            for parity_element, equations_element in other.mapping.items():
+                if parity_element in mapping:
+                    equations_element = mapping[parity_element].join(equations_element)
+                mapping[parity_element] = equations_element
+            return relational_product.from_mapping(mapping)
         
         def __repr__(self) -> str:
             set_of_strings = {f"<{parity_element.__repr__()}, {equations_element.__repr__()}>"
-                              for (parity_element, equations_element) in self.tuples_set}
+                              for (parity_element, equations_element) in self.mapping.items()}
             return set_of_strings.__repr__()
         
-        def copy(self: relational_product):
-            return relational_product(parity_equations_tuples_set={t.copy() for t in self.tuples_set}) # type: ignore
-        
+        def __len__(self) -> int:
+            return len(self.mapping)
+
         def __iter__(self) -> Iterator[Tuple[tuple_class, available_equations_lattice]]:
-            for t in self.tuples_set:
+            for t in self.mapping.items():
                 yield t
 
     return relational_product
 
+@memoized_factory
+def create_bdd_relational_combine_product(parity_sets_lattice: Type[Lattice],
+                                          available_equations_lattice: Type[Lattice]) -> Type[Lattice]:
+    """
+    The same lattice as create_relational_combine_product - a map from parity vectors to equations elements - but the
+    map is held inverted: every equations element is mapped to the set of parity vectors mapped to it, as an element
+    of parity_sets_lattice (the BDD lattice of ParityStaticAnalyzer, see create_bdd_tuple_subsets_lattice).
+    So the sets of an element are disjoint, and an element has one entry per distinct equations element instead of
+    one per parity vector - the top element is a single entry, for any number of variables.
+
+    It is built from pairs (parity set, equations element) which may overlap: the vectors in several sets are mapped
+    to the join of their equations elements, as in create_relational_combine_product.
+    """
+    parity_bottom = parity_sets_lattice.bottom()
+
+    def add_pair(mapping: Dict, parity_set, equations_element) -> None:
+        """
+        Adds a pair to an inverted map, keeping its sets disjoint.
+        """
+        for other_equations_element in list(mapping):
+            if parity_set == parity_bottom:
+                return
+            other_set = mapping.get(other_equations_element)
+            if other_set is None:
+                continue
+            overlap = parity_set.meet(other_set)
+            if overlap == parity_bottom:
+                continue
+            rest = other_set.difference(parity_set)
+            if rest == parity_bottom:
+                del mapping[other_equations_element]
+            else:
+                mapping[other_equations_element] = rest
+            joined = equations_element.join(other_equations_element)
+            mapping[joined] = mapping[joined].join(overlap) if joined in mapping else overlap
+            parity_set = parity_set.difference(other_set)
+        if parity_set != parity_bottom:
+            mapping[equations_element] = mapping[equations_element].join(parity_set) \
+                if equations_element in mapping else parity_set
+
+    class bdd_relational_product(Interned, Lattice):
+        __slots__ = ('mapping', 'tuples_set')
+
+        def __new__(cls, parity_sets_equations_pairs: Iterable[Tuple[parity_sets_lattice, available_equations_lattice]]):
+            mapping: Dict[available_equations_lattice, parity_sets_lattice] = {}
+            for parity_set, equations_element in parity_sets_equations_pairs:
+                add_pair(mapping, parity_set, equations_element)
+            return bdd_relational_product.from_mapping(mapping)
+
+        @staticmethod
+        def from_mapping(mapping: Dict[available_equations_lattice, parity_sets_lattice]) -> bdd_relational_product:
+            """
+            The mapping must already be inverted: its sets are disjoint and not empty.
+            """
+            tuples_set = frozenset(mapping.items())
+            return bdd_relational_product._intern(tuples_set, mapping=mapping, tuples_set=tuples_set)
+
+        @staticmethod
+        def top() -> bdd_relational_product:
+            return bdd_relational_product.from_mapping({available_equations_lattice.top(): parity_sets_lattice.top()})
+
+        @staticmethod
+        def bottom() -> bdd_relational_product:
+            return bdd_relational_product.from_mapping({})
+
+        def __le__(self: bdd_relational_product, other: bdd_relational_product) -> bool:
+            """
+            self <= other iff every parity vector of self is also in other,
+            and its equations element in self is <= its equations element in other.
+            """
+            all_other_vectors = parity_bottom
+            for other_set in other.mapping.values():
+                all_other_vectors = all_other_vectors.join(other_set)
+            for equations_element, parity_set in self.mapping.items():
+                if not parity_set <= all_other_vectors:
+                    return False
+                for other_equations_element, other_set in other.mapping.items():
+                    if parity_set.meet(other_set) != parity_bottom and not equations_element <= other_equations_element:
+                        return False
+            return True
+
+        def meet(self: bdd_relational_product, other: bdd_relational_product) -> bdd_relational_product:
+            mapping: Dict[available_equations_lattice, parity_sets_lattice] = {}
+            for equations_element, parity_set in self.mapping.items():
+                for other_equations_element, other_set in other.mapping.items():
+                    overlap = parity_set.meet(other_set)
+                    if overlap != parity_bottom:
+                        met = equations_element.meet(other_equations_element)
+                        mapping[met] = mapping[met].join(overlap) if met in mapping else overlap
+            return bdd_relational_product.from_mapping(mapping)
+
+        def join(self: bdd_relational_product, other: bdd_relational_product) -> bdd_relational_product:
+            mapping = dict(self.mapping)
+            for equations_element, parity_set in other.mapping.items():
+                add_pair(mapping, parity_set, equations_element)
+            return bdd_relational_product.from_mapping(mapping)
+
+        def __repr__(self) -> str:
+            set_of_strings = {f"<{parity_set.__repr__()}, {equations_element.__repr__()}>"
+                              for (equations_element, parity_set) in self.mapping.items()}
+            return set_of_strings.__repr__()
+
+        def __len__(self) -> int:
+            return sum(len(parity_set) for parity_set in self.mapping.values())
+
+        def groups(self) -> Iterator[Tuple[parity_sets_lattice, available_equations_lattice]]:
+            """
+            Yields the pairs (parity set, equations element) of the element.
+            """
+            for equations_element, parity_set in self.mapping.items():
+                yield parity_set, equations_element
+
+        def __iter__(self) -> Iterator[Tuple[object, available_equations_lattice]]:
+            """
+            Yields a pair (parity vector, equations element) for every parity vector, as relational_product does.
+            """
+            for equations_element, parity_set in self.mapping.items():
+                for parity_element in parity_set:
+                    yield parity_element, equations_element
+
+    return bdd_relational_product
+
 class ParitySummationRelationalProduct:
-    def __init__(self, variables, coefficiets_range: Tuple[int, int], integer_range: Tuple[int, int]):
+    def __init__(self, variables, coefficiets_range: Tuple[int, int], integer_range: Tuple[int, int],
+                 max_support: Union[int, None] = None, use_equations_cache: bool = False,
+                 explication_workers: int = 0, use_reduction: bool = False, use_bdd_parity: bool = False):
+        """
+        If use_reduction is True, every state is reduced after each command (see reduce()).
+        If use_bdd_parity is True, the parity vectors of every equations element are kept together as a BDD
+        (see create_bdd_relational_combine_product), instead of one entry per parity vector.
+        """
         self.variables: List[str] =  variables
+        self.use_reduction: bool = use_reduction
+        self.use_bdd_parity: bool = use_bdd_parity
 
-        self.parity_analyzer = ParityStaticAnalyzer(variables)
+        self.parity_analyzer = ParityStaticAnalyzer(variables, use_bdd=use_bdd_parity)
         self.tuple_class = self.parity_analyzer.tuple_class
 
-        self.summation_analyzer = SummationStaticAnalyzer(variables, coefficiets_range, integer_range)
+        self.summation_analyzer = SummationStaticAnalyzer(variables, coefficiets_range, integer_range, max_support,
+                                                          use_equations_cache, explication_workers)
         self.summation_lattice = self.summation_analyzer.lattice_class
 
-        self.lattice_class = create_relational_combine_product(self.tuple_class, self.summation_lattice)
+        if use_bdd_parity:
+            self.lattice_class = create_bdd_relational_combine_product(self.parity_analyzer.lattice_class,
+                                                                       self.summation_lattice)
+        else:
+            self.lattice_class = create_relational_combine_product(self.tuple_class, self.summation_lattice)
+
+
+    def compile_cfg(self, cfg) -> None:
+        self.parity_analyzer.compile_cfg(cfg)
+        self.summation_analyzer.compile_cfg(cfg)
+
+    def reduce(self, state):
+        """
+        The reduction of the product: every equation holds modulo 2, so a parity vector that contradicts
+        one of the equations it is paired with (for instance x EVEN, y EVEN and x - y = 1) is removed from the state.
+        """
+        assert isinstance(state, self.lattice_class)
+        if self.use_bdd_parity:
+            return self._reduce_groups(state)
+        reduced_mapping = {}
+        for parity_element, equations_element in state.mapping.items(): # type: ignore
+            if all(self.parity_analyzer._evaluate_parity_constraint_on_cartesian(odd_variables, odd_sum, parity_element)
+                   for odd_variables, odd_sum in self.summation_analyzer.get_parity_constraints(equations_element)):
+                reduced_mapping[parity_element] = equations_element
+        if len(reduced_mapping) == len(state.mapping): # type: ignore
+            return state
+        return self.lattice_class.from_mapping(reduced_mapping) # type: ignore
+
+    def _reduce_groups(self, state):
+        reduced_mapping = {}
+        for equations_element, parity_set in state.mapping.items(): # type: ignore
+            feasible = parity_set
+            for odd_variables, odd_sum in self.summation_analyzer.get_parity_constraints(equations_element):
+                feasible = feasible.meet(self.parity_analyzer.get_parity_constraint_element(odd_variables, odd_sum))
+            if feasible != feasible.bottom():
+                reduced_mapping[equations_element] = feasible
+        if reduced_mapping == state.mapping: # type: ignore
+            return state
+        return self.lattice_class.from_mapping(reduced_mapping) # type: ignore
 
+    def _evaluate_orcondition_on_group(self, or_condition: ORCondition, parity_set, equations_element):
+        """
+        Returns the parity vectors of the set on which the assertion fails, given the equations element.
+        The parity conditions of every disjunct are evaluated on the whole set at once (see get_andcondition_element).
+        """
+        print(f"\nEvalutaing {or_condition} on {parity_set} and {equations_element}")
+        set_of_equations = equations_element.equations_set # type: ignore
+        solution_without_sigma = solve_linear_equations(self.variables, set_of_equations, [])[0]
+        print(f"Solution for equations is given by: {solution_without_sigma}.")
+
+        satisfying = parity_set.bottom()
+        for and_condition in or_condition.disjunction_list:
+            if all(self.summation_analyzer._evaluate_boolcondition_on_set(bool_condition, set_of_equations)
+                   for bool_condition in and_condition.conjunction_list
+                   if bool_condition.boolcondition_type == BoolConditionType.B_Sum):
+                satisfying = satisfying.join(parity_set.meet(self.parity_analyzer.get_andcondition_element(and_condition)))
+        return parity_set.difference(satisfying)
 
     def _evaluate_boolcondition_on_tuple(self, bool_condition: BOOLCondition, parity_element, equations_element) -> bool:
         assert isinstance(parity_element, self.tuple_class)
@@ -136,29 +328,51 @@ class ParitySummationRelationalProduct:
         assert isinstance(current_state, self.lattice_class)
         command_type: CommandType = command.command_type
         current_set = current_state.tuples_set  # type: ignore
-        new_set: Set[Tuple[self.tuple_class, self.summation_lattice]] = set() # type: ignore
+
+        if command_type != CommandType.C_Assert and self.use_bdd_parity:
+            new_state = self.lattice_class(
+                (self.parity_analyzer.execute_command_from_abstract_state(parity_set, command),
+                 self.summation_analyzer.execute_command_from_abstract_state(equations_element, command))
+                for parity_set, equations_element in current_state.groups()) # type: ignore
+            if self.use_reduction:
+                return self.reduce(new_state)
+            return new_state
 
         if command_type != CommandType.C_Assert:
-            all_possible_equations_sets: List[self.summation_lattice] = list({t[1] for t in current_set}) # type: ignore
-            all_possible_equations_outcome = \
-                [self.summation_analyzer.execute_command_from_abstract_state(summation_element, command)
-                 for summation_element in all_possible_equations_sets] # type: ignore
+            # The tuples are grouped by their equations element, so that the summation command is executed once per group.
+            parity_elements_by_equations: Dict[self.summation_lattice, List[self.tuple_class]] = {} # type: ignore
             for (parity_element, equations_element) in current_set:
-                parity_cartesians_outcome: set = self.parity_analyzer.execute_command_on_carteisan(parity_element, command)
-                equactions_outcome = all_possible_equations_outcome[all_possible_equations_sets.index(equations_element)]
-                new_set.update({(parity, equactions_outcome) for parity in parity_cartesians_outcome})
+                parity_elements_by_equations.setdefault(equations_element, []).append(parity_element)
+            new_mapping: Dict[self.tuple_class, self.summation_lattice] = {} # type: ignore
+            for equations_element, parity_elements in parity_elements_by_equations.items():
+                equactions_outcome = self.summation_analyzer.execute_command_from_abstract_state(equations_element, command)
+                for parity_element in parity_elements:
+                    for parity in self.parity_analyzer.execute_compiled_command_on_carteisan(parity_element, command):
+                        if parity in new_mapping:
+                            new_mapping[parity] = new_mapping[parity].join(equactions_outcome)
+                        else:
+                            new_mapping[parity] = equactions_outcome
+            new_state = self.lattice_class.from_mapping(new_mapping) # type: ignore
+            if self.use_reduction:
+                return self.reduce(new_state)
+            return new_state
 
         if command_type == CommandType.C_Assert:
             or_condition: ORCondition = command.command_parameters['ORC']
             succes = True
+            if self.use_bdd_parity:
+                for parity_set, equations_element in current_state.groups(): # type: ignore
+                    failing = self._evaluate_orcondition_on_group(or_condition, parity_set, equations_element)
+                    if failing != failing.bottom():
+                        print(f"Assertion {or_condition} FAILED on <{failing}, {equations_element}>")
+                        succes = False
+                current_set = ()
             for (parity_element, equations_element) in current_set:
                 if not self._evaluate_orcondition_on_tuple(or_condition, parity_element, equations_element):
                     print(f"Assertion {or_condition} FAILED on <{parity_element}, {equations_element}>")
                     succes = False
             if succes:
                 print("\nAssertin succeded!!!")
-            
-            new_set = current_state.tuples_set.copy() # type: ignore
 
-        return self.lattice_class(parity_equations_tuples_set = new_set) # type: ignore
+        return current_state
 
@@ -1,22 +1,43 @@
 from __future__ import annotations
 
-from typing import List, Tuple, Type, Set, Iterator
-from lattice_creation import Lattice
-from saav_parser import ECondition, EConditionType, BOOLCondition, BoolConditionType, ANDCondition, ORCondition, Command, CommandType
+from typing import List, Tuple, Type, Set, FrozenSet, Dict, Iterator, Union
+from weakref import WeakKeyDictionary
+from lattice_creation import Lattice, Interned, memoized_factory
+from saav_parser import ECondition, EConditionType, BOOLCondition, BoolConditionType, ANDCondition, ORCondition, Command, CommandType, \
+    SymbolTable
 
-from equations import clear_variable_from_set, create_equation_class, get_all_possible_equations, solve_linear_equations, replace_variable_with_another
+from equations import clear_variable_from_set, create_equation_class, get_all_possible_equations, solve_linear_equations, replace_variable_with_another, \
+    get_incremental_possible_equations, get_candidate_equations
+from equations_matrix import get_equations_matrix
+from parallel_explication import get_explication_pool
 
 
+@memoized_factory
 def create_available_equations_lattice(EquationClass: Type, coefficiets_range: Tuple[int, int],
-                                       integer_range: Tuple[int, int]) -> Type[Lattice]:
-    ALL_EQUATIONS: List[EquationClass] = EquationClass.all_equations(minimal_coefficient=coefficiets_range[0],
-                                                                     maximal_coefficient=coefficiets_range[1],
-                                                                     minimal_integer=integer_range[0],
-                                                                     maximal_integer=integer_range[1])
+                                       integer_range: Tuple[int, int],
+                                       max_support: Union[int, None] = None,
+                                       equations_matrix=None) -> Type[Lattice]:
+    """
+    The equations are enumerated lazily - only the bottom element holds all of them.
+    If max_support is given, only equations with at most max_support non-zero coefficients are available.
+    If equations_matrix is given (see equations_matrix.py), the equations are read from it instead of enumerated.
+    """
+    def all_equations() -> Iterator[EquationClass]:
+        return get_candidate_equations(EquationClass,
+                                       minimal_coefficient=coefficiets_range[0],
+                                       maximal_coefficient=coefficiets_range[1],
+                                       minimal_integer=integer_range[0],
+                                       maximal_integer=integer_range[1],
+                                       max_support=max_support,
+                                       equations_matrix=equations_matrix)
+    bottom_elements: List[Lattice] = []  # The bottom element is enumerated once, and then kept.
     
-    class AvailableEquationsLattice(Lattice):
-        def __init__(self, equations_set: Set[EquationClass]):
-            self.equations_set: Set[EquationClass] = equations_set
+    class AvailableEquationsLattice(Interned, Lattice):
+        __slots__ = ('equations_set',)
+
+        def __new__(cls, equations_set: Set[EquationClass]):
+            equations_set = frozenset(equations_set)
+            return cls._intern(equations_set, equations_set=equations_set)
 
         @staticmethod
         def top() -> AvailableEquationsLattice:
@@ -24,10 +45,9 @@ def create_available_equations_lattice(EquationClass: Type, coefficiets_range: T
         
         @staticmethod
         def bottom() -> AvailableEquationsLattice:
-            return AvailableEquationsLattice(equations_set=set(ALL_EQUATIONS))
-        
-        def __eq__(self: AvailableEquationsLattice, other: AvailableEquationsLattice) -> bool:
-            return self.equations_set == other.equations_set
+            if not bottom_elements:
+                bottom_elements.append(AvailableEquationsLattice(equations_set=set(all_equations())))
+            return bottom_elements[0]
         
         def __le__(self: AvailableEquationsLattice, other: AvailableEquationsLattice) -> bool:
             return self.equations_set.issuperset(other.equations_set)
@@ -46,12 +66,6 @@ def create_available_equations_lattice(EquationClass: Type, coefficiets_range: T
                 return "...{" + first_ten_equations + f", ..., {string_equations[-1]}" + "}..."
             return self.equations_set.__repr__()
         
-        def __hash__(self) -> int:
-            return hash(self.__repr__())
-        
-        def copy(self: AvailableEquationsLattice):
-            return AvailableEquationsLattice({s.copy() for s in self.equations_set})
-        
         def __iter__(self) -> Iterator[EquationClass]:
             for element in self.equations_set:
                 yield element
@@ -80,23 +94,58 @@ def ae_example():
 
 
 class SummationStaticAnalyzer:
-    def __init__(self, variables: List[str], coefficiets_range: Tuple[int, int], integer_range: Tuple[int, int]):
+    def __init__(self, variables: List[str], coefficiets_range: Tuple[int, int], integer_range: Tuple[int, int],
+                 max_support: Union[int, None] = None, use_equations_cache: bool = False,
+                 explication_workers: int = 0):
+        """
+        If use_equations_cache is True, the candidate equations are enumerated once into a memory-mapped file
+        (see equations_matrix.py), which is shared by every analyzer and process with the same parameters.
+        If explication_workers > 1, explication is split between that many worker processes
+        (see parallel_explication.py). This uses the memory-mapped file as well.
+        """
         self.variables: List[str] = variables
+        # The ids of the variables are their positions, until compile_cfg binds the ids of the program.
+        self.variable_ids: Dict[str, int] = {variable: index for index, variable in enumerate(variables)}
         self.coefficiets_range = coefficiets_range
         self.integer_range = integer_range
+        self.max_support = max_support
         self.equations_class = create_equation_class(variables)
-        self.lattice_class: Type[Lattice] = create_available_equations_lattice(self.equations_class, coefficiets_range, integer_range)
+        self.explication_pool = get_explication_pool(explication_workers) if explication_workers > 1 else None
+        self.equations_matrix = get_equations_matrix(len(variables), coefficiets_range, integer_range, max_support) \
+            if use_equations_cache or self.explication_pool is not None else None
+        self.lattice_class: Type[Lattice] = create_available_equations_lattice(self.equations_class, coefficiets_range,
+                                                                               integer_range, max_support,
+                                                                               self.equations_matrix)
+        # Weakly keyed, so that the constraints do not keep the interned elements they were computed for alive.
+        self.parity_constraints: WeakKeyDictionary = WeakKeyDictionary()
+
+    def compile_cfg(self, cfg) -> None:
+        """
+        Binds the variable ids resolved by the program (see Program.symbol_table), which the transfer functions use.
+        """
+        symbol_table: SymbolTable = cfg.symbol_table
+        assert symbol_table.variable_names[:len(self.variables)] == list(self.variables)
+        self.variable_ids = symbol_table.variable_ids
+
+    def get_parity_constraints(self, equations_element) -> FrozenSet[Tuple[FrozenSet[str], bool]]:
+        """
+        The distinct parity constraints (see Equation.parity_constraint) of the equations of an element.
+        """
+        if equations_element not in self.parity_constraints:
+            self.parity_constraints[equations_element] = frozenset(equation.parity_constraint()
+                                                                   for equation in equations_element)
+        return self.parity_constraints[equations_element]
 
     def _evaluate_econdition_on_set(self, econdition: ECondition, set_of_equations: set) -> set:
         econdition_type: EConditionType = econdition.econdition_type
-        new_set: set = set_of_equations.copy()
+        new_set: set = set(set_of_equations)
 
         if econdition_type  == EConditionType.E_Equal_Var:      # i = j
             i_variable = econdition.econdition_parameters['i']
             j_variable = econdition.econdition_parameters['j']
             if i_variable != j_variable:
-                i_variable_index = self.variables.index(i_variable)
-                j_variable_index = self.variables.index(j_variable)
+                i_variable_index = self.variable_ids[i_variable]
+                j_variable_index = self.variable_ids[j_variable]
                 coefficients_for_equation = [0] * len(self.variables)
                 coefficients_for_equation[i_variable_index] = 1
                 coefficients_for_equation[j_variable_index] = -1
@@ -109,7 +158,7 @@ class SummationStaticAnalyzer:
         elif econdition_type == EConditionType.E_Equal_Const:     # i = K
             i_variable = econdition.econdition_parameters['i']
             K_value = econdition.econdition_parameters['K']
-            i_variable_index = self.variables.index(i_variable)
+            i_variable_index = self.variable_ids[i_variable]
             coefficients_for_equation = [0] * len(self.variables)
             coefficients_for_equation[i_variable_index] = 1
             coefficients_for_equation = tuple(coefficients_for_equation)
@@ -160,13 +209,15 @@ class SummationStaticAnalyzer:
     def execute_command_from_abstract_state(self, current_state, command: Command):
         assert isinstance(current_state, self.lattice_class)
         command_type: CommandType = command.command_type
-        new_set: Set[self.equations_class] = current_state.equations_set.copy() # type: ignore
+        new_set: Set[self.equations_class] = set(current_state.equations_set) # type: ignore
+        assigned_variable = None  # Set for commands which change only a single variable.
 
         if command_type == CommandType.C_Skip:
             pass
 
         if command.command_type == CommandType.C_Assign_Var:    # i := j
             i_variable = command.command_parameters['i']
+            assigned_variable = i_variable
             j_variable = command.command_parameters['j']
             if i_variable != j_variable:
                 new_set = clear_variable_from_set(new_set, i_variable)
@@ -179,9 +230,10 @@ class SummationStaticAnalyzer:
 
         if command.command_type == CommandType.C_Assign_Const:    # i := K
             i_variable = command.command_parameters['i']
+            assigned_variable = i_variable
             const = command.command_parameters['K']
             new_set = clear_variable_from_set(new_set, i_variable)
-            i_variable_index = self.variables.index(i_variable)
+            i_variable_index = self.variable_ids[i_variable]
             coefficients_for_equation = [0] * len(self.variables)
             coefficients_for_equation[i_variable_index] = 1
             coefficients_for_equation = tuple(coefficients_for_equation)
@@ -189,15 +241,17 @@ class SummationStaticAnalyzer:
         
         if command.command_type == CommandType.C_Assign_Unknown:    # i := ?
             i_variable = command.command_parameters['i']
+            assigned_variable = i_variable
             new_set = clear_variable_from_set(new_set, i_variable)
         
         if command.command_type == CommandType.C_Plus1:     # i := j + 1
             i_variable = command.command_parameters['i']
+            assigned_variable = i_variable
             j_variable = command.command_parameters['j']
             new_set = clear_variable_from_set(new_set, i_variable)
             if i_variable != j_variable:   # TODO is it neccecary?
-                i_variable_index = self.variables.index(i_variable)
-                j_variable_index = self.variables.index(j_variable)
+                i_variable_index = self.variable_ids[i_variable]
+                j_variable_index = self.variable_ids[j_variable]
                 coefficients_for_equation = [0] * len(self.variables)
                 coefficients_for_equation[i_variable_index] = 1
                 coefficients_for_equation[j_variable_index] = -1
@@ -206,11 +260,12 @@ class SummationStaticAnalyzer:
 
         if command.command_type == CommandType.C_Minus1:    # i := j - 1
             i_variable = command.command_parameters['i']
+            assigned_variable = i_variable
             j_variable = command.command_parameters['j']
             new_set = clear_variable_from_set(new_set, i_variable)
             if i_variable != j_variable:   # TODO is it neccecary?
-                i_variable_index = self.variables.index(i_variable)
-                j_variable_index = self.variables.index(j_variable)
+                i_variable_index = self.variable_ids[i_variable]
+                j_variable_index = self.variable_ids[j_variable]
                 coefficients_for_equation = [0] * len(self.variables)
                 coefficients_for_equation[i_variable_index] = 1
                 coefficients_for_equation[j_variable_index] = -1
@@ -231,12 +286,28 @@ class SummationStaticAnalyzer:
         # Finally - we explicate.
         if new_set != current_state.equations_set: # type: ignore
             print(f"Explicating the set {self.lattice_class(equations_set=new_set)}.")
-            new_set = get_all_possible_equations(EquationClass=self.equations_class,
-                                                list_of_equations=list(new_set),
-                                                minimal_coefficient=self.coefficiets_range[0],
-                                                maximal_coefficient=self.coefficiets_range[1],
-                                                minimal_integer=self.integer_range[0],
-                                                maximal_integer=self.integer_range[1])
+            if assigned_variable is not None:
+                new_set = get_incremental_possible_equations(EquationClass=self.equations_class,
+                                                             previous_closure=current_state.equations_set, # type: ignore
+                                                             assigned_variable=assigned_variable,
+                                                             new_equations=[eq for eq in new_set if assigned_variable in eq],
+                                                             minimal_coefficient=self.coefficiets_range[0],
+                                                             maximal_coefficient=self.coefficiets_range[1],
+                                                             minimal_integer=self.integer_range[0],
+                                                             maximal_integer=self.integer_range[1],
+                                                             max_support=self.max_support,
+                                                             equations_matrix=self.equations_matrix,
+                                                             explication_pool=self.explication_pool)
+            else:
+                new_set = get_all_possible_equations(EquationClass=self.equations_class,
+                                                     list_of_equations=list(new_set),
+                                                     minimal_coefficient=self.coefficiets_range[0],
+                                                     maximal_coefficient=self.coefficiets_range[1],
+                                                     minimal_integer=self.integer_range[0],
+                                                     maximal_integer=self.integer_range[1],
+                                                     max_support=self.max_support,
+                                                     equations_matrix=self.equations_matrix,
+                                                     explication_pool=self.explication_pool)
         else:
             print(f"No need to explicate the set, it remains the same after {command}.")
         return self.lattice_class(equations_set=new_set) # type: ignore
@@ -0,0 +1,169 @@
+"""
+A small pure-Python package of reduced ordered binary decision diagrams (ROBDDs).
+
+A BDD is the id (an int) of a node in the table of its BDDManager. The table is shared by all the BDDs of a manager,
+and a node is created only if no equal node exists, so two BDDs represent the same boolean function iff
+they have the same id. Levels are the boolean variables, ordered from 0 (the root) to number_of_levels - 1.
+Nodes are never removed from the table, so a manager should live as long as the analysis that uses it.
+"""
+from __future__ import annotations
+
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Tuple
+
+FALSE = 0
+TRUE = 1
+CACHE_LIMIT = 1 << 20  # The operation caches are cleared when they grow beyond this many entries.
+
+
+class BDDManager:
+    def __init__(self, number_of_levels: int):
+        self.number_of_levels: int = number_of_levels
+        # The terminals are at level number_of_levels, below every variable.
+        self.levels: List[int] = [number_of_levels, number_of_levels]
+        self.lows: List[int] = [FALSE, TRUE]
+        self.highs: List[int] = [FALSE, TRUE]
+        self.unique_table: Dict[Tuple[int, int, int], int] = {}
+        self.apply_cache: Dict[Tuple[str, int, int], int] = {}
+        self.exists_cache: Dict[Tuple[int, FrozenSet[int]], int] = {}
+        self.count_cache: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def __repr__(self) -> str:
+        return f"BDDManager({self.number_of_levels} levels, {len(self)} nodes)"
+
+    def node(self, level: int, low: int, high: int) -> int:
+        """
+        Returns the node "if level then high else low", reduced and unique.
+        """
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique_table.get(key)
+        if node is None:
+            node = len(self.levels)
+            self.levels.append(level)
+            self.lows.append(low)
+            self.highs.append(high)
+            self.unique_table[key] = node
+        return node
+
+    def literal(self, level: int, value: bool = True) -> int:
+        return self.node(level, FALSE, TRUE) if value else self.node(level, TRUE, FALSE)
+
+    def apply(self, operation: str, u: int, v: int) -> int:
+        """
+        Applies a binary operation - 'and', 'or' or 'diff' (u and not v) - to two BDDs.
+        """
+        if operation == 'and':
+            if u == FALSE or v == FALSE:
+                return FALSE
+            if u == TRUE or u == v:
+                return v
+            if v == TRUE:
+                return u
+            if u > v:
+                u, v = v, u
+        elif operation == 'or':
+            if u == TRUE or v == TRUE:
+                return TRUE
+            if u == FALSE or u == v:
+                return v
+            if v == FALSE:
+                return u
+            if u > v:
+                u, v = v, u
+        elif operation == 'diff':
+            if u == FALSE or v == TRUE or u == v:
+                return FALSE
+            if v == FALSE:
+                return u
+        else:
+            raise ValueError(f"Ilegal BDD operation: {operation}.")
+
+        key = (operation, u, v)
+        result = self.apply_cache.get(key)
+        if result is None:
+            u_level, v_level = self.levels[u], self.levels[v]
+            level = min(u_level, v_level)
+            u_low, u_high = (self.lows[u], self.highs[u]) if u_level == level else (u, u)
+            v_low, v_high = (self.lows[v], self.highs[v]) if v_level == level else (v, v)
+            result = self.node(level, self.apply(operation, u_low, v_low), self.apply(operation, u_high, v_high))
+            if len(self.apply_cache) >= CACHE_LIMIT:
+                self.apply_cache.clear()
+            self.apply_cache[key] = result
+        return result
+
+    def conjunction(self, nodes: Iterable[int]) -> int:
+        result = TRUE
+        for node in nodes:
+            result = self.apply('and', result, node)
+        return result
+
+    def disjunction(self, nodes: Iterable[int]) -> int:
+        result = FALSE
+        for node in nodes:
+            result = self.apply('or', result, node)
+        return result
+
+    def exists(self, u: int, levels: FrozenSet[int]) -> int:
+        """
+        Existentially quantifies the variables of the given levels out of u.
+        """
+        if u <= TRUE or not levels or self.levels[u] > max(levels):
+            return u
+        key = (u, levels)
+        result = self.exists_cache.get(key)
+        if result is None:
+            low = self.exists(self.lows[u], levels)
+            high = self.exists(self.highs[u], levels)
+            if self.levels[u] in levels:
+                result = self.apply('or', low, high)
+            else:
+                result = self.node(self.levels[u], low, high)
+            if len(self.exists_cache) >= CACHE_LIMIT:
+                self.exists_cache.clear()
+            self.exists_cache[key] = result
+        return result
+
+    def count(self, u: int) -> int:
+        """
+        Returns the number of assignments to all the levels that satisfy u.
+        """
+        return self._count_from_level(u) << self.levels[u]
+
+    def _count_from_level(self, u: int) -> int:
+        # The number of satisfying assignments to the levels from u's level and below.
+        if u <= TRUE:
+            return u
+        result = self.count_cache.get(u)
+        if result is None:
+            level = self.levels[u]
+            low, high = self.lows[u], self.highs[u]
+            result = (self._count_from_level(low) << (self.levels[low] - level - 1)) + \
+                     (self._count_from_level(high) << (self.levels[high] - level - 1))
+            self.count_cache[u] = result
+        return result
+
+    def assignments(self, u: int) -> Iterator[Tuple[bool, ...]]:
+        """
+        Lazily yields every assignment to all the levels that satisfies u, in increasing binary order
+        (level 0 is the most significant).
+        """
+        def assignments_from_level(node: int, level: int) -> Iterator[Tuple[bool, ...]]:
+            if node == FALSE:
+                return
+            if level == self.number_of_levels:
+                yield ()
+                return
+            if self.levels[node] > level:  # The variable of this level does not matter.
+                low, high = node, node
+            else:
+                low, high = self.lows[node], self.highs[node]
+            for rest in assignments_from_level(low, level + 1):
+                yield (False, ) + rest
+            for rest in assignments_from_level(high, level + 1):
+                yield (True, ) + rest
+
+        return assignments_from_level(u, 0)
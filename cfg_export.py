@@ -0,0 +1,111 @@
+"""
+Exports a control flow graph to DOT, GraphML or JSON, for viewing large programs without plot_graph.
+
+The graph is written node by node and edge by edge straight from the adjacency of the ControlFlowGraph (its dense
+node ids and outgoing lines), so nothing is laid out and no display is needed. Every node can be annotated with its
+state in a fixpoint (the result of chaotic_iteration) and with a visit count (as counted by chaotic_iteration, or the
+number of concrete states ConcreteStateExplorer reached there).
+"""
+import json
+from pathlib import Path
+from typing import Dict, Iterator, TextIO, Tuple, Union
+from xml.sax.saxutils import escape
+
+from control_flow_graph import ControlFlowGraph
+from saav_parser import ProgramLine
+
+EXPORT_FORMATS = {".dot": "dot", ".gv": "dot", ".graphml": "graphml", ".json": "json"}
+
+
+def node_annotations(cfg: ControlFlowGraph, states: Union[Dict[int, object], None],
+                     visit_counts: Union[Dict[int, int], None]) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    Yields every label, in the order of the dense node ids, with its annotations.
+    """
+    for label in cfg.node_ids:
+        annotations: Dict[str, str] = {}
+        if states is not None and label in states:
+            annotations["state"] = str(states[label])
+        if visit_counts is not None:
+            annotations["visits"] = str(visit_counts.get(label, 0))
+        yield label, annotations
+
+
+def edges(cfg: ControlFlowGraph) -> Iterator[ProgramLine]:
+    for program_lines in cfg.outgoing_lines:
+        yield from program_lines
+
+
+def dot_string(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def write_dot(cfg: ControlFlowGraph, output: TextIO, states: Union[Dict[int, object], None] = None,
+              visit_counts: Union[Dict[int, int], None] = None) -> None:
+    output.write("digraph cfg {\n")
+    for label, annotations in node_annotations(cfg, states, visit_counts):
+        node_label = "\n".join([f"L{label}"] + [f"{key}: {value}" for key, value in annotations.items()])
+        output.write(f"  L{label} [label={dot_string(node_label)}];\n")
+    for program_line in edges(cfg):
+        output.write(f"  L{program_line.start_label} -> L{program_line.end_label} "
+                     f"[label={dot_string(str(program_line.command))}];\n")
+    output.write("}\n")
+
+
+def write_graphml(cfg: ControlFlowGraph, output: TextIO, states: Union[Dict[int, object], None] = None,
+                  visit_counts: Union[Dict[int, int], None] = None) -> None:
+    output.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                 '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+                 '  <key id="state" for="node" attr.name="state" attr.type="string"/>\n'
+                 '  <key id="visits" for="node" attr.name="visits" attr.type="int"/>\n'
+                 '  <key id="command" for="edge" attr.name="command" attr.type="string"/>\n'
+                 '  <graph id="cfg" edgedefault="directed">\n')
+    for label, annotations in node_annotations(cfg, states, visit_counts):
+        output.write(f'    <node id="L{label}">')
+        for key, value in annotations.items():
+            output.write(f'<data key="{key}">{escape(value)}</data>')
+        output.write('</node>\n')
+    for program_line in edges(cfg):
+        output.write(f'    <edge source="L{program_line.start_label}" target="L{program_line.end_label}">'
+                     f'<data key="command">{escape(str(program_line.command))}</data></edge>\n')
+    output.write('  </graph>\n</graphml>\n')
+
+
+def write_json(cfg: ControlFlowGraph, output: TextIO, states: Union[Dict[int, object], None] = None,
+               visit_counts: Union[Dict[int, int], None] = None) -> None:
+    """
+    Writes {"variables": [...], "start": label, "nodes": [{"label": ..., ...}], "edges": [{"source": ...,
+    "target": ..., "command": ...}]}, one node or edge per line.
+    """
+    output.write(f'{{"variables": {json.dumps(cfg.program.program_variables)}, '
+                 f'"start": {cfg.find_start_label()},\n "nodes": [')
+    separator = "\n  "
+    for label, annotations in node_annotations(cfg, states, visit_counts):
+        node = {"label": label}
+        node.update({key: int(value) if key == "visits" else value for key, value in annotations.items()})
+        output.write(separator + json.dumps(node))
+        separator = ",\n  "
+    output.write('],\n "edges": [')
+    separator = "\n  "
+    for program_line in edges(cfg):
+        output.write(separator + json.dumps({"source": program_line.start_label, "target": program_line.end_label,
+                                             "command": str(program_line.command)}))
+        separator = ",\n  "
+    output.write(']}\n')
+
+
+WRITERS = {"dot": write_dot, "graphml": write_graphml, "json": write_json}
+
+
+def export_cfg(cfg: ControlFlowGraph, path: Path, states: Union[Dict[int, object], None] = None,
+               visit_counts: Union[Dict[int, int], None] = None, export_format: Union[str, None] = None) -> None:
+    """
+    Writes the graph to path, in export_format ("dot", "graphml" or "json"), or by default in the format of the
+    suffix of path.
+    """
+    if export_format is None:
+        if path.suffix not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format for {path}, expected one of {', '.join(EXPORT_FORMATS)}.")
+        export_format = EXPORT_FORMATS[path.suffix]
+    with open(path, "w", encoding="utf-8") as output:
+        WRITERS[export_format](cfg, output, states, visit_counts)
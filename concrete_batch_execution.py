@@ -0,0 +1,205 @@
+"""
+Runs a program concretely on a whole batch of states at once, following the semantics of ConcreteState.
+
+The batch is held in NumPy arrays with one lane (column) per state: values[v, lane] is the value of the variable
+whose symbol table id is v, and defined[v, lane] tells whether it is defined. Unlike run_cfg, an assignment
+"i := ?" gives every lane a value sampled from a seeded random generator, and branches do not stop the run -
+every lane takes one of the edges enabled for it (uniformly at random when several are), so lanes are split
+between the edges by masks. A lane stops when it reaches a label without outgoing edges, when no edge is enabled
+for it, or when it fails an assertion. The number of lanes passing and failing each assertion is reported.
+"""
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+from control_flow_graph import ControlFlowGraph
+from saav_parser import Command, CommandType, ECondition, EConditionType, ORCondition, BOOLCondition, \
+    BoolConditionType, ProgramLine, SymbolTable
+
+RUNNING = 0
+FINISHED = 1   # Reached a label without outgoing edges.
+BLOCKED = 2    # No outgoing edge was enabled.
+FAILED = 3     # Failed an assertion.
+STATUS_NAMES = {RUNNING: "running", FINISHED: "finished", BLOCKED: "blocked", FAILED: "failed"}
+
+
+class BatchResult:
+    def __init__(self, labels: np.ndarray, status: np.ndarray, values: np.ndarray, defined: np.ndarray,
+                 assertion_counts: Dict[ProgramLine, List[int]], steps: int, symbol_table: SymbolTable):
+        self.labels: np.ndarray = labels                # The label each lane stopped at.
+        self.status: np.ndarray = status                # RUNNING (cut off by max_steps), FINISHED, BLOCKED or FAILED.
+        self.values: np.ndarray = values
+        self.defined: np.ndarray = defined
+        self.assertion_counts: Dict[ProgramLine, List[int]] = assertion_counts  # [passed, failed] per assertion.
+        self.steps: int = steps
+        self.symbol_table: SymbolTable = symbol_table
+
+    def count(self, status: int) -> int:
+        return int(np.count_nonzero(self.status == status))
+
+    def __repr__(self) -> str:
+        s = f"Ran {len(self.status)} states for {self.steps} steps: " + \
+            ", ".join(f"{self.count(status)} {name}" for status, name in STATUS_NAMES.items()) + "."
+        for program_line, (passed, failed) in self.assertion_counts.items():
+            s += f"\n{program_line}: passed {passed} times, failed {failed} times."
+        return s
+
+
+class BatchConcreteExecutor:
+    def __init__(self, cfg: ControlFlowGraph, batch_size: int, seed: int = 0,
+                 unknown_range: Tuple[int, int] = (-10, 10), max_steps: int = 10000):
+        """
+        Values assigned by "i := ?" are sampled uniformly from unknown_range (inclusive).
+        Lanes still running after max_steps steps are cut off.
+        """
+        self.cfg: ControlFlowGraph = cfg
+        self.batch_size: int = batch_size
+        self.random: np.random.Generator = np.random.default_rng(seed)
+        self.unknown_range: Tuple[int, int] = unknown_range
+        self.max_steps: int = max_steps
+
+        self.symbol_table: SymbolTable = cfg.symbol_table
+        self.variable_ids: Dict[str, int] = self.symbol_table.variable_ids
+
+        self.labels: List[int] = list(cfg.node_ids)  # The label of every dense node id.
+        self.start_id: int = cfg.node_ids[cfg.find_start_label()]
+        self.outgoing_lines: List[List[ProgramLine]] = cfg.outgoing_lines
+
+    def run(self, initial_values: Union[Dict[str, np.ndarray], None] = None) -> BatchResult:
+        """
+        Runs the batch from the starting label. All variables are undefined at the start, except for those given
+        initial_values (an array of batch_size values, or a single value, per variable).
+        """
+        number_of_variables = len(self.symbol_table)
+        values = np.zeros((number_of_variables, self.batch_size), dtype=np.int64)
+        defined = np.zeros((number_of_variables, self.batch_size), dtype=bool)
+        for variable, initial_value in (initial_values or {}).items():
+            variable_id = self.variable_ids[variable]
+            values[variable_id] = initial_value
+            defined[variable_id] = True
+
+        nodes = np.full(self.batch_size, self.start_id, dtype=np.int64)
+        status = np.full(self.batch_size, RUNNING, dtype=np.int8)
+        assertion_counts: Dict[ProgramLine, List[int]] = {program_line: [0, 0]
+                                                          for program_lines in self.outgoing_lines
+                                                          for program_line in program_lines
+                                                          if program_line.command.command_type == CommandType.C_Assert}
+
+        steps = 0
+        while steps < self.max_steps:
+            running = status == RUNNING
+            if not running.any():
+                break
+            current_nodes = nodes.copy()  # Lanes move during the step, so they are grouped by their node before it.
+            for node_id in np.unique(current_nodes[running]):
+                lanes = np.flatnonzero(running & (current_nodes == node_id))
+                self._step(int(node_id), lanes, values, defined, nodes, status, assertion_counts)
+            steps += 1
+
+        labels = np.array(self.labels, dtype=np.int64)[nodes]
+        return BatchResult(labels, status, values, defined, assertion_counts, steps, self.symbol_table)
+
+    def _step(self, node_id: int, lanes: np.ndarray, values: np.ndarray, defined: np.ndarray,
+              nodes: np.ndarray, status: np.ndarray, assertion_counts: Dict[ProgramLine, List[int]]) -> None:
+        program_lines = self.outgoing_lines[node_id]
+        if not program_lines:
+            status[lanes] = FINISHED
+            return
+
+        enabled = np.stack([self._is_enabled(program_line.command, lanes, values, defined)
+                            for program_line in program_lines])
+        # Every lane takes an enabled edge of the highest random key; disabled edges get the key -1.
+        keys = self.random.random(enabled.shape)
+        keys[~enabled] = -1
+        choices = keys.argmax(axis=0)
+        has_enabled_edge = enabled.any(axis=0)
+        status[lanes[~has_enabled_edge]] = BLOCKED
+
+        for index, program_line in enumerate(program_lines):
+            taking_lanes = lanes[has_enabled_edge & (choices == index)]
+            if taking_lanes.size == 0:
+                continue
+            command = program_line.command
+            if command.command_type == CommandType.C_Assert:
+                holds = self._evaluate_orcondition(command.command_parameters["ORC"], taking_lanes, values, defined)
+                assertion_counts[program_line][0] += int(np.count_nonzero(holds))
+                assertion_counts[program_line][1] += int(np.count_nonzero(~holds))
+                status[taking_lanes[~holds]] = FAILED
+                taking_lanes = taking_lanes[holds]
+            else:
+                self._execute(command, taking_lanes, values, defined)
+            nodes[taking_lanes] = self.cfg.node_ids[program_line.end_label]
+
+    def _is_enabled(self, command: Command, lanes: np.ndarray, values: np.ndarray, defined: np.ndarray) -> np.ndarray:
+        # As in ConcreteState.is_possible_to_execute_command.
+        command_type = command.command_type
+        if command_type in {CommandType.C_Assign_Var, CommandType.C_Plus1, CommandType.C_Minus1}:
+            return defined[self.variable_ids[command.command_parameters["j"]], lanes]
+        if command_type == CommandType.C_Assume:
+            return self._evaluate_econdition(command.command_parameters["E"], lanes, values, defined)
+        return np.ones(lanes.size, dtype=bool)
+
+    def _execute(self, command: Command, lanes: np.ndarray, values: np.ndarray, defined: np.ndarray) -> None:
+        command_type = command.command_type
+        if command_type in {CommandType.C_Skip, CommandType.C_Assume}:
+            return
+
+        i_id = self.variable_ids[command.command_parameters["i"]]
+        if command_type == CommandType.C_Assign_Const:
+            values[i_id, lanes] = command.command_parameters["K"]
+        elif command_type == CommandType.C_Assign_Unknown:
+            values[i_id, lanes] = self.random.integers(self.unknown_range[0], self.unknown_range[1] + 1, size=lanes.size)
+        else:
+            j_values = values[self.variable_ids[command.command_parameters["j"]], lanes]
+            if command_type == CommandType.C_Plus1:
+                j_values = j_values + 1
+            elif command_type == CommandType.C_Minus1:
+                j_values = j_values - 1
+            values[i_id, lanes] = j_values
+        defined[i_id, lanes] = True
+
+    def _evaluate_econdition(self, econdition: ECondition, lanes: np.ndarray, values: np.ndarray,
+                             defined: np.ndarray) -> np.ndarray:
+        econdition_type = econdition.econdition_type
+        if econdition_type == EConditionType.E_True:
+            return np.ones(lanes.size, dtype=bool)
+        if econdition_type == EConditionType.E_False:
+            return np.zeros(lanes.size, dtype=bool)
+
+        i_id = self.variable_ids[econdition.econdition_parameters["i"]]
+        is_defined = defined[i_id, lanes]
+        if econdition_type in {EConditionType.E_Equal_Var, EConditionType.E_Diff_Var}:
+            j_id = self.variable_ids[econdition.econdition_parameters["j"]]
+            is_defined = is_defined & defined[j_id, lanes]
+            other_values = values[j_id, lanes]
+        else:
+            other_values = econdition.econdition_parameters["K"]
+        if econdition_type in {EConditionType.E_Equal_Var, EConditionType.E_Equal_Const}:
+            return is_defined & (values[i_id, lanes] == other_values)
+        return is_defined & (values[i_id, lanes] != other_values)
+
+    def _evaluate_orcondition(self, or_condition: ORCondition, lanes: np.ndarray, values: np.ndarray,
+                              defined: np.ndarray) -> np.ndarray:
+        holds = np.zeros(lanes.size, dtype=bool)
+        for and_condition in or_condition.disjunction_list:
+            and_holds = np.ones(lanes.size, dtype=bool)
+            for bool_condition in and_condition.conjunction_list:
+                and_holds &= self._evaluate_boolcondition(bool_condition, lanes, values, defined)
+            holds |= and_holds
+        return holds
+
+    def _evaluate_boolcondition(self, bool_condition: BOOLCondition, lanes: np.ndarray, values: np.ndarray,
+                                defined: np.ndarray) -> np.ndarray:
+        parameters = bool_condition.boolcondition_parameters
+        if bool_condition.boolcondition_type == BoolConditionType.B_Sum:
+            i_ids = [self.variable_ids[variable] for variable in parameters["i_vec"]]
+            j_ids = [self.variable_ids[variable] for variable in parameters["j_vec"]]
+            # A sum over an undefined variable does not hold.
+            is_defined = defined[np.ix_(i_ids, lanes)].all(axis=0) & defined[np.ix_(j_ids, lanes)].all(axis=0)
+            return is_defined & (values[np.ix_(i_ids, lanes)].sum(axis=0) == values[np.ix_(j_ids, lanes)].sum(axis=0))
+
+        i_id = self.variable_ids[parameters["i"]]
+        is_even = values[i_id, lanes] % 2 == 0
+        if bool_condition.boolcondition_type == BoolConditionType.B_Even:
+            return defined[i_id, lanes] & is_even
+        return defined[i_id, lanes] & ~is_even
@@ -0,0 +1,175 @@
+"""
+A concrete interpreter with the semantics of ControlFlowGraph.run_cfg, for long-running programs.
+
+The program is compiled once: every edge becomes a guard (whether the edge can be taken, as
+ConcreteState.is_possible_to_execute_command) and an effect (as ConcreteState.execute_command_from_concrete_state),
+both closures over the symbol table ids of their variables, and every label gets the tuple of its outgoing edges.
+The state is a list of slots, one per variable, updated in place - run_cfg stops as soon as two edges are possible,
+so no state is ever shared between two successors.
+
+Unlike ConcreteState, which raises a TypeError, a SUM condition over an undefined or unknown variable does not hold,
+so such an assertion fails.
+"""
+from enum import Enum
+from typing import Callable, List, Tuple, Union
+
+from concrete_state import ConcreteState, UNKNOWN, UNDEFINED
+from control_flow_graph import ControlFlowGraph
+from saav_parser import Command, CommandType, ECondition, EConditionType, ORCondition, BOOLCondition, \
+    BoolConditionType, ProgramLine, SymbolTable
+
+Slots = List[Union[int, str]]
+Guard = Union[Callable[[Slots], bool], None]    # None for edges which can always be taken.
+Effect = Union[Callable[[Slots], bool], None]   # Returns False on a failed assertion. None for no effect.
+Instruction = Tuple[Guard, Effect, int, ProgramLine]  # The guard, the effect, the successor node id and the line.
+
+
+class RunStatus(Enum):
+    SUCCESS = 1                 # Reached a label without outgoing edges.
+    NO_POSSIBLE_EDGE = 2
+    SEVERAL_POSSIBLE_EDGES = 3
+    FAILED_ASSERTION = 4
+    STEP_LIMIT = 5
+
+
+class RunResult:
+    def __init__(self, status: RunStatus, label: int, state: ConcreteState, steps: int,
+                 program_line: Union[ProgramLine, None]):
+        self.status: RunStatus = status
+        self.label: int = label                     # The label the run stopped at.
+        self.state: ConcreteState = state
+        self.steps: int = steps
+        self.program_line: Union[ProgramLine, None] = program_line  # The failed assertion, if any.
+
+    def __repr__(self) -> str:
+        if self.status == RunStatus.SUCCESS:
+            return f"SUCESS! Reached an ending line with the state: {self.state}."
+        if self.status == RunStatus.FAILED_ASSERTION:
+            return f"The assertion {self.program_line.command} was failed on state: {self.state}."
+        if self.status == RunStatus.STEP_LIMIT:
+            return f"Stopped at L{self.label} after {self.steps} steps with the state: {self.state}."
+        way = "no way" if self.status == RunStatus.NO_POSSIBLE_EDGE else "more than one way"
+        return f"Running FAILED!\nTried to advance from L{self.label} when the state is: {self.state}\n" \
+               f"but there was {way} to do so."
+
+
+class ConcreteInterpreter:
+    def __init__(self, cfg: ControlFlowGraph):
+        self.cfg: ControlFlowGraph = cfg
+        self.symbol_table: SymbolTable = cfg.symbol_table
+
+        self.labels: List[int] = list(cfg.node_ids)  # The label of every dense node id.
+        self.start_id: int = cfg.node_ids[cfg.find_start_label()]
+        self.instructions: List[Tuple[Instruction, ...]] = [
+            tuple((self.compile_guard(program_line.command), self.compile_effect(program_line.command),
+                   cfg.node_ids[program_line.end_label], program_line) for program_line in program_lines)
+            for program_lines in cfg.outgoing_lines]
+
+    def run(self, max_steps: Union[int, None] = None) -> RunResult:
+        slots: Slots = [UNDEFINED] * len(self.symbol_table)
+        instructions = self.instructions
+        node_id = self.start_id
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            outgoing_instructions = instructions[node_id]
+            if not outgoing_instructions:
+                return self._result(RunStatus.SUCCESS, node_id, slots, steps)
+
+            chosen_instruction = None
+            for instruction in outgoing_instructions:
+                guard = instruction[0]
+                if guard is None or guard(slots):
+                    if chosen_instruction is not None:
+                        return self._result(RunStatus.SEVERAL_POSSIBLE_EDGES, node_id, slots, steps)
+                    chosen_instruction = instruction
+            if chosen_instruction is None:
+                return self._result(RunStatus.NO_POSSIBLE_EDGE, node_id, slots, steps)
+
+            _, effect, successor_id, program_line = chosen_instruction
+            if effect is not None and not effect(slots):
+                return self._result(RunStatus.FAILED_ASSERTION, node_id, slots, steps, program_line)
+            node_id = successor_id
+            steps += 1
+        return self._result(RunStatus.STEP_LIMIT, node_id, slots, steps)
+
+    def _result(self, status: RunStatus, node_id: int, slots: Slots, steps: int,
+                program_line: Union[ProgramLine, None] = None) -> RunResult:
+        state = ConcreteState()
+        for variable, value in zip(self.symbol_table, slots):
+            if value != UNDEFINED:
+                state[variable] = value
+        return RunResult(status, self.labels[node_id], state, steps, program_line)
+
+    def compile_guard(self, command: Command) -> Guard:
+        command_type = command.command_type
+        if command_type in {CommandType.C_Assign_Var, CommandType.C_Plus1, CommandType.C_Minus1}:
+            j = self.symbol_table[command.command_parameters['j']]
+            return lambda slots: type(slots[j]) is int
+        if command_type == CommandType.C_Assume:
+            return self.compile_econdition(command.command_parameters['E'])
+        return None
+
+    def compile_effect(self, command: Command) -> Effect:
+        command_type = command.command_type
+        if command_type in {CommandType.C_Skip, CommandType.C_Assume}:
+            return None
+        if command_type == CommandType.C_Assert:
+            return self.compile_orcondition(command.command_parameters['ORC'])
+
+        i = self.symbol_table[command.command_parameters['i']]
+        if command_type == CommandType.C_Assign_Const:
+            K = command.command_parameters['K']
+            def effect(slots: Slots) -> bool:
+                slots[i] = K
+                return True
+        elif command_type == CommandType.C_Assign_Unknown:
+            def effect(slots: Slots) -> bool:
+                slots[i] = UNKNOWN
+                return True
+        else:
+            j = self.symbol_table[command.command_parameters['j']]
+            addend = {CommandType.C_Assign_Var: 0, CommandType.C_Plus1: 1, CommandType.C_Minus1: -1}[command_type]
+            def effect(slots: Slots) -> bool:
+                slots[i] = slots[j] + addend
+                return True
+        return effect
+
+    def compile_econdition(self, econdition: ECondition) -> Guard:
+        econdition_type = econdition.econdition_type
+        if econdition_type == EConditionType.E_True:
+            return None
+        if econdition_type == EConditionType.E_False:
+            return lambda slots: False
+
+        i = self.symbol_table[econdition.econdition_parameters['i']]
+        if econdition_type == EConditionType.E_Equal_Var:
+            j = self.symbol_table[econdition.econdition_parameters['j']]
+            return lambda slots: type(slots[i]) is int and slots[i] == slots[j]
+        if econdition_type == EConditionType.E_Diff_Var:
+            j = self.symbol_table[econdition.econdition_parameters['j']]
+            return lambda slots: type(slots[i]) is int and type(slots[j]) is int and slots[i] != slots[j]
+        K = econdition.econdition_parameters['K']
+        if econdition_type == EConditionType.E_Equal_Const:
+            return lambda slots: slots[i] == K
+        return lambda slots: type(slots[i]) is int and slots[i] != K
+
+    def compile_orcondition(self, or_condition: ORCondition) -> Callable[[Slots], bool]:
+        and_conditions = [[self.compile_boolcondition(bool_condition)
+                           for bool_condition in and_condition.conjunction_list]
+                          for and_condition in or_condition.disjunction_list]
+        return lambda slots: any(all(bool_condition(slots) for bool_condition in and_condition)
+                                 for and_condition in and_conditions)
+
+    def compile_boolcondition(self, bool_condition: BOOLCondition) -> Callable[[Slots], bool]:
+        parameters = bool_condition.boolcondition_parameters
+        if bool_condition.boolcondition_type == BoolConditionType.B_Sum:
+            i_vec = [self.symbol_table[variable] for variable in parameters['i_vec']]
+            j_vec = [self.symbol_table[variable] for variable in parameters['j_vec']]
+            # A sum over an undefined (or unknown) variable does not hold, as in BatchConcreteExecutor.
+            summed = i_vec + j_vec
+            return lambda slots: all(type(slots[v]) is int for v in summed) and \
+                sum([slots[i] for i in i_vec]) == sum([slots[j] for j in j_vec])
+
+        i = self.symbol_table[parameters['i']]
+        remainder = 0 if bool_condition.boolcondition_type == BoolConditionType.B_Even else 1
+        return lambda slots: type(slots[i]) is int and slots[i] % 2 == remainder
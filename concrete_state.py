@@ -1,4 +1,4 @@
-from saav_parser.constants import VARIABLE_NAMES
+from saav_parser import is_variable_name
 from saav_parser import Command, CommandType, ECondition, EConditionType, ORCondition, \
     ANDCondition, BOOLCondition, BoolConditionType
 from typing import List
@@ -8,19 +8,19 @@ UNDEFINED = "Undefined"
 
 class ConcreteState:
     """
-    Represents a map from each variable in VARIABLE_NAMES to one of the following:
+    Represents a map from each variable to one of the following:
     1. "Unkown" (the variable is defined, but its value is unknown).
     2. A natural number (the variable is defind, and its value is known)
     3. "Undefined" (the variable is not defined).
     """
     def __init__(self):
-        self.mapping = {v: UNDEFINED for v in VARIABLE_NAMES}
+        self.mapping = {}  # Variables which are not in the mapping are undefined.
 
     def __getitem__(self, variable):
-        return self.mapping[variable]
+        return self.mapping.get(variable, UNDEFINED)
     
     def __setitem__(self, variable, value: int):
-        if variable not in VARIABLE_NAMES:
+        if not is_variable_name(variable):
             raise ValueError(f"{variable} is not a Variable!")
         if value not in {UNKNOWN, UNDEFINED} and not isinstance(value, int):
             raise ValueError(f"{value} is not a legal value!")
@@ -28,12 +28,11 @@ class ConcreteState:
 
     def __copy__(self):
         new_state = ConcreteState()
-        for v in VARIABLE_NAMES:
-            new_state[v] = self[v]
+        new_state.mapping = self.mapping.copy()
         return new_state
 
     def __repr__(self):
-        mapping_for_print = {v: self.mapping[v] for v in VARIABLE_NAMES if self.mapping[v] != UNDEFINED}
+        mapping_for_print = {v: value for v, value in self.mapping.items() if value != UNDEFINED}
         return str(mapping_for_print)
 
     def evaluate_boolcondition(self, bool_condition: BOOLCondition) -> bool:
@@ -0,0 +1,237 @@
+"""
+A bounded explicit-state explorer of the concrete semantics, used as ground truth for the abstract analyzers.
+
+Starting from the starting label with every variable undefined, the explorer enumerates the reachable
+(label, state) pairs breadth first, following every edge which ConcreteState semantics allows - so, unlike run_cfg,
+it does not stop at branches - and giving "i := ?" every value of a bounded range. Edges are taken through the
+guards and effects compiled by ConcreteInterpreter, over states which are tuples of slots.
+
+The visited set holds each (label id, state) pair, or only a 64-bit BLAKE2 digest of it when hash_compaction is set
+(as in bit-state hashing: much less memory, but a digest collision, which is very unlikely, may hide a state). The frontier of every depth can be
+expanded by a pool of worker processes.
+
+An assertion is evaluated as in ConcreteInterpreter: a SUM over a variable which is undefined in the state does not
+hold, so the state is recorded as a violation of the assertion (and not explored further) instead of stopping the
+exploration.
+"""
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import blake2b
+from pathlib import Path
+from typing import Dict, List, Set, Tuple, Union
+
+from concrete_interpreter import ConcreteInterpreter
+from concrete_state import ConcreteState, UNDEFINED
+from control_flow_graph import ControlFlowGraph
+from saav_parser import CommandType, Program, ProgramLine
+
+State = Tuple[Union[int, str], ...]
+Node = Tuple[int, State]            # A dense label id and a state.
+Violation = Tuple[int, State, int]  # A dense label id, a state and the index of the assertion it fails.
+
+PARALLEL_FRONTIER_THRESHOLD = 1024  # Smaller frontiers are expanded in the main process.
+
+
+class ExplorationResult:
+    def __init__(self, labels: List[int], program_lines: List[ProgramLine], variables: List[str],
+                 visited: Union[Set[Node], None], states_per_label: Dict[int, int], violations: List[Violation],
+                 depth: int, truncated: bool, pruned: int):
+        self.labels: List[int] = labels
+        self.program_lines: List[ProgramLine] = program_lines
+        self.variables: List[str] = variables
+        self.visited: Union[Set[Node], None] = visited   # None under hash compaction.
+        self.states_per_label: Dict[int, int] = states_per_label
+        self.violations: List[Violation] = violations
+        self.depth: int = depth             # The depth of the deepest states explored.
+        self.truncated: bool = truncated    # Whether max_depth or max_states stopped the exploration early.
+        self.pruned: int = pruned           # The number of successors dropped for leaving the value limit.
+
+    def to_concrete_state(self, state: State) -> ConcreteState:
+        concrete_state = ConcreteState()
+        for variable, value in zip(self.variables, state):
+            if value != UNDEFINED:
+                concrete_state[variable] = value
+        return concrete_state
+
+    def reachable_states(self, label: int) -> List[ConcreteState]:
+        """
+        The reachable states at the given label. Not available under hash compaction.
+        """
+        if self.visited is None:
+            raise ValueError("The reachable states are not kept under hash compaction.")
+        label_id = self.labels.index(label)
+        return [self.to_concrete_state(state) for node_id, state in self.visited if node_id == label_id]
+
+    def failed_assertions(self) -> List[Tuple[ProgramLine, ConcreteState]]:
+        return [(self.program_lines[line_index], self.to_concrete_state(state))
+                for _, state, line_index in self.violations]
+
+    def __repr__(self) -> str:
+        s = f"Explored {sum(self.states_per_label.values())} states up to depth {self.depth}" + \
+            (" (truncated)" if self.truncated else "") + f", pruned {self.pruned} successors."
+        for label in sorted(self.states_per_label):
+            s += f"\nL{label}: {self.states_per_label[label]} states."
+        for program_line, state in self.failed_assertions():
+            s += f"\nThe assertion {program_line.command} was failed on state: {state}."
+        return s
+
+
+class ConcreteStateExplorer:
+    def __init__(self, cfg: ControlFlowGraph, value_range: Tuple[int, int] = (-2, 2),
+                 value_limit: Union[int, None] = None, max_depth: int = 100, max_states: int = 1000000,
+                 hash_compaction: bool = False, workers: int = 0):
+        """
+        "i := ?" branches over every value of value_range (inclusive). If value_limit is given, successors in which
+        the assigned variable's absolute value exceeds it are pruned.
+        """
+        self.cfg: ControlFlowGraph = cfg
+        self.value_range: Tuple[int, int] = value_range
+        self.value_limit: Union[int, None] = value_limit
+        self.max_depth: int = max_depth
+        self.max_states: int = max_states
+        self.hash_compaction: bool = hash_compaction
+        self.workers: int = workers
+
+        self.interpreter: ConcreteInterpreter = ConcreteInterpreter(cfg)
+        self.line_indices: Dict[int, int] = {id(program_line): index
+                                             for index, program_line in enumerate(cfg.program.program_lines)}
+        # The id of the variable each assigning line assigns.
+        self.assigned_ids: Dict[int, int] = {id(program_line): self.interpreter.symbol_table[program_line.command.command_parameters['i']]
+                                             for program_line in cfg.program.program_lines
+                                             if 'i' in program_line.command.command_parameters}
+
+    def successors(self, node_id: int, state: State) -> Tuple[List[Node], List[Violation], int]:
+        """
+        Returns the successors of a node, the assertions it fails and the number of its pruned successors.
+        """
+        successors: List[Node] = []
+        violations: List[Violation] = []
+        pruned = 0
+        for guard, effect, successor_id, program_line in self.interpreter.instructions[node_id]:
+            if guard is not None and not guard(state):
+                continue
+            command_type = program_line.command.command_type
+            if command_type == CommandType.C_Assign_Unknown:
+                assigned_id = self.assigned_ids[id(program_line)]
+                for value in range(self.value_range[0], self.value_range[1] + 1):
+                    new_state = list(state)
+                    new_state[assigned_id] = value
+                    successors.append((successor_id, tuple(new_state)))
+            elif effect is None:
+                successors.append((successor_id, state))
+            elif command_type == CommandType.C_Assert:
+                if effect(state):
+                    successors.append((successor_id, state))
+                else:
+                    violations.append((node_id, state, self.line_indices[id(program_line)]))
+            else:
+                new_state = list(state)
+                effect(new_state)
+                if self.value_limit is not None and abs(new_state[self.assigned_ids[id(program_line)]]) > self.value_limit:
+                    pruned += 1
+                    continue
+                successors.append((successor_id, tuple(new_state)))
+        return successors, violations, pruned
+
+    def explore(self) -> ExplorationResult:
+        start: Node = (self.interpreter.start_id, (UNDEFINED, ) * len(self.interpreter.symbol_table))
+        visited: Set = {self._key(start)}
+        states_per_label: Dict[int, int] = {self.interpreter.labels[start[0]]: 1}
+        violations: List[Violation] = []
+        frontier: List[Node] = [start]
+        depth, pruned, truncated = 0, 0, False
+
+        executor = ProcessPoolExecutor(self.workers, initializer=initialize_worker,
+                                       initargs=(self.cfg.program, self.value_range, self.value_limit)) \
+            if self.workers > 0 else None
+        try:
+            while frontier:
+                if depth == self.max_depth:
+                    truncated = True
+                    break
+                next_frontier: List[Node] = []
+                for successors, node_violations, node_pruned in self._expand(frontier, executor):
+                    violations.extend(node_violations)
+                    pruned += node_pruned
+                    for successor in successors:
+                        key = self._key(successor)
+                        if key in visited:
+                            continue
+                        if len(visited) >= self.max_states:
+                            truncated = True
+                            continue
+                        visited.add(key)
+                        label = self.interpreter.labels[successor[0]]
+                        states_per_label[label] = states_per_label.get(label, 0) + 1
+                        next_frontier.append(successor)
+                frontier = next_frontier
+                depth += 1
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        return ExplorationResult(self.interpreter.labels, self.cfg.program.program_lines,
+                                 self.interpreter.symbol_table.variable_names,
+                                 None if self.hash_compaction else visited, states_per_label, violations,
+                                 depth, truncated, pruned)
+
+    def _key(self, node: Node):
+        # The builtin hash() is not used, since it has systematic collisions (hash(-1) == hash(-2)).
+        return blake2b(repr(node).encode(), digest_size=8).digest() if self.hash_compaction else node
+
+    def _expand(self, frontier: List[Node], executor: Union[ProcessPoolExecutor, None]):
+        if executor is None or len(frontier) < PARALLEL_FRONTIER_THRESHOLD:
+            return (self.successors(node_id, state) for node_id, state in frontier)
+        chunk_size = -(-len(frontier) // (4 * self.workers))
+        chunks = [frontier[start:start + chunk_size] for start in range(0, len(frontier), chunk_size)]
+        return (result for chunk_results in executor.map(expand_chunk, chunks) for result in chunk_results)
+
+
+# The explorer of a worker process, built once by initialize_worker.
+WORKER_EXPLORER: List[ConcreteStateExplorer] = []
+
+def initialize_worker(program: Program, value_range: Tuple[int, int], value_limit: Union[int, None]) -> None:
+    WORKER_EXPLORER.append(ConcreteStateExplorer(ControlFlowGraph(program), value_range, value_limit))
+
+def expand_chunk(chunk: List[Node]) -> List[Tuple[List[Node], List[Violation], int]]:
+    """
+    The task run by the workers: the successors and the violations of every node of a chunk of the frontier.
+    """
+    explorer = WORKER_EXPLORER[0]
+    return [explorer.successors(node_id, state) for node_id, state in chunk]
+
+
+def check_hash_compaction(cfg: ControlFlowGraph, **options) -> bool:
+    """
+    Explores the program with and without hash compaction, and returns whether both found the same number of states
+    at every label. Raises a ValueError if the exploration is truncated, since the two would then stop at different
+    states.
+    """
+    full_result = ConcreteStateExplorer(cfg, **options).explore()
+    if full_result.truncated:
+        raise ValueError("The exploration was truncated.")
+    compacted_result = ConcreteStateExplorer(cfg, hash_compaction=True, **options).explore()
+    return full_result.states_per_label == compacted_result.states_per_label
+
+
+def main() -> int:
+    argument_parser = argparse.ArgumentParser(description="Checks that hash compaction does not lose any state.")
+    argument_parser.add_argument("programs", nargs="+", type=Path, help="program files")
+    argument_parser.add_argument("--max-depth", type=int, default=100, help="the depth to explore up to")
+    arguments = argument_parser.parse_args()
+
+    all_equal = True
+    for program_file in arguments.programs:
+        try:
+            equal = check_hash_compaction(ControlFlowGraph(Program(program_file)), max_depth=arguments.max_depth)
+        except ValueError:
+            print(f"{program_file}: skipped, since the exploration was truncated.")
+            continue
+        all_equal = all_equal and equal
+        print(f"{program_file}: " + ("OK." if equal else "hash compaction lost states!"))
+    return 0 if all_equal else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
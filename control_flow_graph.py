@@ -1,10 +1,13 @@
-from saav_parser import Program, ProgramLine
+from __future__ import annotations
+from saav_parser import Program, ProgramLine, SymbolTable
 from concrete_state import ConcreteState
-from typing import List, Union
-import networkx as nx
-import matplotlib.pyplot as plt
+from typing import Dict, List, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import networkx as nx
 
 def create_graph_from_program(program: Program) -> nx.DiGraph:
+    import networkx as nx  # networkx and matplotlib are slow to import, and only needed for plotting.
     G = nx.DiGraph()
     for program_line in program.program_lines:
         G.add_edge(*program_line.get_edge_label())
@@ -14,8 +17,17 @@ class ControlFlowGraph:
     def __init__(self, program: Program):
         self.program: Program = program
         self.nodes: List[int] = self.program.get_all_labels()
+        self.symbol_table: SymbolTable = self.program.symbol_table
+
+        # The ingoing and outgoing lines of every node, indexed by the dense id of its label, in program order.
+        # They are collected by the program while its lines are read.
+        self.node_ids: Dict[int, int] = self.program.label_ids
+        self.ingoing_lines: List[List[ProgramLine]] = self.program.ingoing_lines
+        self.outgoing_lines: List[List[ProgramLine]] = self.program.outgoing_lines
         
     def plot_graph(self):
+        import networkx as nx
+        import matplotlib.pyplot as plt
         graph: nx.DiGraph = create_graph_from_program(self.program)
         pos = nx.spring_layout(graph)
         plt.figure()
@@ -35,12 +47,10 @@ class ControlFlowGraph:
         plt.show()
 
     def ingoing_edges(self, node: int) -> List[ProgramLine]:
-        return [program_line for program_line in self.program.program_lines
-                if program_line.end_label == node]
+        return self.ingoing_lines[self.node_ids[node]] if node in self.node_ids else []
 
     def outgoing_edges(self, node: int) -> List[ProgramLine]:
-        return [program_line for program_line in self.program.program_lines
-                if program_line.start_label == node]
+        return self.outgoing_lines[self.node_ids[node]] if node in self.node_ids else []
 
     def find_start_label(self) -> int:
         for node in self.nodes:
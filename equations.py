@@ -1,13 +1,15 @@
 from __future__ import annotations
 
 from typing import List
-from sympy import solve
-from sympy.abc import sigma
-import numpy as np
-from itertools import product
-from typing import Set, List, Union, Type, Tuple
+from fractions import Fraction
+from itertools import product, combinations
+from math import comb
+from typing import Set, FrozenSet, List, Union, Type, Tuple, Dict, Iterator
+from lattice_creation import memoized_factory
+from saav_parser import SymbolTable
 
 
+@memoized_factory
 def create_equation_class(variables: List[str]):
     """
     Given a list of variables (v1, v2, ..., vn), creates a class of which each element contains:
@@ -16,6 +18,8 @@ def create_equation_class(variables: List[str]):
     This element represents the equation:
     a1*v1 + a2*v2 + ... + an*vn - m = 0
     """
+    index_of_variables: Dict[str, int] = SymbolTable(variables).variable_ids
+
     class Equation:
         def __init__(self, coefficients: Tuple, m: int):
             assert len(variables) == len(coefficients)
@@ -29,18 +33,18 @@ def create_equation_class(variables: List[str]):
                 self.m == other.m
         
         def __contains__(self, item) -> bool:
-            assert item in self.variables
-            index_of_item = self.variables.index(item)
+            assert item in index_of_variables
+            index_of_item = index_of_variables[item]
             return self.coefficients[index_of_item] != 0
         
         def get_coefficient(self, var: str) -> int:
-            assert var in self.variables
-            var_index = self.variables.index(var)
+            assert var in index_of_variables
+            var_index = index_of_variables[var]
             return self.coefficients[var_index]
         
         def set_coefficient(self, var: str, coeff: int) -> None:
-            assert var in self.variables
-            var_index = self.variables.index(var)
+            assert var in index_of_variables
+            var_index = index_of_variables[var]
             coeff_list = list(self.coefficients)
             coeff_list[var_index] = coeff
             self.coefficients = tuple(coeff_list)
@@ -65,62 +69,145 @@ def create_equation_class(variables: List[str]):
         
         def copy(self) -> Equation:
             return Equation(coefficients=self.coefficients, m=self.m)
+
+        def parity_constraint(self) -> Tuple[FrozenSet[str], bool]:
+            """
+            The equation modulo 2: the variables with an odd coefficient, and whether their sum is odd.
+            Every integer solution of the equation satisfies it.
+            """
+            odd_variables = frozenset(var for var, coeff in zip(self.variables, self.coefficients) if coeff % 2 == 1)
+            return odd_variables, self.m % 2 == 1
         
+        def in_range(self, minimal_coefficient: int, maximal_coefficient: int,
+                     minimal_integer: int, maximal_integer: int, max_support: Union[int, None] = None) -> bool:
+            """
+            Checks if the equation is one of the equations returned by all_equations() with the same parameters.
+            """
+            return all(minimal_coefficient <= coeff <= maximal_coefficient for coeff in self.coefficients) and \
+                minimal_integer <= self.m <= maximal_integer and \
+                (max_support is None or sum(1 for coeff in self.coefficients if coeff != 0) <= max_support)
+
         @staticmethod
         def all_equations(minimal_coefficient: int, maximal_coefficient: int,
-                          minimal_integer: int, maximal_integer: int) -> List[Equation]:
-            all_coefficients = np.arange(minimal_coefficient, maximal_coefficient + 1)
-            all_vectors = product(all_coefficients, repeat=len(variables))
-            all_integers = np.arange(minimal_integer, maximal_integer + 1)
-            
-            l: List[Equation] = []
-            for vector in all_vectors:
+                          minimal_integer: int, maximal_integer: int,
+                          max_support: Union[int, None] = None) -> Iterator[Equation]:
+            """
+            Lazily yields every equation whose coefficients and integer are in the given ranges.
+            If max_support is given, only equations with at most max_support non-zero coefficients are yielded
+            (for instance, max_support=2 gives the pairwise relations x - y - 1 = 0 and so on).
+            """
+            all_integers = range(minimal_integer, maximal_integer + 1)
+            for vector in all_coefficient_vectors(len(variables), minimal_coefficient, maximal_coefficient,
+                                                  max_support):
                 for integer in all_integers:
-                    l.append(Equation(vector, integer))
+                    yield Equation(vector, integer)
 
-            return l
+        @staticmethod
+        def from_matrix(equations_matrix, start: int = 0, end: Union[int, None] = None) -> Iterator[Equation]:
+            """
+            Lazily yields the equations stored in rows [start, end) of an EquationsMatrix (see equations_matrix.py).
+            """
+            assert equations_matrix.number_of_variables == len(variables)
+            for coefficients, m in equations_matrix.rows(start, end):
+                yield Equation(coefficients, m)
+
+        @staticmethod
+        def count_equations(minimal_coefficient: int, maximal_coefficient: int,
+                            minimal_integer: int, maximal_integer: int,
+                            max_support: Union[int, None] = None) -> int:
+            """
+            Returns the number of equations all_equations() would yield, without enumerating them.
+            """
+            number_of_integers = maximal_integer - minimal_integer + 1
+            number_of_vectors = count_coefficient_vectors(len(variables), minimal_coefficient, maximal_coefficient,
+                                                          max_support)
+            return number_of_vectors * number_of_integers
 
-        
     return Equation
         
 
-def get_contradicting_equations(equation, minimal_integer: int, maximal_integer: int) -> set:
+def all_coefficient_vectors(n: int, minimal_coefficient: int, maximal_coefficient: int,
+                            max_support: Union[int, None] = None) -> Iterator[Tuple[int, ...]]:
     """
-    For instance, if the equation is x + y + 1 = 0,
-    returns every equation of the form x + y + _ = 0, where _ is a constant different than 1;
-    ans also every equation of the form -x - y - _ = 0, correspondly.
+    Lazily yields every vector of n coefficients in the given range.
+    If max_support is given, only vectors with at most max_support non-zero entries are yielded,
+    and the other vectors are never generated.
     """
-    s = set()
-    for integer in range(minimal_integer, maximal_integer + 1):
-        if integer == equation.m:
-            continue
-        new_equation = equation.copy()
-        new_equation.m = integer
-        s.add(new_equation)
-        
-        flipped_equation = new_equation.copy()
-        for var in flipped_equation.variables:
-            flipped_equation.set_coefficient(var, -flipped_equation.get_coefficient(var))
-        flipped_equation.m *= (-1)
-        s.add(flipped_equation)
+    all_coefficients = range(minimal_coefficient, maximal_coefficient + 1)
+    if max_support is None or max_support >= n:
+        yield from product(all_coefficients, repeat=n)
+        return
+    if 0 not in all_coefficients:  # Every vector has n non-zero entries.
+        return
+    nonzero_coefficients = [coeff for coeff in all_coefficients if coeff != 0]
+    for support_size in range(max_support + 1):
+        for support in combinations(range(n), support_size):
+            for nonzero_values in product(nonzero_coefficients, repeat=support_size):
+                vector = [0] * n
+                for index, value in zip(support, nonzero_values):
+                    vector[index] = value
+                yield tuple(vector)
+
+def count_coefficient_vectors(n: int, minimal_coefficient: int, maximal_coefficient: int,
+                              max_support: Union[int, None] = None) -> int:
+    """
+    Returns the number of vectors all_coefficient_vectors() would yield, without enumerating them.
+    """
+    number_of_coefficients = maximal_coefficient - minimal_coefficient + 1
+    if max_support is None or max_support >= n:
+        return number_of_coefficients ** n
+    if not minimal_coefficient <= 0 <= maximal_coefficient:
+        return 0
+    return sum(comb(n, support_size) * (number_of_coefficients - 1) ** support_size
+               for support_size in range(max_support + 1))
+
+def get_candidate_equations(EquationClass: Type, minimal_coefficient: int, maximal_coefficient: int,
+                            minimal_integer: int, maximal_integer: int, max_support: Union[int, None] = None,
+                            equations_matrix=None) -> Iterator:
+    """
+    Lazily yields the candidate equations for explication.
+    If an EquationsMatrix of the same parameters is given, the equations are read from it instead of enumerated.
+    """
+    if equations_matrix is not None:
+        return EquationClass.from_matrix(equations_matrix)
+    return EquationClass.all_equations(minimal_coefficient, maximal_coefficient,
+                                       minimal_integer, maximal_integer, max_support)
 
-    return s
+def get_symbols(variables: List[str]) -> Dict:
+    """
+    A sympy Symbol for every variable. Symbols are built from the names directly, never by parsing a string,
+    so a variable may be named like anything in sympy's namespace (S, N, oo, lambda, ...).
+    """
+    from sympy import Symbol  # sympy is slow to import, so it is imported only when a system is solved.
+    return {var: Symbol(var) for var in variables}
+
+def get_expressions(list_of_equations: list, symbols: Dict) -> list:
+    """
+    The sympy expression a1*v1 + ... + an*vn - m of every equation, skipping the trivial "0 = 0".
+    """
+    return [sum((coeff * symbols[var] for var, coeff in zip(eq.variables, eq.coefficients) if coeff != 0), -eq.m)
+            for eq in list_of_equations if eq.m != 0 or any(eq.coefficients)]
 
 def get_all_possible_equations(EquationClass: Type, list_of_equations: list,
                                minimal_coefficient: int, maximal_coefficient: int,
-                               minimal_integer: int, maximal_integer: int) -> set:
+                               minimal_integer: int, maximal_integer: int,
+                               max_support: Union[int, None] = None,
+                               equations_matrix=None, explication_pool=None) -> set:
     """
-    TODO lower running times!
+    Returns every equation (out of EquationClass.all_equations with the given parameters) which is implied by
+    list_of_equations. The candidates are streamed, so they are never held in memory all together.
+    If equations_matrix is given, the candidates are read from it (it must match the given parameters).
+    If an ExplicationPool is given as well (see parallel_explication.py), the candidates are checked by its workers.
     """
     assert all(isinstance(eq, EquationClass) for eq in list_of_equations)
     if len(list_of_equations) == 0:
         return set()
     variables = list_of_equations[0].variables
-    list_of_equations_as_strings = [str(eq) for eq in list_of_equations if str(eq) != ""]
+    symbols = get_symbols(variables)
 
-    all_equations: Set[EquationClass] = set(EquationClass.all_equations(minimal_coefficient, maximal_coefficient,
-                                                                        minimal_integer, maximal_integer))
-    try_to_solve_list_of_equations = solve(list_of_equations_as_strings, variables, dict=True)
+    from sympy import solve
+    try_to_solve_list_of_equations = solve(get_expressions(list_of_equations, symbols),
+                                           [symbols[var] for var in variables], dict=True)
     if len(try_to_solve_list_of_equations) == 0:
         """
         Assuming list_of_equation has a solution, so does list_of_equations_with_sigme.
@@ -128,53 +215,138 @@ def get_all_possible_equations(EquationClass: Type, list_of_equations: list,
         TODO should we do so? or maybe return an empty set? of the set of all possible equations??
         TODO consult with Raz...? He says we should return bottom (= set of everythin
         """
-        return all_equations
+        return set(get_candidate_equations(EquationClass, minimal_coefficient, maximal_coefficient,
+                                           minimal_integer, maximal_integer, max_support, equations_matrix))
 
-    result: Set[EquationClass] = set(list_of_equations).intersection(all_equations)
-    equations_to_skip: Set[EquationClass] = set()
+    result: Set[EquationClass] = {eq for eq in list_of_equations
+                                  if eq.in_range(minimal_coefficient, maximal_coefficient,
+                                                 minimal_integer, maximal_integer, max_support)}
+    linear_forms = get_linear_forms_of_solution(variables, try_to_solve_list_of_equations[0], symbols)
+    mentioned_variables: Set[str] = {v for v in variables if any(v in eq for eq in list_of_equations)}
 
-    for equation in all_equations:
-        for var in {v for v in variables if v in equation}:
-            if all([var not in original_equation for original_equation in list_of_equations]):
-                equations_to_skip.add(equation)
-                break
+    result.update(get_implied_equations(EquationClass, variables, linear_forms, mentioned_variables, None,
+                                        minimal_coefficient, maximal_coefficient, minimal_integer, maximal_integer,
+                                        max_support, equations_matrix, explication_pool))
 
-    for equation in all_equations:
+    return result
 
-        if str(equation) == "" or str(equation) == "0":  # all coeffieients & integers are 0, or the equations is "0 = 0".
+def get_linear_forms_of_solution(variables: List[str], solution: dict, symbols: Dict) -> Dict[str, Dict[str, Fraction]]:
+    """
+    Given a solution returned by sympy's solve() for a linear system over the given symbols (see get_symbols),
+    returns for every variable the linear form it equals to, in terms of the free variables of the system.
+    For instance, if the solution is {x: y + 1}, we return {'x': {'y': 1, '': 1}, 'y': {'y': 1}}.
+    The key '' stands for the free integer of the form.
+    """
+    variable_of_symbol = {symbol: var for var, symbol in symbols.items()}
+    linear_forms: Dict[str, Dict[str, Fraction]] = {}
+    for var in variables:
+        expression = solution.get(symbols[var], symbols[var])
+        form: Dict[str, Fraction] = {}
+        for term, coeff in expression.as_coefficients_dict().items():
+            key = "" if term == 1 else variable_of_symbol[term]
+            form[key] = form.get(key, Fraction(0)) + Fraction(int(coeff.p), int(coeff.q))
+        linear_forms[var] = form
+    return linear_forms
+
+def is_implied_by_linear_forms(equation, linear_forms: Dict[str, Dict[str, Fraction]]) -> bool:
+    """
+    Checks if the equation holds for every solution of the system, which is given by its linear forms.
+    This is the same as checking that sigma = 0 after adding "sigma - (equation)" to the system.
+    """
+    total: Dict[str, Fraction] = {"": Fraction(-equation.m)}
+    for var, coeff in zip(equation.variables, equation.coefficients):
+        if coeff == 0:
             continue
-        if equation in equations_to_skip:
+        for key, value in linear_forms[var].items():
+            total[key] = total.get(key, Fraction(0)) + coeff * value
+    return all(value == 0 for value in total.values())
+
+def get_implied_equations(EquationClass: Type, variables: List[str], linear_forms: Dict[str, Dict[str, Fraction]],
+                          mentioned_variables: Set[str], required_variable: Union[str, None],
+                          minimal_coefficient: int, maximal_coefficient: int,
+                          minimal_integer: int, maximal_integer: int, max_support: Union[int, None] = None,
+                          equations_matrix=None, explication_pool=None) -> Iterator:
+    """
+    Lazily yields every candidate equation which is implied by the system given by its linear forms.
+    Candidates that mention a variable outside mentioned_variables are skipped,
+    and so are candidates that do not mention required_variable (if it is not None).
+    """
+    if explication_pool is not None and equations_matrix is not None:
+        yield from explication_pool.implied_equations(EquationClass, equations_matrix, variables, linear_forms,
+                                                      mentioned_variables, required_variable)
+        return
+    for equation in get_candidate_equations(EquationClass, minimal_coefficient, maximal_coefficient,
+                                            minimal_integer, maximal_integer, max_support, equations_matrix):
+        if equation.m == 0 and not any(equation.coefficients):  # all coeffieients & integers are 0 ("0 = 0").
+            continue
+        if required_variable is not None and required_variable not in equation:
             continue
-        if equation in result:  # if equation is one of the original equations...
-            contradicting_equations = get_contradicting_equations(equation, minimal_integer, maximal_integer)
-            equations_to_skip.union(contradicting_equations)
+        if any(v in equation and v not in mentioned_variables for v in variables):
             continue
+        if is_implied_by_linear_forms(equation, linear_forms):
+            yield equation
 
-        equation_with_sigma = f"{sigma} - ({equation})"
-        list_of_equations_with_sigme = list_of_equations_as_strings + [equation_with_sigma]
-        solution = solve(list_of_equations_with_sigme, [sigma] + variables, dict=True)[0]
-        # TODO can be shoreter if we use the solution without sigma... But see if solve takes all the time...
-        if solution[sigma] == 0:
-            result.add(equation)
-            contradicting_equations = get_contradicting_equations(equation, minimal_integer, maximal_integer)
-            equations_to_skip.union(contradicting_equations)
+def get_incremental_possible_equations(EquationClass: Type, previous_closure: set, assigned_variable: str,
+                                       new_equations: list,
+                                       minimal_coefficient: int, maximal_coefficient: int,
+                                       minimal_integer: int, maximal_integer: int,
+                                       max_support: Union[int, None] = None,
+                                       equations_matrix=None, explication_pool=None) -> set:
+    """
+    An incremental version of get_all_possible_equations, for a command that assigns only assigned_variable
+    (i := j, i := K, i := ?, i := j + 1, i := j - 1).
+
+    previous_closure must be the result of a former explication (or a join of such results).
+    Every equation in it that does not mention assigned_variable remains implied after the assignment,
+    and nothing new is implied without assigned_variable - so we keep them as they are,
+    and only look for implied equations that do mention assigned_variable.
+
+    The result is identical to calling get_all_possible_equations on
+    clear_variable_from_set(previous_closure, assigned_variable) + new_equations.
+    """
+    assert all(isinstance(eq, EquationClass) for eq in new_equations)
+    kept_equations: set = clear_variable_from_set(previous_closure, assigned_variable)
+    list_of_equations = list(kept_equations) + list(new_equations)
+    if len(list_of_equations) == 0:
+        return set()
+    variables = list_of_equations[0].variables
+    symbols = get_symbols(variables)
+
+    from sympy import solve
+    solutions = solve(get_expressions(list_of_equations, symbols), [symbols[var] for var in variables], dict=True)
+    if len(solutions) == 0:
+        # Same as in get_all_possible_equations - an unsolvable system is the bottom element.
+        return set(get_candidate_equations(EquationClass, minimal_coefficient, maximal_coefficient,
+                                           minimal_integer, maximal_integer, max_support, equations_matrix))
+
+    linear_forms = get_linear_forms_of_solution(variables, solutions[0], symbols)
+    mentioned_variables: Set[str] = {v for v in variables if any(v in eq for eq in list_of_equations)}
+
+    result: Set[EquationClass] = {eq for eq in list_of_equations
+                                  if eq.in_range(minimal_coefficient, maximal_coefficient,
+                                                 minimal_integer, maximal_integer, max_support)}
+    result.update(get_implied_equations(EquationClass, variables, linear_forms, mentioned_variables, assigned_variable,
+                                        minimal_coefficient, maximal_coefficient, minimal_integer, maximal_integer,
+                                        max_support, equations_matrix, explication_pool))
 
     return result
 
 def equation_example():
     vars = ['x', 'y', 'z']
     Equation = create_equation_class(vars)
-    print(Equation.all_equations(-1, 1, -2, 2))
+    print(list(Equation.all_equations(-1, 1, -2, 2)))
     eq1 = Equation((1, 0, -1), 1)
     print(eq1)
     eq2 = Equation((0, 1, -1), 0)
     print(eq2)
-    solution = solve([str(eq) for eq in [eq1, eq2]], vars, dict=True)
+    from sympy import solve
+    symbols = get_symbols(vars)
+    solution = solve(get_expressions([eq1, eq2], symbols), list(symbols.values()), dict=True)
     print(solution)
     print(get_all_possible_equations(Equation, [eq1, eq2], -1, 1, -2, 2))
 
 def clear_variable_from_set(set_of_equations: set, variable_to_clear: str):
-    new_set: set = set_of_equations.copy()
+    new_set: set = set(set_of_equations)
     for equation in set_of_equations:
         if variable_to_clear in equation:
             new_set.remove(equation)
@@ -191,7 +363,7 @@ def replace_variable_with_another(set_of_equations: set, new_variable: str, old_
         For now, it is not implementesd on assignments like new_variable := old_variable + 1.
         It can be done in a similar way - just need to make sure the new equation does not pass the limit of integers.
     """
-    new_set: set = set_of_equations.copy()
+    new_set: set = set(set_of_equations)
     for equation in set_of_equations:
         if old_variable in equation:
             old_coefficient = equation.get_coefficient(old_variable)
@@ -202,24 +374,27 @@ def replace_variable_with_another(set_of_equations: set, new_variable: str, old_
             new_set.add(new_equation)
     return new_set
 
-def get_summation_equation(variables_to_sum: List[str]):
-    s = "sigma"
-    for var in variables_to_sum:
-        s += f"-{var}"
-    return s
-
 def solve_linear_equations(variables: List[str], set_of_equations: set, variables_to_sum: List[str]):
-    equations: List[str] = [str(expression) for expression in set_of_equations if str(expression) != ""]
+    """
+    Solves the system, and if variables_to_sum is not empty, also returns the value of their sum as given by the
+    solution (in terms of the free variables). The sum is a fresh Dummy symbol, so it never collides with a variable.
+    """
+    from sympy import solve, Dummy
+    symbols = get_symbols(variables)
+    equations = get_expressions(list(set_of_equations), symbols)
+    unknowns = [symbols[var] for var in variables]
+    sigma = None
     if variables_to_sum != []:
-        summation_equation = get_summation_equation(variables_to_sum)
-        equations += [summation_equation]
-        variables = ['sigma'] + variables
-    solution = solve(equations, variables, dict=True)
+        sigma = Dummy("sigma")
+        sum_symbols = get_symbols(variables_to_sum)  # The same Symbols as in symbols, for program variables.
+        equations.append(sigma - sum(sum_symbols[var] for var in variables_to_sum))
+        unknowns = [sigma] + unknowns
+    solution = solve(equations, unknowns, dict=True)
     if len(solution) == 0:
         return dict(), None
     if len(solution) > 1:
         assert f"More than 1 solution to {equations}! check yourself..."
     solution = solution[0]
-    if variables_to_sum == []:
+    if sigma is None:
         return solution, None
-    return solution, solution[sigma]
\ No newline at end of file
+    return solution, solution[sigma]
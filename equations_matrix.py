@@ -0,0 +1,164 @@
+"""
+The candidate equations of the summation analysis, stored as a packed integer matrix in a file.
+Each row is (a1, ..., an, m), representing the equation a1*v1 + ... + an*vn - m = 0.
+
+The file is memory-mapped read-only, so every process that analyses with the same parameters
+shares one copy of the enumeration (through the OS page cache) instead of building its own.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, Tuple, Union
+
+from equations import all_coefficient_vectors, count_coefficient_vectors
+
+MAGIC = b"SAEQ"
+HEADER_FORMAT = "<4scxxxIQ"  # magic, typecode, number of variables, number of rows.
+HEADER_SIZE = 32
+ROWS_PER_WRITE = 1 << 16
+CACHE_DIRECTORY_ENVIRONMENT_VARIABLE = "SAAV_EQUATIONS_CACHE"
+
+
+def get_default_cache_directory() -> Path:
+    if CACHE_DIRECTORY_ENVIRONMENT_VARIABLE in os.environ:
+        return Path(os.environ[CACHE_DIRECTORY_ENVIRONMENT_VARIABLE])
+    return Path(tempfile.gettempdir()) / "saav_equations_cache"
+
+
+def get_typecode(coefficiets_range: Tuple[int, int], integer_range: Tuple[int, int]) -> str:
+    """
+    Returns the smallest array typecode that can hold every coefficient and integer.
+    """
+    smallest = min(coefficiets_range[0], integer_range[0])
+    largest = max(coefficiets_range[1], integer_range[1])
+    for typecode, bits in [('b', 8), ('h', 16), ('i', 32)]:
+        if -(1 << (bits - 1)) <= smallest and largest < (1 << (bits - 1)):
+            return typecode
+    return 'q'
+
+
+class EquationsMatrix:
+    def __init__(self, path: Path, expected_header: Union[Tuple[str, int, int], None] = None):
+        """
+        Raises ValueError if the file is not a complete equations matrix, or if expected_header is given
+        (as the typecode, number of variables and number of rows) and the header of the file is different.
+        """
+        self.path: Path = path
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < HEADER_SIZE:
+                raise ValueError(f"{path} is too short to be an equations matrix file.")
+            magic, typecode, number_of_variables, number_of_rows = \
+                struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+            if magic != MAGIC or typecode not in {b'b', b'h', b'i', b'q'}:
+                raise ValueError(f"{path} is not an equations matrix file.")
+            header = (typecode.decode(), number_of_variables, number_of_rows)
+            if expected_header is not None and header != expected_header:
+                raise ValueError(f"{path} holds a matrix of {header}, expected {expected_header}.")
+            expected_size = HEADER_SIZE + number_of_rows * (number_of_variables + 1) * array(header[0]).itemsize
+            if len(self._mmap) != expected_size:
+                raise ValueError(f"{path} has {len(self._mmap)} bytes, expected {expected_size}.")
+        except BaseException:
+            self._mmap.close()
+            raise
+        self.typecode: str = header[0]
+        self.number_of_variables: int = number_of_variables
+        self.number_of_rows: int = number_of_rows
+        self.row_length: int = number_of_variables + 1
+        self._values = memoryview(self._mmap)[HEADER_SIZE:].cast(self.typecode)
+
+    def __len__(self) -> int:
+        return self.number_of_rows
+
+    def row(self, index: int) -> Tuple[Tuple[int, ...], int]:
+        start = index * self.row_length
+        values = self._values[start:start + self.row_length].tolist()
+        return tuple(values[:-1]), values[-1]
+
+    def rows(self, start: int = 0, end: Union[int, None] = None) -> Iterator[Tuple[Tuple[int, ...], int]]:
+        """
+        Lazily yields the rows [start, end) as (coefficients, m) pairs.
+        """
+        end = self.number_of_rows if end is None else min(end, self.number_of_rows)
+        for index in range(start, end):
+            yield self.row(index)
+
+    def __iter__(self) -> Iterator[Tuple[Tuple[int, ...], int]]:
+        return self.rows()
+
+    def __repr__(self) -> str:
+        return f"EquationsMatrix({self.path}, {self.number_of_rows} rows of {self.number_of_variables} variables)"
+
+
+def get_matrix_path(number_of_variables: int, coefficiets_range: Tuple[int, int], integer_range: Tuple[int, int],
+                    max_support: Union[int, None], cache_directory: Path) -> Path:
+    support_key = "all" if max_support is None else str(max_support)
+    file_name = f"equations_n{number_of_variables}_c{coefficiets_range[0]}_{coefficiets_range[1]}" \
+                f"_i{integer_range[0]}_{integer_range[1]}_k{support_key}.bin"
+    return cache_directory / file_name
+
+
+def write_equations_matrix(path: Path, number_of_variables: int, coefficiets_range: Tuple[int, int],
+                           integer_range: Tuple[int, int], max_support: Union[int, None]) -> None:
+    """
+    Enumerates the equations in the same order as Equation.all_equations, and writes them to path.
+    The file is written under a temporary name and then renamed, so concurrent workers never see a partial matrix.
+    """
+    typecode = get_typecode(coefficiets_range, integer_range)
+    all_integers = range(integer_range[0], integer_range[1] + 1)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    file_descriptor, temporary_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            file.write(bytes(HEADER_SIZE))
+            number_of_rows = 0
+            buffer = array(typecode)
+            for vector in all_coefficient_vectors(number_of_variables, coefficiets_range[0], coefficiets_range[1],
+                                                  max_support):
+                for integer in all_integers:
+                    buffer.extend(vector)
+                    buffer.append(integer)
+                    number_of_rows += 1
+                if len(buffer) >= ROWS_PER_WRITE * (number_of_variables + 1):
+                    buffer.tofile(file)
+                    buffer = array(typecode)
+            buffer.tofile(file)
+            file.seek(0)
+            file.write(struct.pack(HEADER_FORMAT, MAGIC, typecode.encode(), number_of_variables, number_of_rows))
+        os.replace(temporary_name, path)
+    except BaseException:
+        if os.path.exists(temporary_name):
+            os.remove(temporary_name)
+        raise
+
+
+OPEN_MATRICES: Dict[Path, EquationsMatrix] = {}
+
+def get_equations_matrix(number_of_variables: int, coefficiets_range: Tuple[int, int], integer_range: Tuple[int, int],
+                         max_support: Union[int, None] = None,
+                         cache_directory: Union[Path, None] = None) -> EquationsMatrix:
+    """
+    Returns the matrix of all candidate equations for the given parameters.
+    It is enumerated only once - by the first process that asks for it - and then opened from the cache directory.
+    """
+    if cache_directory is None:
+        cache_directory = get_default_cache_directory()
+    path = get_matrix_path(number_of_variables, coefficiets_range, integer_range, max_support, Path(cache_directory))
+    if path in OPEN_MATRICES:
+        return OPEN_MATRICES[path]
+    number_of_rows = count_coefficient_vectors(number_of_variables, coefficiets_range[0], coefficiets_range[1],
+                                               max_support) * (integer_range[1] - integer_range[0] + 1)
+    expected_header = (get_typecode(coefficiets_range, integer_range), number_of_variables, number_of_rows)
+    try:
+        OPEN_MATRICES[path] = EquationsMatrix(path, expected_header)
+    except (OSError, ValueError):
+        # Missing, truncated, or written for other parameters: enumerate it again.
+        write_equations_matrix(path, number_of_variables, coefficiets_range, integer_range, max_support)
+        OPEN_MATRICES[path] = EquationsMatrix(path, expected_header)
+    return OPEN_MATRICES[path]
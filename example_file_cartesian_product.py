@@ -1,12 +1,17 @@
 from pathlib import Path
-from saav_parser import Program
+from typing import Union
+from saav_parser import load_program
 from control_flow_graph import ControlFlowGraph
 from analysis_cartesian_product import ParitySummationCartesianProduct
+from cfg_export import export_cfg
 from fixpoint import chaotic_iteration
 
-def run_example(index: int):
+def run_example(index: int, export_path: Union[Path, None] = None):
+    """
+    If export_path is given, the CFG is exported there, annotated with the fixpoint (see cfg_export.py).
+    """
     path_to_program: Path = Path(f'examples_combined\example{index}.txt')
-    p = Program(path_to_program)
+    p = load_program(path_to_program)
 
     cfg = ControlFlowGraph(program=p)
 
@@ -16,9 +21,11 @@ def run_example(index: int):
                                         integer_range=(-1, 1))
 
     # cfg.run_cfg()
-    cfg.plot_graph()
     # vanilla_fixpoint(cfg, parity_analyzer)
-    result = chaotic_iteration(cfg, summation_analyser)
+    visit_counts = {}
+    result = chaotic_iteration(cfg, summation_analyser, visit_counts)
+    if export_path is not None:
+        export_cfg(cfg, export_path, states=result, visit_counts=visit_counts)
     # for item in result:
     #     print(item)
 
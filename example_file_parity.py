@@ -1,4 +1,4 @@
-from saav_parser import Program
+from saav_parser import load_program
 from control_flow_graph import ControlFlowGraph
 from fixpoint import vanilla_fixpoint, chaotic_iteration
 from pathlib import Path
@@ -6,7 +6,7 @@ from analysis_parity import ParityStaticAnalyzer
 
 def run_parity_example(index: int):
     path_to_program: Path = Path(f'examples_pairty\example{index}.txt')
-    p = Program(path_to_program)
+    p = load_program(path_to_program)
 
     cfg = ControlFlowGraph(program=p)
 
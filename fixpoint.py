@@ -1,7 +1,10 @@
 from control_flow_graph import ControlFlowGraph
 from time import time
+from typing import Dict, Union
 
 def vanilla_fixpoint(cfg, analyzer):
+    if hasattr(analyzer, 'compile_cfg'):
+        analyzer.compile_cfg(cfg)
     nodes = cfg.nodes
     states_dictionary = {n: analyzer.lattice_class.bottom() for n in nodes}
     start_node = cfg.find_start_label()
@@ -19,7 +22,12 @@ def vanilla_fixpoint(cfg, analyzer):
         iteration = iteration + 1
     return states_dictionary
 
-def chaotic_iteration(cfg, analyzer):
+def chaotic_iteration(cfg, analyzer, visit_counts: Union[Dict[int, int], None] = None):
+    """
+    If visit_counts is given, it is filled with the number of times every node was taken from the worklist.
+    """
+    if hasattr(analyzer, 'compile_cfg'):
+        analyzer.compile_cfg(cfg)
     nodes = cfg.nodes
     states_dictionary = {n: analyzer.lattice_class.bottom() for n in nodes}
     start_node = cfg.find_start_label()
@@ -32,6 +40,8 @@ def chaotic_iteration(cfg, analyzer):
         print(f"\nIteration #{iteration} (started after {int(time()-start_time)} seconds).")
         print(f"Current worklist: {worklist}.")
         node = worklist.pop()
+        if visit_counts is not None:
+            visit_counts[node] = visit_counts.get(node, 0) + 1
         new_dictionary = update_node_state(cfg, states_dictionary, node, analyzer)
         if new_dictionary != states_dictionary: 
             dependencies = create_dependencies_of_node(cfg,node)
@@ -0,0 +1,55 @@
+"""
+Measures the import time of the parity and concrete code paths, each in a fresh interpreter, and checks it against
+a budget - and that none of the heavy dependencies (sympy, numpy, networkx, matplotlib) is imported on these paths.
+These are the paths which batch jobs and worker processes start with, so their startup should stay cheap.
+Exits with a non-zero status if a path is over its budget.
+"""
+import subprocess
+import sys
+from typing import Dict, List, Set, Tuple
+
+IMPORT_PATHS: Dict[str, List[str]] = {
+    "parity": ["saav_parser", "control_flow_graph", "fixpoint", "analysis_parity"],
+    "concrete": ["saav_parser", "control_flow_graph", "concrete_interpreter", "concrete_state_explorer"],
+}
+IMPORT_TIME_BUDGET = 0.3   # Seconds, per path.
+HEAVY_MODULES = ["sympy", "numpy", "networkx", "matplotlib"]
+REPETITIONS = 5            # The fastest of these is reported, to factor out a cold file system cache.
+
+MEASURE_IMPORTS = """
+import sys, time
+start = time.perf_counter()
+for module in sys.argv[1:]:
+    __import__(module)
+print(time.perf_counter() - start)
+print(",".join(module for module in {heavy_modules} if module in sys.modules))
+"""
+
+
+def measure_import_path(modules: List[str]) -> Tuple[float, List[str]]:
+    """
+    Returns the import time of the modules, and the heavy modules they imported in any of the repetitions.
+    """
+    import_time, heavy_modules = float("inf"), set()  # type: float, Set[str]
+    for _ in range(REPETITIONS):
+        output = subprocess.run([sys.executable, "-c", MEASURE_IMPORTS.format(heavy_modules=HEAVY_MODULES)] + modules,
+                                capture_output=True, text=True, check=True).stdout.split("\n")
+        import_time = min(import_time, float(output[0]))
+        heavy_modules.update(module for module in output[1].split(",") if module != "")
+    return import_time, sorted(heavy_modules)
+
+
+def main() -> int:
+    within_budget = True
+    for path_name, modules in IMPORT_PATHS.items():
+        import_time, heavy_modules = measure_import_path(modules)
+        passed = import_time <= IMPORT_TIME_BUDGET and not heavy_modules
+        within_budget = within_budget and passed
+        print(f"The {path_name} path imports in {import_time * 1000:.0f}ms (budget: {IMPORT_TIME_BUDGET * 1000:.0f}ms)" +
+              (f", and imports {', '.join(heavy_modules)}" if heavy_modules else "") +
+              (". OK." if passed else ". OVER BUDGET!"))
+    return 0 if within_budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
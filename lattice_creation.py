@@ -1,9 +1,47 @@
 from __future__ import annotations
 from abc import abstractmethod, ABC
 from enum import Enum
-from typing import List, Type, Tuple, Dict, Set, Iterator
+from functools import wraps
+from inspect import signature
+from itertools import combinations, product
+from typing import List, Type, Tuple, Dict, Set, FrozenSet, Iterator, Union, Hashable
+from weakref import WeakValueDictionary
+
+from bdd import BDDManager, FALSE
+from saav_parser import SymbolTable
+
+
+def as_hashable(value) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(as_hashable(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return value
+
+def memoized_factory(factory):
+    """
+    Memoises a class factory: calling it again with the same arguments returns the same class,
+    so identical configurations (variables, base classes, ranges) share one class, with its precomputed tables
+    and its interned elements, across all the analyzers of a process.
+    Arguments are compared after binding them to the factory's parameters, and lists are compared as tuples.
+    """
+    factory_signature = signature(factory)
+    classes: Dict[Tuple, type] = {}
+
+    @wraps(factory)
+    def memoized(*args, **kwargs):
+        bound_arguments = factory_signature.bind(*args, **kwargs)
+        bound_arguments.apply_defaults()
+        key = tuple(as_hashable(value) for value in bound_arguments.arguments.values())
+        if key not in classes:
+            classes[key] = factory(*args, **kwargs)
+        return classes[key]
+
+    memoized.classes = classes
+    return memoized
 
 class Lattice(ABC):
+    __slots__ = ()
 
     @abstractmethod
     def top() -> Lattice:
@@ -47,24 +85,86 @@ class Lattice(ABC):
             join_result = join_result.join(element)
         return join_result
 
+class Interned:
+    """
+    A base for hash-consed lattice elements.
+    Elements are immutable, and each one is canonical: constructing an element with the key of a live element
+    returns that same object. So equality is identity, the hash is computed once, and equal states
+    (for instance at different labels of the fixpoint) share one object.
+    Every subclass gets its own table of live elements, and creates its elements with _intern(key, **fields).
+    """
+    __slots__ = ('_hash', '__weakref__')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._interned_elements = WeakValueDictionary()
+
+    @classmethod
+    def _intern(cls, key: Hashable, **fields):
+        element = cls._interned_elements.get(key)
+        if element is None:
+            element = object.__new__(cls)
+            for name, value in fields.items():
+                object.__setattr__(element, name, value)
+            object.__setattr__(element, '_hash', hash(key))
+            cls._interned_elements[key] = element
+        return element
+
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    def __ne__(self, other) -> bool:
+        return self is not other
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"{type(self).__name__} elements are immutable.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} elements are immutable.")
+
+    def copy(self):
+        return self
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
 class Itemable(ABC):
+    """
+    An immutable mapping from variables to values.
+    Instead of setting an item in place, updated() returns a new object.
+    """
+    __slots__ = ()
+
     @abstractmethod
     def __getitem__(self, variable: str):
         pass
-    @abstractmethod
+
     def __setitem__(self, variable: str, value):
+        raise TypeError(f"{type(self).__name__} is immutable - use updated({variable!r}, value) instead.")
+
+    @abstractmethod
+    def updated(self, variable: str, value) -> Itemable:
         pass
 
 class ItemableLattice(Itemable, Lattice):
-    pass
+    __slots__ = ()
 
+@memoized_factory
 def create_cartesian_product_lattice(variables: List[str], lattice_class: Type[Lattice]) -> Type[ItemableLattice]:
     #This function creates the cartesian product of n copies of the lattice, one of each variable
 
-    class cartesian_product(ItemableLattice):
-        def __init__(self, tuple: Tuple[lattice_class]):
-            self.tuple: Tuple[lattice_class] = tuple
-            self.index_of_variables: Dict[str, int] = {v: i for i, v in enumerate(variables)}
+    class cartesian_product(Interned, ItemableLattice):
+        __slots__ = ('tuple',)
+        index_of_variables: Dict[str, int] = SymbolTable(variables).variable_ids
+
+        def __new__(cls, tuple: Tuple[lattice_class]):
+            return cls._intern(tuple, tuple=tuple)
 
         @staticmethod
         def top() -> cartesian_product:
@@ -74,62 +174,54 @@ def create_cartesian_product_lattice(variables: List[str], lattice_class: Type[L
         def bottom() -> cartesian_product:
             return cartesian_product(tuple(lattice_class.bottom() for _ in variables))
         
-        def __eq__(self: cartesian_product, other: cartesian_product) -> bool:
-            return self.tuple == other.tuple
-        
         def __getitem__(self, variable: str) -> lattice_class:
             index_of_variable = self.index_of_variables[variable]
             return self.tuple[index_of_variable]
         
-        def __setitem__(self, variable_to_set: str, value: lattice_class) -> None:
-            self.tuple = tuple(self[variable] if variable != variable_to_set else value
-                               for variable in variables)
+        def updated(self, variable_to_set: str, value: lattice_class) -> cartesian_product:
+            index_of_variable = self.index_of_variables[variable_to_set]
+            old_tuple = self.tuple
+            return type(self)(old_tuple[:index_of_variable] + (value, ) + old_tuple[index_of_variable + 1:])
         
         def __le__(self: cartesian_product, other: cartesian_product) -> bool:
-            return all([self[var] <= other[var] for var in variables])
-        
+            return all(mine <= others for mine, others in zip(self.tuple, other.tuple))
 
         def meet(self: cartesian_product, other: cartesian_product) -> cartesian_product:
-            meet_tuple: Tuple[lattice_class] = tuple()
-            for var in variables:
-                new_element = self[var].meet(other[var])
-                meet_tuple += (new_element, )
-            return cartesian_product(tuple=meet_tuple)
+            return cartesian_product(tuple=tuple(mine.meet(others) for mine, others in zip(self.tuple, other.tuple)))
         
         def join(self: cartesian_product, other: cartesian_product) -> cartesian_product:
-            join_tuple: Tuple[lattice_class] = tuple()
-            for var in variables:
-                new_element = self[var].join(other[var])
-                join_tuple += (new_element, )
-            return cartesian_product(tuple=join_tuple)
-
-        def __hash__(self):
-            return hash(self.tuple)
-        
+            return cartesian_product(tuple=tuple(mine.join(others) for mine, others in zip(self.tuple, other.tuple)))
+
         def __repr__(self) -> str:
             return self.tuple.__repr__()
-        
-        def __copy__(self):
-            copy_of_tuple = tuple(value for value in self.tuple)
-            return cartesian_product(copy_of_tuple)
     
     return cartesian_product
 
 class Listable(ABC):
     """
     This is a lattice for which it is possible to count all elements in it.
+    all_elements() may return a lazy iterator, so use number_of_elements() to count them.
     """
+    __slots__ = ()
+
     @abstractmethod
-    def all_elements() -> List[Listable]:
+    def all_elements() -> Iterator[Listable]:
         pass
     
     @abstractmethod
     def copy(self: Listable) -> Listable:
         pass
 
+    @classmethod
+    def number_of_elements(cls) -> int:
+        # Generated classes override this with a formula, so that nothing is enumerated.
+        return sum(1 for _ in cls.all_elements())
+
 class ListableLattice(Lattice, Listable):
+    __slots__ = ()
+
     @abstractmethod
-    def all_elements() -> List[ListableLattice]:
+    def all_elements() -> Iterator[ListableLattice]:
         pass
     
     @abstractmethod
@@ -140,147 +232,469 @@ class ListableLattice(Lattice, Listable):
     def __iter__() -> Iterator[ListableLattice]:
         pass
 
+@memoized_factory
 def create_cartesian_product_listable_lattice(variables: List[str], lattice_class: Type[ListableLattice]) -> Type[ListableLattice]:
     cartesian_product_class: Type[Lattice] = create_cartesian_product_lattice(variables, lattice_class)
 
     class cartesian_product_listable(ListableLattice, cartesian_product_class):
+        __slots__ = ()
+
         @staticmethod
-        def all_elements() -> List[cartesian_product_listable]:
-            result: List[Tuple[lattice_class]] = [tuple()]
-            base_lattice_all: List[lattice_class] = lattice_class.all_elements()
-            for _ in variables:
-                new_elements = [] 
-                for curent_element in result:
-                    for base_element in base_lattice_all:
-                        new_element = curent_element + (base_element, )
-                        new_elements.append(new_element)
-                result = new_elements
-            return [cartesian_product_class(tup) for tup in result] # type: ignore
-        
-        def copy(self: cartesian_product_listable) -> cartesian_product_listable:
-            tuple_copy = tuple(element.copy() for element in self.tuple) # type: ignore
-            return cartesian_product_class(tuple_copy) # type: ignore
+        def all_elements() -> Iterator[cartesian_product_listable]:
+            base_lattice_all: List[lattice_class] = list(lattice_class.all_elements())
+            for tup in product(base_lattice_all, repeat=len(variables)):
+                yield cartesian_product_class(tup) # type: ignore
 
+        @staticmethod
+        def number_of_elements() -> int:
+            return lattice_class.number_of_elements() ** len(variables)
+        
     return cartesian_product_listable
 
+@memoized_factory
 def create_disjunctive_completion_lattice(base_class: Type[Listable]) -> Type[ListableLattice]:
     #This function creates the disjunctive completion of a base class
-    class disjunctive_completion(ListableLattice):
-        def __init__(self, set: Set[base_class]):
-            self.set: Set[base_class] = set #elements is a set of class objects from the lattice_class
+    class disjunctive_completion(Interned, ListableLattice):
+        """
+        The top element is symbolic: its set is None, and the base elements are enumerated only when iterating over it.
+        A set of all the base elements is canonicalized to that top.
+        """
+        __slots__ = ('set',)
+
+        def __new__(cls, set: Union[Set[base_class], None]):
+            if set is not None:
+                set = frozenset(set) #elements is a set of class objects from the lattice_class
+                if len(set) == base_class.number_of_elements():
+                    set = None
+            return cls._intern(set, set=set)
 
         @staticmethod
         def top():
-            return disjunctive_completion(set(base_class.all_elements())) 
+            return disjunctive_completion(None)
 
         @staticmethod
         def bottom():
             return disjunctive_completion(set())
-        
-        def __eq__(self: disjunctive_completion, other: disjunctive_completion):
-            return self.set == other.set
+
+        def is_top(self) -> bool:
+            return self.set is None
         
         def __le__(self: disjunctive_completion, other: disjunctive_completion):
+            if other.set is None:
+                return True
+            if self.set is None:
+                return False
             return self.set.issubset(other.set)
                 
         def meet(self: disjunctive_completion, other: disjunctive_completion):
+            if self.set is None:
+                return other
+            if other.set is None:
+                return self
             return disjunctive_completion(set=self.set.intersection(other.set))
         
         def join(self: disjunctive_completion, other: disjunctive_completion):
+            if self.set is None or other.set is None:
+                return disjunctive_completion.top()
             return disjunctive_completion(set=self.set.union(other.set))
         
         def __repr__(self) -> str:
+            if self.set is None:
+                return f"TOP (all {base_class.number_of_elements()} elements)"
             return self.set.__repr__()
         
-        def copy(self: disjunctive_completion):
-            return disjunctive_completion({s.copy() for s in self.set})
-        
         def __iter__(self) -> Iterator[base_class]:
-            for element in self.set:
+            elements = base_class.all_elements() if self.set is None else self.set
+            for element in elements:
                 yield element
         
         @staticmethod
-        def all_elements() -> List[disjunctive_completion]:
-            result: List[Set[base_class]] = [set()] 
-            base_lattice_all = base_class.all_elements()
-            for base_elem in base_lattice_all:
-                new_elements = []
-                for cur_elem in result:
-                    new_elements.append(cur_elem)
-                    new_element = cur_elem.copy()
-                    new_element.add(base_elem)
-                    new_elements.append(new_element)
-                result = new_elements
-            return [disjunctive_completion(s) for s in result]            
+        def all_elements() -> Iterator[disjunctive_completion]:
+            base_lattice_all = list(base_class.all_elements())
+            for size in range(len(base_lattice_all) + 1):
+                for subset in combinations(base_lattice_all, size):
+                    yield disjunctive_completion(set(subset))
+
+        @staticmethod
+        def number_of_elements() -> int:
+            return 2 ** base_class.number_of_elements()
 
     return disjunctive_completion            
 
+@memoized_factory
 def create_relational_product_lattice(variables: List[str], lattice_class: Type[ListableLattice]) -> Type[ListableLattice]:
     cartesian_product: Type[ListableLattice] = create_cartesian_product_listable_lattice(variables, lattice_class)
     relational_product: Type[ListableLattice] = create_disjunctive_completion_lattice(cartesian_product)
     return relational_product
 
 class ListableItemable(Listable, Itemable):
-    pass
+    __slots__ = ()
 
+@memoized_factory
 def create_tuple_class(variables, base_class: Type[Listable]) -> Type[ListableItemable]:
     
-    class tuple_class(ListableItemable):
-        def __init__(self, tuple: Tuple[base_class]):
-            self.tuple: Tuple[base_class] = tuple
-            self.index_of_variables: Dict[str, int] = {v: i for i, v in enumerate(variables)}
+    class tuple_class(Interned, ListableItemable):
+        __slots__ = ('tuple',)
+        index_of_variables: Dict[str, int] = SymbolTable(variables).variable_ids
+
+        def __new__(cls, tuple: Tuple[base_class]):
+            return cls._intern(tuple, tuple=tuple)
 
         def __getitem__(self, variable) -> base_class:
             index_of_variable = self.index_of_variables[variable]
             return self.tuple[index_of_variable]
         
-        def __setitem__(self, variable_to_set, value):
-            self.tuple = tuple(self[variable] if variable != variable_to_set else value
-                               for variable in variables)
+        def updated(self, variable_to_set, value) -> tuple_class:
+            index_of_variable = self.index_of_variables[variable_to_set]
+            old_tuple = self.tuple
+            return tuple_class(old_tuple[:index_of_variable] + (value, ) + old_tuple[index_of_variable + 1:])
         
-        def __eq__(self, other):
-            return self.tuple == other.tuple
-
-        def __hash__(self):
-            return hash(self.tuple)
-
         def __repr__(self) -> str:
             return self.tuple.__repr__()
         
-        def copy(self):
-            copy_of_tuple = tuple(value for value in self.tuple)
-            return tuple_class(copy_of_tuple)
-        
         @staticmethod
-        def all_elements():
-            result: List[Tuple[base_class]] = [tuple()]
-            base_class_all = base_class.all_elements()
-            for _ in variables:
-                new_elements = [] 
-                for curent_element in result:
-                    for base_element in base_class_all:
-                        new_element = curent_element + (base_element, )
-                        new_elements.append(new_element)
-                result = new_elements
-            return [tuple_class(tup) for tup in result]
+        def all_elements() -> Iterator[tuple_class]:
+            base_class_all = list(base_class.all_elements())
+            for tup in product(base_class_all, repeat=len(variables)):
+                yield tuple_class(tup)
+
+        @staticmethod
+        def number_of_elements() -> int:
+            return base_class.number_of_elements() ** len(variables)
 
     return tuple_class
 
+@memoized_factory
 def create_tuple_subsets_lattice(variables: List[str], base_class: Type[Listable]) -> Type[ListableLattice]:
     #this is like a relational product - only you don't need to start from a class
     tuple_class: Type[ListableItemable] = create_tuple_class(variables, base_class)
     tuple_subsets_lattice: Type[ListableLattice] = create_disjunctive_completion_lattice(tuple_class)
     return tuple_subsets_lattice
 
+@memoized_factory
+def create_bitset_tuple_subsets_lattice(variables: List[str], base_class: Type[Listable],
+                                        tuple_class: Type[ListableItemable] = None) -> Type[ListableLattice]:
+    """
+    The same lattice as create_tuple_subsets_lattice, but an element is a single integer bitmask.
+    Every tuple (b1, ..., bn) of base elements is given the index sum(index(bi) * k^(i-1)),
+    where k is the number of base elements, and the element holds the bits of the tuples in it.
+    So join, meet, equality and <= are single bitwise operations,
+    and tuple objects are created only when iterating over an element.
+    """
+    if tuple_class is None:
+        tuple_class = create_tuple_class(variables, base_class)
+    base_elements: List[base_class] = list(base_class.all_elements())
+    index_of_base_element: Dict[base_class, int] = {b: i for i, b in enumerate(base_elements)}
+    radix: int = len(base_elements)
+    index_of_variables: Dict[str, int] = SymbolTable(variables).variable_ids
+    number_of_tuples: int = radix ** len(variables)
+    full_mask: int = (1 << number_of_tuples) - 1
+    value_masks: Dict[Tuple[str, base_class], int] = {}
+
+    def stride(variable: str) -> int:
+        return radix ** index_of_variables[variable]
+
+    class bitset_tuple_subsets(Interned, ListableLattice):
+        __slots__ = ('mask',)
+
+        def __new__(cls, mask: int):
+            return cls._intern(mask, mask=mask)
+
+        @staticmethod
+        def top() -> bitset_tuple_subsets:
+            return bitset_tuple_subsets(full_mask)
+
+        @staticmethod
+        def bottom() -> bitset_tuple_subsets:
+            return bitset_tuple_subsets(0)
+
+        def __le__(self: bitset_tuple_subsets, other: bitset_tuple_subsets) -> bool:
+            return self.mask & ~other.mask == 0
+
+        def meet(self: bitset_tuple_subsets, other: bitset_tuple_subsets) -> bitset_tuple_subsets:
+            return bitset_tuple_subsets(self.mask & other.mask)
+
+        def join(self: bitset_tuple_subsets, other: bitset_tuple_subsets) -> bitset_tuple_subsets:
+            return bitset_tuple_subsets(self.mask | other.mask)
+
+        def difference(self: bitset_tuple_subsets, other: bitset_tuple_subsets) -> bitset_tuple_subsets:
+            return bitset_tuple_subsets(self.mask & ~other.mask)
+
+        def __len__(self) -> int:
+            return bin(self.mask).count("1")
+
+        def __repr__(self) -> str:
+            if len(self) > 100:
+                # Too long to print...
+                first_ten_tuples = ', '.join(t.__repr__() for _, t in zip(range(10), self))
+                return "...{" + first_ten_tuples + f", ... ({len(self)} tuples)" + "}..."
+            return set(self).__repr__()
+
+        def __iter__(self) -> Iterator[tuple_class]:
+            for index in bitset_tuple_subsets.indices_of_mask(self.mask):
+                yield bitset_tuple_subsets.tuple_of_index(index)
+
+        @staticmethod
+        def indices_of_mask(mask: int) -> Iterator[int]:
+            # Scans the mask byte by byte, since removing bits one by one from a huge integer is quadratic.
+            mask_bytes = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+            for byte_index, byte in enumerate(mask_bytes):
+                while byte:
+                    lowest_bit = byte & -byte
+                    yield 8 * byte_index + lowest_bit.bit_length() - 1
+                    byte ^= lowest_bit
+
+        @staticmethod
+        def all_elements() -> Iterator[bitset_tuple_subsets]:
+            for mask in range(full_mask + 1):
+                yield bitset_tuple_subsets(mask)
+
+        @staticmethod
+        def number_of_elements() -> int:
+            return 1 << number_of_tuples
+
+        @staticmethod
+        def index_of_tuple(element: tuple_class) -> int:
+            return sum(index_of_base_element[element[v]] * stride(v) for v in variables)
+
+        @staticmethod
+        def tuple_of_index(index: int) -> tuple_class:
+            values = []
+            for _ in variables:
+                index, base_index = divmod(index, radix)
+                values.append(base_elements[base_index])
+            return tuple_class(tuple(values))
+
+        @staticmethod
+        def from_tuples(tuples) -> bitset_tuple_subsets:
+            mask = 0
+            for element in tuples:
+                mask |= 1 << bitset_tuple_subsets.index_of_tuple(element)
+            return bitset_tuple_subsets(mask)
+
+        @staticmethod
+        def value_mask(variable: str, value: base_class) -> int:
+            """
+            The mask of all tuples in which variable has the given value.
+            Within every block of radix * stride(variable) tuples, these are the stride(variable) tuples
+            starting at index(value) * stride(variable). The block is repeated by a single multiplication.
+            """
+            if (variable, value) not in value_masks:
+                block_length = radix * stride(variable)
+                block = ((1 << stride(variable)) - 1) << (index_of_base_element[value] * stride(variable))
+                repeat = full_mask // ((1 << block_length) - 1)
+                value_masks[(variable, value)] = block * repeat
+            return value_masks[(variable, value)]
+
+        @staticmethod
+        def value_set(variable: str, value: base_class) -> bitset_tuple_subsets:
+            """The element of all tuples in which variable has the given value."""
+            return bitset_tuple_subsets(bitset_tuple_subsets.value_mask(variable, value))
+
+        # A transition is a list of (mask, shift) pairs. Applying it to an element moves every tuple in
+        # (element & mask) by shift indices (that is, changes the values of some variables), and joins the results.
+        # Transfer functions are compiled into transitions once, and then applied with a few bitwise operations.
+
+        def apply_transition(self, transition: List[Tuple[int, int]]) -> bitset_tuple_subsets:
+            mask = 0
+            for transition_mask, shift in transition:
+                part = self.mask & transition_mask
+                mask |= part << shift if shift >= 0 else part >> -shift
+            return bitset_tuple_subsets(mask)
+
+        @staticmethod
+        def merge_transition(pairs) -> List[Tuple[int, int]]:
+            # Pairs with the same shift are merged into one.
+            masks_by_shift: Dict[int, int] = {}
+            for transition_mask, shift in pairs:
+                masks_by_shift[shift] = masks_by_shift.get(shift, 0) | transition_mask
+            return [(transition_mask, shift) for shift, transition_mask in masks_by_shift.items() if transition_mask]
+
+        @staticmethod
+        def identity_transition() -> List[Tuple[int, int]]:
+            return [(full_mask, 0)]
+
+        @staticmethod
+        def restrict_transition(variable: str, value: base_class) -> List[Tuple[int, int]]:
+            """Keeps the tuples in which variable has the given value."""
+            return [(bitset_tuple_subsets.value_mask(variable, value), 0)]
+
+        @staticmethod
+        def restrict_equal_transition(first_variable: str, second_variable: str) -> List[Tuple[int, int]]:
+            """Keeps the tuples in which both variables have the same value."""
+            return bitset_tuple_subsets.merge_transition(
+                (bitset_tuple_subsets.value_mask(first_variable, value) &
+                 bitset_tuple_subsets.value_mask(second_variable, value), 0) for value in base_elements)
+
+        @staticmethod
+        def assign_transition(variable: str, value: base_class) -> List[Tuple[int, int]]:
+            """Sets variable to value in every tuple."""
+            return bitset_tuple_subsets.assign_from_transition(variable, variable, lambda _: value)
+
+        @staticmethod
+        def forget_transition(variable: str) -> List[Tuple[int, int]]:
+            """Replaces every tuple with all the tuples that differ from it only in variable."""
+            return bitset_tuple_subsets.merge_transition(
+                (bitset_tuple_subsets.value_mask(variable, old_value),
+                 (index_of_base_element[new_value] - index_of_base_element[old_value]) * stride(variable))
+                for old_value in base_elements for new_value in base_elements)
+
+        @staticmethod
+        def assign_from_transition(variable: str, source_variable: str, function) -> List[Tuple[int, int]]:
+            """Sets variable to function(value of source_variable) in every tuple."""
+            return bitset_tuple_subsets.merge_transition(
+                (bitset_tuple_subsets.value_mask(source_variable, source_value) &
+                 bitset_tuple_subsets.value_mask(variable, old_value),
+                 (index_of_base_element[function(source_value)] - index_of_base_element[old_value]) * stride(variable))
+                for source_value in base_elements for old_value in base_elements)
+
+    return bitset_tuple_subsets
+
+@memoized_factory
+def create_bdd_tuple_subsets_lattice(variables: List[str], base_class: Type[Listable],
+                                     tuple_class: Type[ListableItemable] = None) -> Type[ListableLattice]:
+    """
+    The same lattice as create_tuple_subsets_lattice, but an element is a node of a reduced ordered BDD (see bdd.py).
+    Every variable is encoded by the bits of the index of its base element, and the variables are ordered
+    as in the program. All elements of the lattice share one BDDManager, so equal sets of tuples are the same node.
+    Unlike the bitset lattice, the size of an element depends on the structure of the relation it holds
+    and not on the number of tuples, so it scales to many variables.
+    """
+    if tuple_class is None:
+        tuple_class = create_tuple_class(variables, base_class)
+    base_elements: List[base_class] = list(base_class.all_elements())
+    index_of_base_element: Dict[base_class, int] = {b: i for i, b in enumerate(base_elements)}
+    bits_per_variable: int = max(1, (len(base_elements) - 1).bit_length())
+    manager: BDDManager = BDDManager(len(variables) * bits_per_variable)
+    levels_of_variable: Dict[str, FrozenSet[int]] = {
+        v: frozenset(range(i * bits_per_variable, (i + 1) * bits_per_variable)) for i, v in enumerate(variables)}
+
+    def levels_and_bits(variable: str, value: base_class) -> Iterator[Tuple[int, bool]]:
+        first_level = min(levels_of_variable[variable])
+        index = index_of_base_element[value]
+        for bit in range(bits_per_variable):
+            # The first level of a variable holds the most significant bit of its index.
+            yield first_level + bit, bool((index >> (bits_per_variable - 1 - bit)) & 1)
+
+    value_nodes: Dict[Tuple[str, base_class], int] = {
+        (v, b): manager.conjunction(manager.literal(level, bit) for level, bit in levels_and_bits(v, b))
+        for v in variables for b in base_elements}
+    # The codes which are not indices of base elements are never in an element.
+    valid_nodes: Dict[str, int] = {v: manager.disjunction(value_nodes[(v, b)] for b in base_elements)
+                                   for v in variables}
+    full_node: int = manager.conjunction(valid_nodes[v] for v in variables)
+
+    class bdd_tuple_subsets(Interned, ListableLattice):
+        __slots__ = ('node',)
+
+        def __new__(cls, node: int):
+            return cls._intern(node, node=node)
+
+        @staticmethod
+        def top() -> bdd_tuple_subsets:
+            return bdd_tuple_subsets(full_node)
+
+        @staticmethod
+        def bottom() -> bdd_tuple_subsets:
+            return bdd_tuple_subsets(FALSE)
+
+        def __le__(self: bdd_tuple_subsets, other: bdd_tuple_subsets) -> bool:
+            return manager.apply('diff', self.node, other.node) == FALSE
+
+        def meet(self: bdd_tuple_subsets, other: bdd_tuple_subsets) -> bdd_tuple_subsets:
+            return bdd_tuple_subsets(manager.apply('and', self.node, other.node))
+
+        def join(self: bdd_tuple_subsets, other: bdd_tuple_subsets) -> bdd_tuple_subsets:
+            return bdd_tuple_subsets(manager.apply('or', self.node, other.node))
+
+        def difference(self: bdd_tuple_subsets, other: bdd_tuple_subsets) -> bdd_tuple_subsets:
+            return bdd_tuple_subsets(manager.apply('diff', self.node, other.node))
+
+        def __len__(self) -> int:
+            return manager.count(self.node)
+
+        def __repr__(self) -> str:
+            if len(self) > 100:
+                # Too long to print...
+                first_ten_tuples = ', '.join(t.__repr__() for _, t in zip(range(10), self))
+                return "...{" + first_ten_tuples + f", ... ({len(self)} tuples)" + "}..."
+            return set(self).__repr__()
+
+        def __iter__(self) -> Iterator[tuple_class]:
+            for assignment in manager.assignments(self.node):
+                values = []
+                for i in range(len(variables)):
+                    index = 0
+                    for bit in assignment[i * bits_per_variable: (i + 1) * bits_per_variable]:
+                        index = 2 * index + bit
+                    values.append(base_elements[index])
+                yield tuple_class(tuple(values))
+
+        @staticmethod
+        def all_elements() -> Iterator[bdd_tuple_subsets]:
+            all_tuples = list(tuple_class.all_elements())
+            for size in range(len(all_tuples) + 1):
+                for subset in combinations(all_tuples, size):
+                    yield bdd_tuple_subsets.from_tuples(subset)
+
+        @staticmethod
+        def number_of_elements() -> int:
+            return 2 ** tuple_class.number_of_elements()
+
+        @staticmethod
+        def from_tuples(tuples) -> bdd_tuple_subsets:
+            return bdd_tuple_subsets(manager.disjunction(
+                manager.conjunction(value_nodes[(v, element[v])] for v in variables) for element in tuples))
+
+        @staticmethod
+        def value_set(variable: str, value: base_class) -> bdd_tuple_subsets:
+            """The element of all tuples in which variable has the given value."""
+            return bdd_tuple_subsets(manager.apply('and', full_node, value_nodes[(variable, value)]))
+
+        # The transfer functions compute the image of an element directly, with a few BDD operations.
+
+        def restrict_to(self, variable: str, value: base_class) -> bdd_tuple_subsets:
+            """Keeps the tuples in which variable has the given value."""
+            return bdd_tuple_subsets(manager.apply('and', self.node, value_nodes[(variable, value)]))
+
+        def restrict_equal(self, variable: str, other_variable: str) -> bdd_tuple_subsets:
+            """Keeps the tuples in which both variables have the same value."""
+            equal_node = manager.disjunction(manager.apply('and', value_nodes[(variable, b)],
+                                                           value_nodes[(other_variable, b)]) for b in base_elements)
+            return bdd_tuple_subsets(manager.apply('and', self.node, equal_node))
+
+        def forget(self, variable: str) -> bdd_tuple_subsets:
+            """Sets variable to every possible value in every tuple."""
+            forgotten_node = manager.exists(self.node, levels_of_variable[variable])
+            return bdd_tuple_subsets(manager.apply('and', forgotten_node, valid_nodes[variable]))
+
+        def assign(self, variable: str, value: base_class) -> bdd_tuple_subsets:
+            """Sets variable to value in every tuple."""
+            forgotten_node = manager.exists(self.node, levels_of_variable[variable])
+            return bdd_tuple_subsets(manager.apply('and', forgotten_node, value_nodes[(variable, value)]))
+
+        def assign_from(self, variable: str, source_variable: str, function) -> bdd_tuple_subsets:
+            """Sets variable to function(value of source_variable) in every tuple."""
+            return bdd_tuple_subsets(manager.disjunction(
+                manager.apply('and', manager.exists(manager.apply('and', self.node, value_nodes[(source_variable, b)]),
+                                                    levels_of_variable[variable]),
+                              value_nodes[(variable, function(b))])
+                for b in base_elements))
+
+    bdd_tuple_subsets.manager = manager
+    return bdd_tuple_subsets
+
 class ListableEnum(type(Enum), type(Listable)):
     pass
 
+@memoized_factory
 def create_cartesian_product_two_lattices(first_lattice: Type[Lattice], second_lattice: Type[Lattice]) -> Type[Lattice]:
 
-    class cartesian_product(Lattice):
-        def __init__(self, first_element: first_lattice, second_element: second_lattice):
-            self.first_element: first_lattice = first_element
-            self.second_element: second_lattice = second_element
+    class cartesian_product(Interned, Lattice):
+        __slots__ = ('first_element', 'second_element')
+
+        def __new__(cls, first_element: first_lattice, second_element: second_lattice):
+            return cls._intern((first_element, second_element), first_element=first_element, second_element=second_element)
 
         @staticmethod
         def top() -> cartesian_product:
@@ -290,9 +704,6 @@ def create_cartesian_product_two_lattices(first_lattice: Type[Lattice], second_l
         def bottom() -> cartesian_product:
             return cartesian_product(first_element=first_lattice.bottom(), second_element=second_lattice.bottom())
         
-        def __eq__(self: cartesian_product, other: cartesian_product) -> bool:
-            return self.first_element == other.first_element and self.second_element == other.second_element
-                
         def __le__(self: cartesian_product, other: cartesian_product) -> bool:
             return self.first_element <= other.first_element and self.second_element <= other.second_element
         
@@ -306,15 +717,7 @@ def create_cartesian_product_two_lattices(first_lattice: Type[Lattice], second_l
             join_second = self.second_element.join(other.second_element)
             return cartesian_product(first_element=join_first, second_element=join_second)
         
-        def __hash__(self):
-            return hash(self.__repr__)
-        
         def __repr__(self) -> str:
             return f"<{self.first_element.__repr__()}, {self.second_element.__repr__()}>"
-        
-        def __copy__(self):
-            copy_of_first = self.first_element.copy()
-            copy_of_second = self.second_element.copy()
-            return cartesian_product(first_element=copy_of_first, second_element=copy_of_second)
     
     return cartesian_product
@@ -0,0 +1,159 @@
+"""
+Explication split over a pool of worker processes.
+
+The candidates are read by row ranges (chunks) from the memory-mapped EquationsMatrix file (see equations_matrix.py),
+so no equation is ever sent to a worker. The reduced system is encoded once per explication as an integer matrix
+in shared memory, and every task carries only its name and a chunk range.
+"""
+from __future__ import annotations
+
+import atexit
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from math import lcm
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Dict, Iterator, List, Set, Tuple, Type, Union
+
+from equations import is_implied_by_linear_forms
+from equations_matrix import EquationsMatrix
+
+DEFAULT_CHUNK_SIZE = 4096
+INT64_LIMIT = 1 << 63
+
+
+def encode_linear_forms(variables: List[str], linear_forms: Dict[str, Dict[str, Fraction]]) -> Union[array, None]:
+    """
+    Encodes the linear forms of a solution as one integer array:
+    [number of variables, number of columns, denominator, M[0][0], ..., M[n-1][columns-1]].
+    Row i holds the coefficients of variables[i]'s form, over the free variables and then the free integer,
+    all multiplied by a common denominator.
+    Returns None if some value does not fit in 64 bits.
+    """
+    free_keys = sorted({key for form in linear_forms.values() for key in form if key != ""})
+    columns = free_keys + [""]
+    denominator = lcm(*[value.denominator for form in linear_forms.values() for value in form.values()], 1)
+    values = [len(variables), len(columns), denominator]
+    for var in variables:
+        form = linear_forms[var]
+        values.extend(int(form.get(key, Fraction(0)) * denominator) for key in columns)
+    if any(not -INT64_LIMIT <= value < INT64_LIMIT for value in values):
+        return None
+    return array('q', values)
+
+
+def decode_linear_forms(values: List[int]) -> Tuple[int, List[List[int]]]:
+    """
+    Returns the denominator and the columns of an encoded system, where columns[c][i] is M[i][c].
+    """
+    number_of_variables, number_of_columns, denominator = values[0], values[1], values[2]
+    rows = [values[3 + i * number_of_columns: 3 + (i + 1) * number_of_columns] for i in range(number_of_variables)]
+    columns = [[rows[i][c] for i in range(number_of_variables)] for c in range(number_of_columns)]
+    return denominator, columns
+
+
+# Per-worker state: the open matrices, and the last system read from shared memory, keyed by the block's name and
+# the explication id (a block name may be reused once the previous block is unlinked).
+WORKER_MATRICES: Dict[str, EquationsMatrix] = {}
+WORKER_SYSTEM: Dict[Tuple[str, int], Tuple[int, List[List[int]]]] = {}
+
+def read_shared_system(shared_name: str, explication_id: int) -> Tuple[int, List[List[int]]]:
+    key = (shared_name, explication_id)
+    if key not in WORKER_SYSTEM:
+        shared_memory = SharedMemory(name=shared_name)  # The parent process owns (and unlinks) the block.
+        length = array('q', shared_memory.buf[:8].tobytes())[0]
+        values = array('q', shared_memory.buf[8:8 + 8 * length].tobytes()).tolist()
+        shared_memory.close()
+        WORKER_SYSTEM.clear()
+        WORKER_SYSTEM[key] = decode_linear_forms(values)
+    return WORKER_SYSTEM[key]
+
+def find_implied_rows(matrix_path: str, shared_name: str, explication_id: int, start: int, end: int,
+                      mentioned_mask: int, required_index: int) -> List[int]:
+    """
+    The task run by the workers: returns the indices of the rows in [start, end) that are implied by the system.
+    """
+    if matrix_path not in WORKER_MATRICES:
+        WORKER_MATRICES[matrix_path] = EquationsMatrix(Path(matrix_path))
+    equations_matrix = WORKER_MATRICES[matrix_path]
+    denominator, columns = read_shared_system(shared_name, explication_id)
+    free_columns, integer_column = columns[:-1], columns[-1]
+
+    implied_rows: List[int] = []
+    for index, (coefficients, m) in enumerate(equations_matrix.rows(start, end), start):
+        if m == 0 and not any(coefficients):  # "0 = 0".
+            continue
+        if required_index >= 0 and coefficients[required_index] == 0:
+            continue
+        if any(coeff != 0 and not (mentioned_mask >> i) & 1 for i, coeff in enumerate(coefficients)):
+            continue
+        if sum(coeff * value for coeff, value in zip(coefficients, integer_column)) != m * denominator:
+            continue
+        if all(sum(coeff * value for coeff, value in zip(coefficients, column)) == 0 for column in free_columns):
+            implied_rows.append(index)
+    return implied_rows
+
+
+class ExplicationPool:
+    """
+    A reusable pool of worker processes for explication.
+    Use get_explication_pool() to share one pool between every analyzer.
+    """
+    def __init__(self, number_of_workers: int, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.number_of_workers: int = number_of_workers
+        self.chunk_size: int = chunk_size
+        self.executor: ProcessPoolExecutor = ProcessPoolExecutor(max_workers=number_of_workers)
+        self.explication_count: int = 0
+
+    def implied_equations(self, EquationClass: Type, equations_matrix: EquationsMatrix, variables: List[str],
+                          linear_forms: Dict[str, Dict[str, Fraction]], mentioned_variables: Set[str],
+                          required_variable: Union[str, None]) -> Iterator:
+        """
+        Yields the same equations as the sequential loop of equations.get_implied_equations.
+        """
+        encoded_system = encode_linear_forms(variables, linear_forms)
+        if encoded_system is None:  # Huge coefficients - check sequentially.
+            for equation in EquationClass.from_matrix(equations_matrix):
+                if (required_variable is None or required_variable in equation) and \
+                   all(v in mentioned_variables or v not in equation for v in variables) and \
+                   (equation.m != 0 or any(equation.coefficients)) and \
+                   is_implied_by_linear_forms(equation, linear_forms):
+                    yield equation
+            return
+
+        mentioned_mask = sum(1 << i for i, v in enumerate(variables) if v in mentioned_variables)
+        required_index = variables.index(required_variable) if required_variable is not None else -1
+        self.explication_count += 1
+        explication_id = self.explication_count
+        shared_memory = SharedMemory(create=True, size=8 * (len(encoded_system) + 1))
+        try:
+            shared_memory.buf[:8] = array('q', [len(encoded_system)]).tobytes()
+            shared_memory.buf[8:8 + 8 * len(encoded_system)] = encoded_system.tobytes()
+            futures = [self.executor.submit(find_implied_rows, str(equations_matrix.path), shared_memory.name,
+                                            explication_id, start, start + self.chunk_size, mentioned_mask, required_index)
+                       for start in range(0, len(equations_matrix), self.chunk_size)]
+            for future in futures:
+                for index in future.result():
+                    coefficients, m = equations_matrix.row(index)
+                    yield EquationClass(coefficients, m)
+        finally:
+            shared_memory.close()
+            shared_memory.unlink()
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+
+EXPLICATION_POOLS: Dict[int, ExplicationPool] = {}
+
+def get_explication_pool(number_of_workers: int) -> ExplicationPool:
+    if number_of_workers not in EXPLICATION_POOLS:
+        EXPLICATION_POOLS[number_of_workers] = ExplicationPool(number_of_workers)
+    return EXPLICATION_POOLS[number_of_workers]
+
+@atexit.register
+def close_explication_pools() -> None:
+    for pool in EXPLICATION_POOLS.values():
+        pool.close()
+    EXPLICATION_POOLS.clear()
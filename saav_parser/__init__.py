@@ -4,3 +4,6 @@ from saav_parser.e_conditions import ECondition, EConditionType
 from saav_parser.or_conditions import ORCondition
 from saav_parser.and_conditions import ANDCondition
 from saav_parser.bool_conditions import BOOLCondition, BoolConditionType
+from saav_parser.parser import parse_command, tokenize
+from saav_parser.program_cache import load_program
+from saav_parser.symbol_table import SymbolTable, is_variable_name
@@ -1,14 +1,19 @@
 from typing import List
+from saav_parser import parser
 from saav_parser.bool_conditions import BOOLCondition
 
 class ANDCondition:
-    def __init__(self, andcondition_text: str):
-        self.andcondition_text: str = andcondition_text
-        self.conjunction_list: List[BOOLCondition] = self.get_conjunction_list()
+    __slots__ = ('andcondition_text', 'conjunction_list')
 
-    def get_conjunction_list(self) -> List[BOOLCondition]:
-        parsed_text: List[str] = self.andcondition_text.split('  ')
-        return [BOOLCondition(boolcondition_text=word) for word in parsed_text]
+    def __new__(cls, andcondition_text: str):
+        return parser.parse_andcondition(andcondition_text)
+
+    @classmethod
+    def _build(cls, andcondition_text: str, conjunction_list: List[BOOLCondition]) -> "ANDCondition":
+        and_condition = object.__new__(cls)
+        and_condition.andcondition_text = andcondition_text
+        and_condition.conjunction_list = conjunction_list
+        return and_condition
 
     def __repr__(self) -> str:
         s = ""
@@ -1,8 +1,7 @@
 from enum import Enum
-from typing import List
-from saav_parser.e_conditions import ECondition
-from saav_parser.or_conditions import ORCondition
+from typing import Iterator, List
 from saav_parser.constants import *
+from saav_parser import parser
 
 class CommandType(Enum):
     C_Skip = 1
@@ -15,97 +14,46 @@ class CommandType(Enum):
     C_Assert = 8
 
 class Command:
-    def __init__(self, command_text: str):
-        self.command_text: List[str] = command_text.split(" ")
-        self.command_type: CommandType = self.get_command_type()
-        self.command_parameters: dict = self.get_command_parameters()
-
-    def get_command_type(self) -> CommandType:
-        if self.command_text == ["skip"]:
-            return CommandType.C_Skip
-        
-        if len(self.command_text) == 3 and \
-            self.command_text[0] in VARIABLE_NAMES and \
-            self.command_text[1] == ASSIGNMENT and \
-            self.command_text[2] in VARIABLE_NAMES:
-            return CommandType.C_Assign_Var
-
-        if len(self.command_text) == 3 and \
-            self.command_text[0] in VARIABLE_NAMES and \
-            self.command_text[1] == ASSIGNMENT and \
-            self.command_text[2].isdigit():
-            return CommandType.C_Assign_Const
-        
-        if len(self.command_text) == 3 and \
-            self.command_text[0] in VARIABLE_NAMES and \
-            self.command_text[1] == ASSIGNMENT and \
-            self.command_text[2] == QUESTION_MARK:
-            return CommandType.C_Assign_Unknown
-
-        if len(self.command_text) == 5 and \
-            self.command_text[0] in VARIABLE_NAMES and \
-            self.command_text[1] == ASSIGNMENT and \
-            self.command_text[2] in VARIABLE_NAMES and \
-            self.command_text[3] == PLUS and \
-            self.command_text[4] == ONE_DIGIT:
-            return CommandType.C_Plus1
-        
-        if len(self.command_text) == 5 and \
-            self.command_text[0] in VARIABLE_NAMES and \
-            self.command_text[1] == ASSIGNMENT and \
-            self.command_text[2] in VARIABLE_NAMES and \
-            self.command_text[3] == MINUS and \
-            self.command_text[4] == ONE_DIGIT:
-            return CommandType.C_Minus1
-        
-
-        if self.command_text[0] == "assume":
-            try:
-                ECondition(econdition_text=self.command_text[1:])
-                return CommandType.C_Assume
-            except SyntaxError:
-                pass
-        
-        if self.command_text[0] == "assert":
-            try:
-                ORCondition(orcondition_text=' '.join(self.command_text[1:]))
-                return CommandType.C_Assert
-            except SyntaxError:
-                pass
-        
-        raise SyntaxError(f"Ilegal Command: {self.command_text}.")
-        
-    def get_command_parameters(self) -> dict:
-        if self.command_type == CommandType.C_Skip:
-            return {}
-
-        if self.command_type == CommandType.C_Assign_Var:
-            return {"i": self.command_text[0],
-                    "j": self.command_text[2]}
-
-        if self.command_type == CommandType.C_Assign_Const:
-            return {"i": self.command_text[0],
-                    "K": int(self.command_text[2])}
-
-        if self.command_type == CommandType.C_Assign_Unknown:
-            return {"i": self.command_text[0]}
-
-        if self.command_type == CommandType.C_Plus1:
-            return {"i": self.command_text[0],
-                    "j": self.command_text[2]}
-
-        if self.command_type == CommandType.C_Minus1:
-            return {"i": self.command_text[0],
-                    "j": self.command_text[2]}
-
+    """
+    A parsed command. Commands are built by saav_parser.parser, once per distinct command text:
+    Command(text) returns the same object for the same text.
+    """
+    __slots__ = ('command_text', 'command_type', 'command_parameters', '__weakref__')
+
+    def __new__(cls, command_text: str):
+        return parser.parse_command(command_text)
+
+    @classmethod
+    def _build(cls, command_text: List[str], command_type: CommandType, command_parameters: dict) -> "Command":
+        command = object.__new__(cls)
+        command.command_text = command_text
+        command.command_type = command_type
+        command.command_parameters = command_parameters
+        return command
+
+    def get_variables(self) -> Iterator[str]:
+        """
+        Yields the variables the command mentions, in order of appearance (possibly more than once).
+        """
+        for key in ("i", "j"):
+            if key in self.command_parameters:
+                yield self.command_parameters[key]
         if self.command_type == CommandType.C_Assume:
-            return {"E": ECondition(econdition_text=self.command_text[1:])}
-
+            econdition_parameters = self.command_parameters["E"].econdition_parameters
+            for key in ("i", "j"):
+                if key in econdition_parameters:
+                    yield econdition_parameters[key]
         if self.command_type == CommandType.C_Assert:
-            return {"ORC": ORCondition(orcondition_text=' '.join(self.command_text[1:]))}
-        
-        raise SyntaxError(f"Ilegal Command: {self.command_text}.")
-
+            for and_condition in self.command_parameters["ORC"].disjunction_list:
+                for bool_condition in and_condition.conjunction_list:
+                    if "i" in bool_condition.boolcondition_parameters:
+                        yield bool_condition.boolcondition_parameters["i"]
+                    else:
+                        yield from bool_condition.boolcondition_parameters["i_vec"]
+                        yield from bool_condition.boolcondition_parameters["j_vec"]
+
+    def __reduce__(self):
+        return Command, (' '.join(self.command_text), )
 
     def __repr__(self) -> str:
         if self.command_type == CommandType.C_Skip:
@@ -1,6 +1,3 @@
-VARIABLE_NAMES = {"a", "b", "c", "d", "e", "f", "g", "h", "i", "j", "k", "l", "m",
-                  "n", "o", "p", "q", "r", "s", "t" ,"u", "V", "w", "x", "y", "z",
-                  "x1", "x2", "x3", "x4", "x5", "y1", "y2", "y3", "y4", "y5"}
 ASSIGNMENT = ":="
 QUESTION_MARK = "?"
 PLUS = "+"
@@ -13,3 +10,7 @@ ODD = 'ODD'
 SUM = 'SUM'
 TRUE_STRING = 'TRUE'
 FALSE_STRING = 'FALSE'
+SKIP = 'skip'
+ASSUME = 'assume'
+ASSERT = 'assert'
+KEYWORDS = {SKIP, ASSUME, ASSERT, EVEN, ODD, SUM, TRUE_STRING, FALSE_STRING}
@@ -1,6 +1,7 @@
 from enum import Enum
 from typing import List
 from saav_parser.constants import *
+from saav_parser import parser
 
 class EConditionType(Enum):
     E_Equal_Var = 1
@@ -12,60 +13,19 @@ class EConditionType(Enum):
 
 
 class ECondition:
-    def __init__(self, econdition_text: List[str]):
-        self.econdition_text: List[str] = econdition_text
-        self.econdition_type: EConditionType = self.get_econdition_type()
-        self.econdition_parameters: dict = self.get_econdition_parameters()
-
-    def get_econdition_type(self) -> EConditionType:
-        if len(self.econdition_text) == 3 and \
-            self.econdition_text[0] in VARIABLE_NAMES and \
-            self.econdition_text[1] == EQUAL and \
-            self.econdition_text[2] in VARIABLE_NAMES:
-            return EConditionType.E_Equal_Var
-        
-        if len(self.econdition_text) == 3 and \
-            self.econdition_text[0] in VARIABLE_NAMES and \
-            self.econdition_text[1] == NOT_EQUAL and \
-            self.econdition_text[2] in VARIABLE_NAMES:
-            return EConditionType.E_Diff_Var
-        
-        if len(self.econdition_text) == 3 and \
-            self.econdition_text[0] in VARIABLE_NAMES and \
-            self.econdition_text[1] == EQUAL and \
-            self.econdition_text[2].isdigit():
-            return EConditionType.E_Equal_Const
-        
-        if len(self.econdition_text) == 3 and \
-            self.econdition_text[0] in VARIABLE_NAMES and \
-            self.econdition_text[1] == NOT_EQUAL and \
-            self.econdition_text[2].isdigit():
-            return EConditionType.E_Diff_Const
-
-        if self.econdition_text == [TRUE_STRING]:
-            return EConditionType.E_True
-        
-        if self.econdition_text == [FALSE_STRING]:
-            return EConditionType.E_False
-        
-        raise SyntaxError(f"Ilegal ECondition: {self.econdition_text}!")
-
-    def get_econdition_parameters(self) -> dict:
-        if self.econdition_type == EConditionType.E_Equal_Var or \
-            self.econdition_type == EConditionType.E_Diff_Var:
-            return {"i": self.econdition_text[0],
-                    "j": self.econdition_text[2]}
-        
-        if self.econdition_type == EConditionType.E_Equal_Const or \
-            self.econdition_type == EConditionType.E_Diff_Const:
-            return {"i": self.econdition_text[0],
-                    "K": int(self.econdition_text[2])}
-        
-        if self.econdition_type == EConditionType.E_True or \
-            self.econdition_type == EConditionType.E_False:
-            return {}
-        
-        raise SyntaxError(f"Ilegal ECondition: {self.econdition_text}!")
+    __slots__ = ('econdition_text', 'econdition_type', 'econdition_parameters')
+
+    def __new__(cls, econdition_text: List[str]):
+        return parser.parse_econdition(econdition_text)
+
+    @classmethod
+    def _build(cls, econdition_text: List[str], econdition_type: EConditionType,
+               econdition_parameters: dict) -> "ECondition":
+        econdition = object.__new__(cls)
+        econdition.econdition_text = econdition_text
+        econdition.econdition_type = econdition_type
+        econdition.econdition_parameters = econdition_parameters
+        return econdition
 
     def __repr__(self) -> str:
         if self.econdition_type == EConditionType.E_Equal_Var:
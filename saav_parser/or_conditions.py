@@ -1,23 +1,19 @@
 from typing import List
+from saav_parser import parser
 from saav_parser.and_conditions import ANDCondition
 
 class ORCondition:
-    def __init__(self, orcondition_text: str):
-        self.orcondition_text: str = orcondition_text
-        self.disjunction_list: List[ANDCondition] = self.get_disjunction_list()
+    __slots__ = ('orcondition_text', 'disjunction_list')
 
-    def get_disjunction_list(self): # -> List[ANDCondition]:
-        if self.orcondition_text == "" or self.orcondition_text[-1] != ')':
-            raise SyntaxError(f"Ilegal ORCondition: {self.orcondition_text}.")
-        
-        parsed_text: List[str] = self.orcondition_text.split(')')[:-1]
-        parsed_text = [word.strip() for word in parsed_text]
-        if not all([word.startswith('(') for word in parsed_text]):
-            raise SyntaxError(f"Ilegal ORCondition: {parsed_text}.")
-        else:
-            parsed_text = [word[1:] for word in parsed_text]
+    def __new__(cls, orcondition_text: str):
+        return parser.parse_orcondition(orcondition_text)
 
-        return [ANDCondition(andcondition_text=word) for word in parsed_text]
+    @classmethod
+    def _build(cls, orcondition_text: str, disjunction_list: List[ANDCondition]) -> "ORCondition":
+        or_condition = object.__new__(cls)
+        or_condition.orcondition_text = orcondition_text
+        or_condition.disjunction_list = disjunction_list
+        return or_condition
 
     def __repr__(self) -> str:
         s = ""
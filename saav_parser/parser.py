@@ -0,0 +1,249 @@
+"""
+A single-pass tokenizer and a recursive-descent parser for SAAV commands.
+
+Every Command, ECondition, ORCondition, ANDCondition and BOOLCondition is built exactly once, from the tokens
+of its command. Identical commands are interned: parsing the same text again returns the same Command object,
+as long as that object is still in use (the table only holds weak references).
+"""
+import re
+from typing import List, Union
+from weakref import WeakValueDictionary
+
+from saav_parser.constants import *
+from saav_parser.symbol_table import is_variable_name
+from saav_parser import commands_part1, e_conditions, or_conditions, and_conditions, bool_conditions
+
+SPACE = " "
+AND_SEPARATOR = "  "  # Separates the BOOLConditions of an ANDCondition.
+# Parentheses, runs of spaces and words.
+TOKEN_PATTERN = re.compile(r"[()]| +|[^ ()]+")
+
+INTERNED_COMMANDS: "WeakValueDictionary[str, commands_part1.Command]" = WeakValueDictionary()
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text)
+
+
+class CommandParser:
+    def __init__(self, text: str):
+        self.text: str = text
+        self.tokens: List[str] = tokenize(text)
+        self.position: int = 0
+
+    def peek(self) -> Union[str, None]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def lookahead(self) -> Union[str, None]:
+        return self.tokens[self.position + 1] if self.position + 1 < len(self.tokens) else None
+
+    def next(self) -> str:
+        token = self.peek()
+        if token is None:
+            self.error()
+        self.position += 1
+        return token
+
+    def expect(self, expected: str) -> str:
+        if self.next() != expected:
+            self.error()
+        return expected
+
+    def space(self) -> None:
+        self.expect(SPACE)
+
+    def whitespace(self) -> None:
+        if not self.next().startswith(SPACE):
+            self.error()
+
+    def word(self) -> str:
+        token = self.next()
+        if token.startswith(SPACE) or token in '()':
+            self.error()
+        return token
+
+    def variable(self) -> str:
+        token = self.word()
+        if not is_variable_name(token):
+            self.error()
+        return token
+
+    def at_end(self) -> bool:
+        return self.position == len(self.tokens)
+
+    def error(self):
+        raise SyntaxError(f"Ilegal Command: {self.text.split(' ')}.")
+
+    def parse_command(self) -> "commands_part1.Command":
+        CommandType = commands_part1.CommandType
+        first = self.word()
+
+        if first == SKIP:
+            command_type, parameters = CommandType.C_Skip, {}
+
+        elif first == ASSUME:
+            self.space()
+            parameters = {"E": self.parse_econdition()}
+            command_type = CommandType.C_Assume
+
+        elif first == ASSERT:
+            self.whitespace()
+            parameters = {"ORC": self.parse_orcondition()}
+            command_type = CommandType.C_Assert
+
+        elif is_variable_name(first):
+            self.space()
+            self.expect(ASSIGNMENT)
+            self.space()
+            operand = self.word()
+            if operand == QUESTION_MARK:
+                command_type, parameters = CommandType.C_Assign_Unknown, {"i": first}
+            elif operand.isdigit():
+                command_type, parameters = CommandType.C_Assign_Const, {"i": first, "K": int(operand)}
+            elif is_variable_name(operand):
+                if self.at_end():
+                    command_type = CommandType.C_Assign_Var
+                else:
+                    self.space()
+                    operator = self.word()
+                    if operator not in {PLUS, MINUS}:
+                        self.error()
+                    self.space()
+                    self.expect(ONE_DIGIT)
+                    command_type = CommandType.C_Plus1 if operator == PLUS else CommandType.C_Minus1
+                parameters = {"i": first, "j": operand}
+            else:
+                self.error()
+
+        else:
+            self.error()
+
+        if not self.at_end():
+            self.error()
+        return commands_part1.Command._build(self.text.split(" "), command_type, parameters)
+
+    def parse_econdition(self) -> "e_conditions.ECondition":
+        EConditionType = e_conditions.EConditionType
+        start = self.position
+        first = self.word()
+        if first == TRUE_STRING:
+            econdition_type, parameters = EConditionType.E_True, {}
+        elif first == FALSE_STRING:
+            econdition_type, parameters = EConditionType.E_False, {}
+        elif is_variable_name(first):
+            self.space()
+            operator = self.word()
+            if operator not in {EQUAL, NOT_EQUAL}:
+                self.error()
+            self.space()
+            operand = self.word()
+            if is_variable_name(operand):
+                econdition_type = EConditionType.E_Equal_Var if operator == EQUAL else EConditionType.E_Diff_Var
+                parameters = {"i": first, "j": operand}
+            elif operand.isdigit():
+                econdition_type = EConditionType.E_Equal_Const if operator == EQUAL else EConditionType.E_Diff_Const
+                parameters = {"i": first, "K": int(operand)}
+            else:
+                self.error()
+        else:
+            self.error()
+        return e_conditions.ECondition._build(self.words(start), econdition_type, parameters)
+
+    def parse_orcondition(self) -> "or_conditions.ORCondition":
+        disjunction_list = []
+        while not self.at_end():
+            if self.peek().startswith(SPACE):  # Whitespace between ANDConditions is ignored.
+                self.position += 1
+            disjunction_list.append(self.parse_andcondition())
+        if not disjunction_list:
+            self.error()
+        orcondition_text = ' '.join(f"({and_condition.andcondition_text})" for and_condition in disjunction_list)
+        return or_conditions.ORCondition._build(orcondition_text, disjunction_list)
+
+    def parse_andcondition(self) -> "and_conditions.ANDCondition":
+        self.expect('(')
+        conjunction_list = [self.parse_boolcondition()]
+        while self.peek() == AND_SEPARATOR and self.lookahead() != ')':
+            self.position += 1
+            conjunction_list.append(self.parse_boolcondition())
+        if self.peek() is not None and self.peek().startswith(SPACE):  # Whitespace before ')' is ignored.
+            self.position += 1
+        self.expect(')')
+        andcondition_text = AND_SEPARATOR.join(' '.join(bool_condition.boolcondition_text)
+                                               for bool_condition in conjunction_list)
+        return and_conditions.ANDCondition._build(andcondition_text, conjunction_list)
+
+    def parse_boolcondition(self) -> "bool_conditions.BOOLCondition":
+        BoolConditionType = bool_conditions.BoolConditionType
+        start = self.position
+        first = self.word()
+        if first == EVEN or first == ODD:
+            boolcondition_type = BoolConditionType.B_Even if first == EVEN else BoolConditionType.B_Odd
+            self.space()
+            parameters = {"i": self.variable()}
+        elif first == SUM:
+            i_vec = self.parse_variables()
+            self.space()
+            self.expect(EQUAL)
+            self.space()
+            self.expect(SUM)
+            j_vec = self.parse_variables()
+            boolcondition_type, parameters = BoolConditionType.B_Sum, {"i_vec": i_vec, "j_vec": j_vec}
+        else:
+            self.error()
+        return bool_conditions.BOOLCondition._build(self.words(start), boolcondition_type, parameters)
+
+    def parse_variables(self) -> List[str]:
+        """
+        Parses the variables of a sum, each preceded by a space.
+        """
+        variables = []
+        while self.peek() == SPACE and self.lookahead() is not None and is_variable_name(self.lookahead()):
+            variables.append(self.lookahead())
+            self.position += 2
+        if not variables:
+            self.error()
+        return variables
+
+    def words(self, start: int) -> List[str]:
+        return [token for token in self.tokens[start:self.position] if token != SPACE]
+
+
+def parse_command(command_text: str) -> "commands_part1.Command":
+    """
+    Parses a command, or returns the Command already parsed from the same text.
+    """
+    command = INTERNED_COMMANDS.get(command_text)
+    if command is None:
+        command = CommandParser(command_text).parse_command()
+        INTERNED_COMMANDS[command_text] = command
+    return command
+
+
+def parse_econdition(econdition_text: List[str]) -> "e_conditions.ECondition":
+    parser = CommandParser(' '.join(econdition_text))
+    econdition = parser.parse_econdition()
+    if not parser.at_end():
+        raise SyntaxError(f"Ilegal ECondition: {econdition_text}!")
+    return econdition
+
+
+def parse_orcondition(orcondition_text: str) -> "or_conditions.ORCondition":
+    parser = CommandParser(orcondition_text)
+    return parser.parse_orcondition()
+
+
+def parse_andcondition(andcondition_text: str) -> "and_conditions.ANDCondition":
+    parser = CommandParser(f"({andcondition_text})")
+    and_condition = parser.parse_andcondition()
+    if not parser.at_end():
+        raise SyntaxError(f"Ilegal ANDCondition: {andcondition_text}.")
+    return and_condition
+
+
+def parse_boolcondition(boolcondition_text: str) -> "bool_conditions.BOOLCondition":
+    parser = CommandParser(boolcondition_text)
+    bool_condition = parser.parse_boolcondition()
+    if not parser.at_end():
+        raise SyntaxError(f"Ilegal BOOLCondition: {boolcondition_text.split(' ')}.")
+    return bool_condition
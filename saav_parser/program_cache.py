@@ -0,0 +1,202 @@
+"""
+A compiled on-disk form of parsed programs, so that analysing the same program file again skips parsing.
+
+A compiled program holds the variables, the labels in dense-id order, a table of the distinct commands - each
+as an opcode (its CommandType value) and operands, with assert conditions as nested tuples - and the edges as
+lists of start label ids, end label ids and command ids. It is written as JSON into the cache directory under the
+SHA-256 of the source file, and loaded back with one read. JSON holds data only, so loading a cache file never runs
+code from it; a cache file which cannot be decoded is rebuilt.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+from saav_parser import parser
+from saav_parser.constants import EQUAL, EVEN, ODD, SUM
+from saav_parser.read_program import Program, ProgramLine
+from saav_parser.commands_part1 import Command, CommandType
+from saav_parser.e_conditions import ECondition, EConditionType
+from saav_parser.or_conditions import ORCondition
+from saav_parser.and_conditions import ANDCondition
+from saav_parser.bool_conditions import BOOLCondition, BoolConditionType
+
+CACHE_FORMAT_VERSION = 2
+DEFAULT_CACHE_DIRECTORY_NAME = "__saavcache__"
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def encode_command(command: Command) -> Tuple:
+    parameters = command.command_parameters
+    if command.command_type == CommandType.C_Assume:
+        econdition: ECondition = parameters["E"]
+        operands = tuple(econdition.econdition_parameters.values())
+        return command.command_type.value, (econdition.econdition_type.value, ) + operands
+    if command.command_type == CommandType.C_Assert:
+        return command.command_type.value, tuple(tuple(encode_boolcondition(bool_condition)
+                                                       for bool_condition in and_condition.conjunction_list)
+                                                 for and_condition in parameters["ORC"].disjunction_list)
+    return (command.command_type.value, ) + tuple(parameters.values())
+
+
+def encode_boolcondition(bool_condition: BOOLCondition) -> Tuple:
+    if bool_condition.boolcondition_type == BoolConditionType.B_Sum:
+        return (bool_condition.boolcondition_type.value, tuple(bool_condition.boolcondition_parameters["i_vec"]),
+                tuple(bool_condition.boolcondition_parameters["j_vec"]))
+    return bool_condition.boolcondition_type.value, bool_condition.boolcondition_parameters["i"]
+
+
+def decode_command(command_text: str, encoded_command: Tuple) -> Command:
+    """
+    Builds the command from its compiled form, without parsing its text, or returns the command already interned for
+    the same text. A decoded command is not interned here - see decompile_program.
+    """
+    command = parser.INTERNED_COMMANDS.get(command_text)
+    if command is not None:
+        return command
+
+    command_type = CommandType(encoded_command[0])
+    operands = encoded_command[1:]
+    if command_type == CommandType.C_Skip:
+        parameters = {}
+    elif command_type in {CommandType.C_Assign_Var, CommandType.C_Plus1, CommandType.C_Minus1}:
+        parameters = {"i": operands[0], "j": operands[1]}
+    elif command_type == CommandType.C_Assign_Const:
+        parameters = {"i": operands[0], "K": operands[1]}
+    elif command_type == CommandType.C_Assign_Unknown:
+        parameters = {"i": operands[0]}
+    elif command_type == CommandType.C_Assume:
+        parameters = {"E": decode_econdition(command_text.split(' ')[1:], operands[0])}
+    else:
+        parameters = {"ORC": decode_orcondition(operands[0])}
+
+    return Command._build(command_text.split(' '), command_type, parameters)
+
+
+def decode_econdition(econdition_text: List[str], encoded_econdition: Tuple) -> ECondition:
+    econdition_type = EConditionType(encoded_econdition[0])
+    operands = encoded_econdition[1:]
+    if econdition_type in {EConditionType.E_Equal_Var, EConditionType.E_Diff_Var}:
+        parameters = {"i": operands[0], "j": operands[1]}
+    elif econdition_type in {EConditionType.E_Equal_Const, EConditionType.E_Diff_Const}:
+        parameters = {"i": operands[0], "K": operands[1]}
+    else:
+        parameters = {}
+    return ECondition._build(econdition_text, econdition_type, parameters)
+
+
+def decode_orcondition(encoded_orcondition: Tuple) -> ORCondition:
+    disjunction_list = []
+    for encoded_andcondition in encoded_orcondition:
+        conjunction_list = [decode_boolcondition(encoded_boolcondition) for encoded_boolcondition in encoded_andcondition]
+        andcondition_text = parser.AND_SEPARATOR.join(' '.join(bool_condition.boolcondition_text)
+                                                      for bool_condition in conjunction_list)
+        disjunction_list.append(ANDCondition._build(andcondition_text, conjunction_list))
+    orcondition_text = ' '.join(f"({and_condition.andcondition_text})" for and_condition in disjunction_list)
+    return ORCondition._build(orcondition_text, disjunction_list)
+
+
+def decode_boolcondition(encoded_boolcondition: Tuple) -> BOOLCondition:
+    boolcondition_type = BoolConditionType(encoded_boolcondition[0])
+    if boolcondition_type == BoolConditionType.B_Sum:
+        parameters = {"i_vec": list(encoded_boolcondition[1]), "j_vec": list(encoded_boolcondition[2])}
+        boolcondition_text = [SUM] + parameters["i_vec"] + [EQUAL, SUM] + parameters["j_vec"]
+    else:
+        parameters = {"i": encoded_boolcondition[1]}
+        boolcondition_text = [EVEN if boolcondition_type == BoolConditionType.B_Even else ODD, parameters["i"]]
+    return BOOLCondition._build(boolcondition_text, boolcondition_type, parameters)
+
+
+def compile_program(program: Program) -> dict:
+    command_ids: Dict[int, int] = {}
+    commands: List[Tuple[str, Tuple]] = []
+    start_ids: List[int] = []
+    end_ids: List[int] = []
+    edge_command_ids: List[int] = []
+    for program_line in program.program_lines:
+        command = program_line.command
+        command_id = command_ids.get(id(command))
+        if command_id is None:
+            command_id = command_ids[id(command)] = len(commands)
+            commands.append((' '.join(command.command_text), encode_command(command)))
+        start_ids.append(program.label_ids[program_line.start_label])
+        end_ids.append(program.label_ids[program_line.end_label])
+        edge_command_ids.append(command_id)
+
+    return {"version": CACHE_FORMAT_VERSION,
+            "variables": program.program_variables,
+            "labels": list(program.label_ids),
+            "commands": commands,
+            "edges": (start_ids, end_ids, edge_command_ids)}
+
+
+def decompile_program(compiled_program: dict) -> Program:
+    """
+    Builds the program from its compiled form. The decoded commands are interned only once the whole program has
+    been decoded, so a malformed cache file leaves no command of it behind.
+    """
+    labels: List[int] = compiled_program["labels"]
+    decoded_commands: Dict[str, Command] = {}
+    commands: List[Command] = []
+    for command_text, encoded_command in compiled_program["commands"]:
+        command = decoded_commands.get(command_text)
+        if command is None:
+            command = decoded_commands[command_text] = decode_command(command_text, encoded_command)
+        commands.append(command)
+    program_lines = [ProgramLine._build(labels[start_id], labels[end_id], commands[command_id])
+                     for start_id, end_id, command_id in zip(*compiled_program["edges"])]
+    label_ids = {label: label_id for label_id, label in enumerate(labels)}
+    program = Program._build(compiled_program["variables"], label_ids, program_lines)
+    parser.INTERNED_COMMANDS.update(decoded_commands)
+    return program
+
+
+def file_digest(program_file: Path) -> str:
+    """
+    Returns the SHA-256 of the file, reading it in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(program_file, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_program(program_file: Path, cache_directory: Union[Path, None] = None) -> Program:
+    """
+    Returns the program of the given file, loading its compiled form from the cache directory (by default,
+    __saavcache__ next to the file) when the file was compiled before, and compiling and caching it otherwise.
+    """
+    program_file = Path(program_file)
+    if cache_directory is None:
+        cache_directory = program_file.parent / DEFAULT_CACHE_DIRECTORY_NAME
+    cache_directory = Path(cache_directory)
+
+    digest = file_digest(program_file)
+    cache_file = cache_directory / f"{digest}.json"
+
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as file:
+            compiled_program = json.load(file)
+        if isinstance(compiled_program, dict) and compiled_program.get("version") == CACHE_FORMAT_VERSION:
+            return decompile_program(compiled_program)
+    except (OSError, ValueError, KeyError, IndexError, TypeError):
+        pass  # A missing, unreadable or malformed cache file is rebuilt below.
+
+    program = Program(program_file)
+    if file_digest(program_file) != digest:
+        return program  # The file changed while it was read, so the program is not cached under either digest.
+    temporary_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        cache_directory.mkdir(parents=True, exist_ok=True)
+        with open(temporary_file, 'w', encoding='utf-8') as file:
+            json.dump(compile_program(program), file, separators=(',', ':'))
+        os.replace(temporary_file, cache_file)
+    except OSError:
+        # The program is still returned when the cache directory is not writable.
+        try:
+            temporary_file.unlink(missing_ok=True)
+        except OSError:
+            pass
+    return program
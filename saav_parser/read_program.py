@@ -1,9 +1,12 @@
-from typing import List
+from typing import Dict, Iterator, List
 from pathlib import Path
 
 from saav_parser.commands_part1 import Command
+from saav_parser.symbol_table import SymbolTable
 
 class ProgramLine:
+    __slots__ = ('start_label', 'end_label', 'command')
+
     def __init__(self, line_text: str):
         splitted_line = line_text.split(' ')
         start_label = splitted_line[0]
@@ -17,6 +20,14 @@ class ProgramLine:
         command_text = line_text[len(start_label): -len(end_label)].strip()
         self.command: Command = Command(command_text)
 
+    @classmethod
+    def _build(cls, start_label: int, end_label: int, command: Command) -> "ProgramLine":
+        program_line = object.__new__(cls)
+        program_line.start_label = start_label
+        program_line.end_label = end_label
+        program_line.command = command
+        return program_line
+
     def get_edge_label(self) -> tuple:
         return f"L{self.start_label}", f"L{self.end_label}"
 
@@ -24,21 +35,78 @@ class ProgramLine:
         return f"L{self.start_label}   {self.command}   L{self.end_label}"
 
 
+def read_program_lines(program_file: Path) -> Iterator[str]:
+    """
+    Lazily yields the stripped non-empty lines of a program file, reading it through a buffer.
+    """
+    with open(program_file) as file:
+        for line in file:
+            line = line.strip()
+            if line != "":
+                yield line
+
+
 class Program:
     def __init__(self, program_file: Path):
-        with open(program_file) as file:
-            lines = [line.strip() for line in file]
-            lines = [line for line in lines if line != ""]
+        self._read_lines(read_program_lines(program_file), f"The program file {program_file}")
+
+    @classmethod
+    def from_text(cls, program_text: str) -> "Program":
+        program = object.__new__(cls)
+        program._read_lines((line.strip() for line in program_text.splitlines() if line.strip() != ""), "The program")
+        return program
 
-        self.program_variables: List[str] = lines[0].split(' ')
-        self.program_lines: List[ProgramLine] = [ProgramLine(line) for line in lines[1:]]
+    def _read_lines(self, lines: Iterator[str], source: str) -> None:
+        first_line = next(lines, None)
+        if first_line is None:
+            raise SyntaxError(f"{source} is empty.")
+        self.program_variables: List[str] = first_line.split(' ')
+        # The ids of the declared variables are their positions, and variables which are used without being
+        # declared get the next ids as their lines are read.
+        self.symbol_table: SymbolTable = SymbolTable(self.program_variables)
+
+        # Every label gets a dense id, in the order the labels first appear, and the outgoing and ingoing lines of
+        # every label (see ControlFlowGraph) are collected as the lines are read.
+        self.label_ids: Dict[int, int] = {}
+        self.program_lines: List[ProgramLine] = []
+        self.outgoing_lines: List[List[ProgramLine]] = []
+        self.ingoing_lines: List[List[ProgramLine]] = []
+        for line in lines:
+            self._add_line(ProgramLine(line))
+
+    def _add_line(self, program_line: ProgramLine) -> None:
+        start_id = self._label_id(program_line.start_label)
+        end_id = self._label_id(program_line.end_label)
+        for variable in program_line.command.get_variables():
+            self.symbol_table.add(variable)
+        self.program_lines.append(program_line)
+        self.outgoing_lines[start_id].append(program_line)
+        self.ingoing_lines[end_id].append(program_line)
+
+    def _label_id(self, label: int) -> int:
+        label_id = self.label_ids.get(label)
+        if label_id is None:
+            label_id = self.label_ids[label] = len(self.label_ids)
+            self.outgoing_lines.append([])
+            self.ingoing_lines.append([])
+        return label_id
+
+    @classmethod
+    def _build(cls, program_variables: List[str], label_ids: Dict[int, int],
+               program_lines: List[ProgramLine]) -> "Program":
+        program = object.__new__(cls)
+        program.program_variables = program_variables
+        program.symbol_table = SymbolTable(program_variables)
+        program.label_ids = label_ids
+        program.program_lines = []
+        program.outgoing_lines = [[] for _ in label_ids]
+        program.ingoing_lines = [[] for _ in label_ids]
+        for program_line in program_lines:
+            program._add_line(program_line)
+        return program
 
     def get_all_labels(self) -> List[int]:
-        all_labels_set: set = set()
-        for program_line in self.program_lines:
-            all_labels_set.add(program_line.start_label)
-            all_labels_set.add(program_line.end_label)
-        return sorted(all_labels_set)
+        return sorted(self.label_ids)
 
     def __repr__(self) -> str:
         s = ' '.join(self.program_variables) + "\n"
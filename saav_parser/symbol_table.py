@@ -0,0 +1,52 @@
+import re
+from typing import Dict, Iterable, Iterator, List
+
+from saav_parser.constants import *
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def is_variable_name(word: str) -> bool:
+    """
+    Variables may be named by any identifier which is not a keyword of the language.
+    """
+    return IDENTIFIER_PATTERN.fullmatch(word) is not None and word not in KEYWORDS
+
+
+class SymbolTable:
+    """
+    Resolves variable names to dense integer ids (0, 1, 2, ...), given in the order the names are added.
+    The ids of a table built from a list of variables are their positions in the list.
+    """
+    __slots__ = ('variable_ids', 'variable_names')
+
+    def __init__(self, variable_names: Iterable[str] = ()):
+        self.variable_ids: Dict[str, int] = {}
+        self.variable_names: List[str] = []
+        for variable_name in variable_names:
+            self.add(variable_name)
+
+    def add(self, variable_name: str) -> int:
+        variable_id = self.variable_ids.get(variable_name)
+        if variable_id is None:
+            variable_id = self.variable_ids[variable_name] = len(self.variable_names)
+            self.variable_names.append(variable_name)
+        return variable_id
+
+    def __getitem__(self, variable_name: str) -> int:
+        return self.variable_ids[variable_name]
+
+    def name_of(self, variable_id: int) -> str:
+        return self.variable_names[variable_id]
+
+    def __contains__(self, variable_name: str) -> bool:
+        return variable_name in self.variable_ids
+
+    def __len__(self) -> int:
+        return len(self.variable_names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.variable_names)
+
+    def __repr__(self) -> str:
+        return f"SymbolTable({self.variable_names})"
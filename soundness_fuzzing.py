@@ -0,0 +1,279 @@
+"""
+A soundness fuzzer: checks that the fixpoints of the analyzers over-approximate the concrete semantics.
+
+Every program - generated at random from a seed, or read from a corpus file - is explored by ConcreteStateExplorer
+(following the semantics of ConcreteState, with "i := ?" bounded to a small range of values), and every reachable
+concrete state is checked against the abstract state which chaotic_iteration computed at its label for each of the
+analyzers. A concrete state which is not in the concretization of its abstract state is a counterexample; it is
+minimised by removing program lines for as long as the same analyzer still fails on the remaining program.
+The parity analysis only supports EVEN/ODD assertions and the summation analysis only SUM assertions, so each of them
+is skipped (and reported as skipped) on programs asserting anything else.
+
+The programs are sharded across a pool of worker processes; the counterexamples are minimised in the main process.
+"""
+import argparse
+import contextlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from random import Random
+from typing import Callable, Dict, List, Set, Tuple, Union
+
+from analysis_cartesian_product import ParitySummationCartesianProduct
+from analysis_parity import Parity, ParityStaticAnalyzer
+from analysis_relationsl_product import ParitySummationRelationalProduct
+from analysis_summation import SummationStaticAnalyzer
+from concrete_state_explorer import ConcreteStateExplorer
+from control_flow_graph import ControlFlowGraph
+from fixpoint import chaotic_iteration
+from saav_parser import BoolConditionType, CommandType, Program
+
+Values = Dict[str, int]  # The defined variables of a concrete state.
+
+ANALYZERS: Dict[str, Callable[[List[str]], object]] = {
+    "parity": lambda variables: ParityStaticAnalyzer(variables),
+    "summation": lambda variables: SummationStaticAnalyzer(variables, (-1, 1), (-1, 1)),
+    "cartesian": lambda variables: ParitySummationCartesianProduct(variables, (-1, 1), (-1, 1)),
+    "relational": lambda variables: ParitySummationRelationalProduct(variables, (-1, 1), (-1, 1)),
+}
+
+# The conditions each analyzer can evaluate in an assertion.
+SUPPORTED_CONDITIONS: Dict[str, Set[BoolConditionType]] = {
+    "parity": {BoolConditionType.B_Even, BoolConditionType.B_Odd},
+    "summation": {BoolConditionType.B_Sum},
+    "cartesian": set(BoolConditionType),
+    "relational": set(BoolConditionType),
+}
+
+EXPLORATION_BOUNDS = dict(value_range=(-2, 2), value_limit=8, max_depth=40, max_states=20000)
+
+
+class Counterexample:
+    def __init__(self, analyzer_name: str, program_text: str, label: int, values: Values, abstract_state: str):
+        self.analyzer_name: str = analyzer_name
+        self.program_text: str = program_text
+        self.label: int = label
+        self.values: Values = values                # The reachable concrete state.
+        self.abstract_state: str = abstract_state   # The abstract state computed at the label, which misses it.
+
+    def __repr__(self) -> str:
+        return f"The {self.analyzer_name} analysis is unsound at L{self.label}: the state {self.values} is " \
+               f"reachable, but the abstract state is {self.abstract_state}.\nProgram:\n{self.program_text}"
+
+
+def generate_assertion(random: Random, variables: List[str], kinds: List[str]) -> str:
+    """
+    A random assertion of one or two disjuncts of one or two conditions, each an EVEN/ODD condition (if "parity" is in
+    kinds) or a SUM condition (if "sum" is in kinds).
+    """
+    disjuncts = []
+    for _ in range(random.randint(1, 2)):
+        conjuncts = []
+        for _ in range(random.randint(1, 2)):
+            if random.choice(kinds) == "parity":
+                conjuncts.append(f"{random.choice(['EVEN', 'ODD'])} {random.choice(variables)}")
+            else:
+                i_vec = random.sample(variables, random.randint(1, 2))
+                j_vec = random.sample(variables, random.randint(1, 2))
+                conjuncts.append(f"SUM {' '.join(i_vec)} = SUM {' '.join(j_vec)}")
+        disjuncts.append("(" + "  ".join(conjuncts) + ")")
+    return "assert " + " ".join(disjuncts)
+
+
+def generate_program(random: Random, variables: List[str], number_of_labels: int) -> str:
+    """
+    A random program over the given variables. It starts by assigning "?" to every variable, so no path is blocked
+    by an undefined variable, followed by number_of_labels labels. Every one of those has an edge to the next label,
+    a pair of complementary assume edges (one of which may go back), or an assertion.
+    Only EVEN/ODD assertions, only SUM assertions, or both kinds are generated, so that each analyzer gets programs
+    it supports. No edge goes back to L0, so L0 is the starting label.
+    """
+    lines = [" ".join(variables)]
+    for k, variable in enumerate(variables):
+        lines.append(f"L{k} {variable} := ? L{k + 1}")
+    kinds = random.choice([["parity"], ["sum"], ["parity", "sum"]])
+    first_label, last_label = len(variables), len(variables) + number_of_labels
+    for k in range(first_label, last_label):
+        i, j = random.choice(variables), random.choice(variables)
+        choice = random.random()
+        if choice < 0.3:
+            target = random.randint(1, last_label)
+            if random.random() < 0.5:
+                equal, different = f"{i} = {j}", f"{i} != {j}"
+            else:
+                K = random.randint(0, 3)
+                equal, different = f"{i} = {K}", f"{i} != {K}"
+            if random.random() < 0.5:
+                equal, different = different, equal
+            lines.append(f"L{k} assume {equal} L{k + 1}")
+            lines.append(f"L{k} assume {different} L{target}")
+            continue
+        if choice < 0.45:
+            command = generate_assertion(random, variables, kinds)
+        else:
+            command = random.choice([f"{i} := {j}", f"{i} := {random.randint(0, 3)}", f"{i} := ?",
+                                     f"{i} := {j} + 1", f"{i} := {j} - 1", "skip"])
+        lines.append(f"L{k} {command} L{k + 1}")
+    return "\n".join(lines)
+
+
+def asserted_conditions(program: Program) -> Set[BoolConditionType]:
+    return {bool_condition.boolcondition_type
+            for program_line in program.program_lines if program_line.command.command_type == CommandType.C_Assert
+            for and_condition in program_line.command.command_parameters['ORC'].disjunction_list
+            for bool_condition in and_condition.conjunction_list}
+
+
+def parity_contains(analyzer: ParityStaticAnalyzer, parity_state, values: Values) -> bool:
+    """
+    Whether some parity vector of the state matches the defined variables. Undefined variables match any parity.
+    """
+    for parity_element in parity_state:
+        if all(variable not in values or parity == Parity(values[variable] % 2)
+               for variable, parity in zip(analyzer.variables, parity_element.tuple)):
+            return True
+    return False
+
+
+def summation_contains(summation_lattice, equations_element, values: Values) -> bool:
+    """
+    Whether every equation of the state over defined variables holds. The bottom element contains no state.
+    """
+    if equations_element == summation_lattice.bottom():
+        return False
+    for equation in equations_element.equations_set:
+        equation_variables = [variable for variable in equation.variables if variable in equation]
+        if all(variable in values for variable in equation_variables) and \
+                sum(equation.get_coefficient(variable) * values[variable] for variable in equation_variables) != equation.m:
+            return False
+    return True
+
+
+def abstract_contains(analyzer_name: str, analyzer, abstract_state, values: Values) -> bool:
+    if analyzer_name == "parity":
+        return parity_contains(analyzer, abstract_state, values)
+    if analyzer_name == "summation":
+        return summation_contains(analyzer.lattice_class, abstract_state, values)
+    if analyzer_name == "cartesian":
+        return parity_contains(analyzer.parity_analyzer, abstract_state.first_element, values) and \
+            summation_contains(analyzer.summation_lattice, abstract_state.second_element, values)
+    if analyzer_name == "relational":
+        return any(parity_contains(analyzer.parity_analyzer, [parity_element], values) and
+                   summation_contains(analyzer.summation_lattice, equations_element, values)
+                   for parity_element, equations_element in abstract_state)
+    raise ValueError(f"Unknown analyzer: {analyzer_name}.")
+
+
+def check_program(program_text: str, analyzer_names: List[str]) -> Tuple[List[Counterexample], List[str]]:
+    """
+    Returns the first counterexample found for each of the analyzers, if any, and the analyzers which were skipped
+    because the program asserts a condition they do not support.
+    """
+    program = Program.from_text(program_text)
+    conditions = asserted_conditions(program)
+    skipped = [analyzer_name for analyzer_name in analyzer_names
+               if not conditions <= SUPPORTED_CONDITIONS[analyzer_name]]
+    cfg = ControlFlowGraph(program)
+    exploration = ConcreteStateExplorer(cfg, **EXPLORATION_BOUNDS).explore()
+    reachable: List[Tuple[int, Values]] = []
+    for node_id, state in exploration.visited:
+        values = {variable: value for variable, value in zip(exploration.variables, state) if isinstance(value, int)}
+        reachable.append((exploration.labels[node_id], values))
+    reachable.sort(key=lambda label_and_values: (label_and_values[0], sorted(label_and_values[1].items())))
+
+    counterexamples: List[Counterexample] = []
+    for analyzer_name in analyzer_names:
+        if analyzer_name in skipped:
+            continue
+        analyzer = ANALYZERS[analyzer_name](program.program_variables)
+        with contextlib.redirect_stdout(io.StringIO()):  # chaotic_iteration prints every iteration.
+            fixpoint = chaotic_iteration(cfg, analyzer)
+        for label, values in reachable:
+            if not abstract_contains(analyzer_name, analyzer, fixpoint[label], values):
+                counterexamples.append(Counterexample(analyzer_name, program_text, label, values, repr(fixpoint[label])))
+                break
+    return counterexamples, skipped
+
+
+def reproduces(program_text: str, analyzer_name: str) -> bool:
+    try:
+        return bool(check_program(program_text, [analyzer_name])[0])
+    except Exception:  # A program left without a starting label, for example.
+        return False
+
+
+def minimise_counterexample(counterexample: Counterexample) -> Counterexample:
+    """
+    Greedily removes program lines for as long as the same analyzer is still unsound on the remaining program.
+    """
+    variables_line, *lines = counterexample.program_text.split("\n")
+    index = 0
+    while index < len(lines):
+        candidate_lines = lines[:index] + lines[index + 1:]
+        if candidate_lines and reproduces("\n".join([variables_line] + candidate_lines), counterexample.analyzer_name):
+            lines = candidate_lines
+        else:
+            index += 1
+    return check_program("\n".join([variables_line] + lines), [counterexample.analyzer_name])[0][0]
+
+
+def program_of_task(task: Union[int, Path], variables: List[str], number_of_labels: int) -> str:
+    """
+    A task is a seed of a generated program, or a corpus file.
+    """
+    if isinstance(task, Path):
+        return task.read_text()
+    return generate_program(Random(task), variables, number_of_labels)
+
+
+def check_task(task: Union[int, Path], analyzer_names: List[str], variables: List[str],
+               number_of_labels: int) -> Tuple[List[Counterexample], List[str]]:
+    return check_program(program_of_task(task, variables, number_of_labels), analyzer_names)
+
+
+def fuzz(tasks: List[Union[int, Path]], analyzer_names: List[str], workers: int = 0,
+         variables: Tuple[str, ...] = ("x", "y", "z"),
+         number_of_labels: int = 8) -> Tuple[List[Counterexample], Dict[str, int]]:
+    """
+    Checks the programs of all tasks, sharded across workers processes (or in this process if workers is 0).
+    Returns the minimised counterexamples, and the number of programs each analyzer was skipped on.
+    """
+    arguments = (tasks, [analyzer_names] * len(tasks), [list(variables)] * len(tasks), [number_of_labels] * len(tasks))
+    if workers > 0:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(check_task, *arguments, chunksize=max(1, len(tasks) // (4 * workers))))
+    else:
+        results = list(map(check_task, *arguments))
+    skipped_programs: Dict[str, int] = {analyzer_name: 0 for analyzer_name in analyzer_names}
+    for _, skipped in results:
+        for analyzer_name in skipped:
+            skipped_programs[analyzer_name] += 1
+    return [minimise_counterexample(counterexample) for counterexamples, _ in results
+            for counterexample in counterexamples], skipped_programs
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description="Checks the analyzers against concrete executions.")
+    argument_parser.add_argument("corpus", nargs="*", type=Path, help="program files (default: generated programs)")
+    argument_parser.add_argument("--programs", type=int, default=100, help="the number of generated programs")
+    argument_parser.add_argument("--seed", type=int, default=0, help="the seed of the first generated program")
+    argument_parser.add_argument("--labels", type=int, default=8, help="the number of labels of generated programs")
+    argument_parser.add_argument("--workers", type=int, default=0, help="the number of worker processes")
+    argument_parser.add_argument("--analyzers", default="parity,summation,cartesian",
+                                 help=f"a comma separated subset of {','.join(ANALYZERS)}")
+    arguments = argument_parser.parse_args()
+
+    tasks: List[Union[int, Path]] = arguments.corpus or \
+        list(range(arguments.seed, arguments.seed + arguments.programs))
+    counterexamples, skipped_programs = fuzz(tasks, arguments.analyzers.split(","), arguments.workers,
+                                             number_of_labels=arguments.labels)
+    for counterexample in counterexamples:
+        print(counterexample, end="\n\n")
+    for analyzer_name, skipped in skipped_programs.items():
+        if skipped:
+            print(f"Skipped the {analyzer_name} analysis on {skipped} programs, which assert conditions it does not support.")
+    print(f"Checked {len(tasks)} programs, found {len(counterexamples)} counterexamples.")
+
+
+if __name__ == "__main__":
+    main()